@@ -0,0 +1,39 @@
+"""
+gunicorn settings: gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is imported once in the master (preload_app), so schema migrations
+and the default admin run before any worker forks and the workers share
+the imported code. Each worker then drops the database connections it
+inherited (post_fork). /metrics and the caches are per worker.
+"""
+import multiprocessing
+import os
+
+cpus = multiprocessing.cpu_count()
+
+bind = os.environ.get('BIND', f"0.0.0.0:{os.environ.get('PORT', 5000)}")
+# one process per core runs templates and Python in parallel; SQLite still
+# takes one writer at a time, so beyond that more processes only queue on
+# its lock (each worker batches its own ballots)
+workers = int(os.environ.get('WEB_CONCURRENCY', min(max(2, cpus), 8)))
+# threads cover the time a request waits on SQLite or the password pool;
+# open live-results streams each hold one
+worker_class = 'gthread'
+threads = int(os.environ.get('SERVE_THREADS', 8))
+preload_app = True
+backlog = 1024
+keepalive = 5
+timeout = 30
+graceful_timeout = 10
+
+# the app reads these at import, which happens after this file runs: tell it
+# how many processes share the database, and split the password hashing
+# cores between workers instead of starting cpu_count() hashers in each
+os.environ['WEB_CONCURRENCY'] = str(workers)
+os.environ.setdefault('PASSWORD_WORKERS', str(max(1, cpus // workers)))
+
+
+def post_fork(server, worker):
+    import run
+
+    run.after_fork()
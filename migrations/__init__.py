@@ -0,0 +1,27 @@
+"""
+Schema migrations, applied in VERSION order by services.migrations.
+
+Databases created by the app from scratch are stamped with the latest
+version; older, unversioned databases start at 0 and get every step.
+Each step checks the current schema first, because databases that were
+upgraded with the old one-off scripts may already have some of them.
+"""
+from services.migrations import load_migrations
+
+from migrations import (
+    m0001_candidate_election,
+    m0002_position_drop_election,
+    m0003_position_votes_allowed,
+    m0004_candidate_position_id,
+    m0005_election_autoincrement,
+    m0006_voter_counter,
+)
+
+MIGRATIONS = load_migrations([
+    m0001_candidate_election,
+    m0002_position_drop_election,
+    m0003_position_votes_allowed,
+    m0004_candidate_position_id,
+    m0005_election_autoincrement,
+    m0006_voter_counter,
+])
@@ -0,0 +1,16 @@
+"""Add the nullable candidate.election_id column."""
+from services.migrations import table_columns
+
+VERSION = 1
+NAME = 'candidate election_id'
+
+
+def upgrade(conn):
+    cols = table_columns(conn, 'candidate')
+    if cols and 'election_id' not in cols:
+        conn.exec_driver_sql('ALTER TABLE candidate ADD COLUMN election_id INTEGER REFERENCES election (id)')
+
+
+def estimate(conn):
+    # ADD COLUMN only rewrites the schema, not the rows
+    return 0
@@ -0,0 +1,37 @@
+"""Drop position.election_id; positions are shared by every election.
+
+The column is a foreign key, which ALTER TABLE ... DROP COLUMN refuses, so
+the table is rebuilt and renamed.
+"""
+from services.migrations import table_columns, table_rows
+
+VERSION = 2
+NAME = 'position drop election_id'
+
+KEEP = ['id', 'title', 'description', 'max_winners', 'votes_allowed']
+
+
+def upgrade(conn):
+    cols = table_columns(conn, 'position')
+    if 'election_id' not in cols:
+        return
+    keep = [c for c in KEEP if c in cols]
+    defs = {
+        'id': 'id INTEGER NOT NULL PRIMARY KEY',
+        'title': 'title VARCHAR(200) NOT NULL',
+        'description': 'description TEXT',
+        'max_winners': 'max_winners INTEGER NOT NULL DEFAULT 1',
+        'votes_allowed': 'votes_allowed INTEGER NOT NULL DEFAULT 1',
+    }
+    # older rows may hold NULL counts; the new columns are NOT NULL
+    values = [f'COALESCE({c}, 1)' if c in ('max_winners', 'votes_allowed') else c for c in keep]
+    conn.exec_driver_sql(f'CREATE TABLE position_new ({", ".join(defs[c] for c in keep)})')
+    conn.exec_driver_sql(
+        f'INSERT INTO position_new ({", ".join(keep)}) SELECT {", ".join(values)} FROM position'
+    )
+    conn.exec_driver_sql('DROP TABLE position')
+    conn.exec_driver_sql('ALTER TABLE position_new RENAME TO position')
+
+
+def estimate(conn):
+    return table_rows(conn, 'position') if 'election_id' in table_columns(conn, 'position') else 0
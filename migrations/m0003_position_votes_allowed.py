@@ -0,0 +1,15 @@
+"""Add position.votes_allowed (how many candidates a voter may pick), default 1."""
+from services.migrations import table_columns
+
+VERSION = 3
+NAME = 'position votes_allowed'
+
+
+def upgrade(conn):
+    cols = table_columns(conn, 'position')
+    if cols and 'votes_allowed' not in cols:
+        conn.exec_driver_sql('ALTER TABLE position ADD COLUMN votes_allowed INTEGER NOT NULL DEFAULT 1')
+
+
+def estimate(conn):
+    return 0
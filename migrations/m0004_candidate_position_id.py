@@ -0,0 +1,28 @@
+"""Add candidate.position_id and fill it from the stored position title.
+
+Titles are matched ignoring case and surrounding spaces; if two positions
+share a title the older one wins. Candidates whose title matches no
+position keep a NULL position_id and are still shown under their title.
+"""
+from services.migrations import table_columns, table_rows
+
+VERSION = 4
+NAME = 'candidate position_id backfill'
+
+MATCH = 'lower(trim(p.title)) = lower(trim(candidate.position))'
+
+
+def upgrade(conn):
+    cols = table_columns(conn, 'candidate')
+    if not cols:
+        return
+    if 'position_id' not in cols:
+        conn.exec_driver_sql('ALTER TABLE candidate ADD COLUMN position_id INTEGER REFERENCES position (id)')
+    conn.exec_driver_sql(
+        f'UPDATE candidate SET position_id = (SELECT p.id FROM position p WHERE {MATCH} ORDER BY p.id LIMIT 1) '
+        f'WHERE position_id IS NULL AND EXISTS (SELECT 1 FROM position p WHERE {MATCH})'
+    )
+
+
+def estimate(conn):
+    return table_rows(conn, 'candidate')
@@ -0,0 +1,46 @@
+"""Make election.id AUTOINCREMENT, so a deleted election's id is never reused.
+
+Without it SQLite hands the highest deleted id to the next election, which
+would then inherit whatever still points at the old one (ballots being
+deleted by a job, cached "already voted" bits, audit log entries). The
+keyword can only be given when a table is created, so the table is
+rebuilt; its indexes are recreated by the startup index check.
+"""
+from services.migrations import table_rows
+
+VERSION = 5
+NAME = 'election id autoincrement'
+
+
+def _create_sql(conn):
+    return conn.exec_driver_sql(
+        "SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'election'"
+    ).scalar() or ''
+
+
+def upgrade(conn):
+    sql = _create_sql(conn)
+    if not sql or 'AUTOINCREMENT' in sql.upper():
+        return
+    conn.exec_driver_sql(
+        'CREATE TABLE election_new ('
+        ' id INTEGER NOT NULL PRIMARY KEY AUTOINCREMENT,'
+        ' title VARCHAR(255) NOT NULL,'
+        ' description TEXT,'
+        ' start_date DATE NOT NULL,'
+        ' end_date DATE NOT NULL,'
+        ' positions VARCHAR(255),'
+        ' status VARCHAR(50) NOT NULL)'
+    )
+    # copying the rows sets sqlite_sequence to the highest id still present
+    conn.exec_driver_sql(
+        'INSERT INTO election_new (id, title, description, start_date, end_date, positions, status)'
+        ' SELECT id, title, description, start_date, end_date, positions, status FROM election'
+    )
+    conn.exec_driver_sql('DROP TABLE election')
+    conn.exec_driver_sql('ALTER TABLE election_new RENAME TO election')
+
+
+def estimate(conn):
+    sql = _create_sql(conn)
+    return table_rows(conn, 'election') if sql and 'AUTOINCREMENT' not in sql.upper() else 0
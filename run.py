@@ -1,19 +1,187 @@
+import csv
+import gc
+import json
 import os
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
+import secrets
+import time
+import click
+from concurrent.futures import TimeoutError as FutureTimeout
+from datetime import datetime
+from flask import (
+    Flask, Response, g, render_template, request, redirect, url_for, flash, session, jsonify, send_from_directory,
+    stream_with_context,
+)
 from flask_sqlalchemy import SQLAlchemy
+from jinja2 import FileSystemBytecodeCache
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import joinedload, selectinload
 from werkzeug.security import generate_password_hash, check_password_hash
-from werkzeug.utils import secure_filename
 
-app = Flask(__name__)
-app.secret_key = os.environ.get('FLASK_SECRET', 'dev-secret')
+from services.assets import StaticAssets, build as build_assets, load_manifest, up_to_date
+from services.audit import AuditError, AuditLog, log_entries, make_record, verify_entries
+from services.ballot_cache import BallotCache, CandidateView, ElectionView, make_definition
+from services.admission import AdmissionController, RouteClass
+from services.broadcast import ResultsBroker, format_sse
+from services.cache_stamp import CacheStamp
+from services.database import DEFAULT_PRAGMAS, READER_BIND, RoutingSession, configure_sqlite, install_sqlite_tuning
+from services.exports import FORMATS as EXPORT_FORMATS, ExportError, export_chunks, gzip_chunks, iter_rows, jsonl_chunks
+from services.group_commit import GroupCommitQueue, QueueFull
+from services.jobs import JobQueue
+from services.metrics import Registry, instrument_app
+from services.nplusone import install_detector
+from services.migrations import (
+    VERSION_TABLE, apply_migrations, backup_database, current_version, default_backup_path, pending, plan,
+    schema_fingerprint, stamp, store_fingerprint, stored_fingerprint,
+)
+from services.page_cache import PageCache
+from services.pagination import decode_cursor, encode_cursor, escape_like, seek
+from services.passwords import PasswordService, PasswordServiceBusy
+from services.photos import VARIANT_WIDTHS, PhotoError, PhotoStore
+from services.roster import RosterError, import_roster, iter_roster
+from services.tally import rank_position
+from services.voted import VotedBitmap
+from services.voter_tokens import VoterTokens
+from migrations import MIGRATIONS
 
-# Database config: use instance folder for sqlite file
+app = Flask(__name__)
 os.makedirs(app.instance_path, exist_ok=True)
-db_path = os.path.join(app.instance_path, 'app.db')
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///' + db_path
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
-db = SQLAlchemy(app)
+
+def instance_secret(path):
+    """A random key kept in `path`, made on first use; every process on this machine reads the same one."""
+    try:
+        with open(path, encoding='ascii') as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        pass
+    tmp = f'{path}.{os.getpid()}.part'
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, 'w', encoding='ascii') as f:
+        f.write(secrets.token_hex(32))
+    try:
+        # link fails if another process got there first; theirs wins
+        os.link(tmp, path)
+    except FileExistsError:
+        pass
+    finally:
+        os.remove(tmp)
+    with open(path, encoding='ascii') as f:
+        return f.read().strip()
+
+
+# signs sessions and voter tokens, which are bearer credentials: never a
+# fixed default. Without FLASK_SECRET each machine makes and keeps its own
+app.secret_key = os.environ.get('FLASK_SECRET') or instance_secret(os.path.join(app.instance_path, 'secret_key'))
+
+# Database config: use instance folder for sqlite file (DATABASE_PATH overrides)
+db_path = os.environ.get('DATABASE_PATH') or os.path.join(app.instance_path, 'app.db')
+app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+# SQLite tuning (see services/database.py): pragmas run on every connection,
+# writer/reader pool sizes, seconds to wait for a pooled connection, and
+# whether plain SELECTs go to a separate read-only engine
+app.config.setdefault('SQLITE_PRAGMAS', dict(DEFAULT_PRAGMAS))
+app.config.setdefault('SQLITE_WRITER_POOL_SIZE', int(os.environ.get('SQLITE_WRITER_POOL_SIZE', 4)))
+app.config.setdefault('SQLITE_READER_POOL_SIZE', int(os.environ.get('SQLITE_READER_POOL_SIZE', 16)))
+app.config.setdefault('SQLITE_POOL_TIMEOUT', float(os.environ.get('SQLITE_POOL_TIMEOUT', 10)))
+app.config.setdefault('SQLITE_READ_REPLICA', os.environ.get('SQLITE_READ_REPLICA', '1') != '0')
+app.config.setdefault('SQLITE_WRITER_BEGIN_IMMEDIATE', True)
+configure_sqlite(app.config, db_path)
+# ballot group-commit tuning: items per transaction, how long to wait for a
+# batch to fill, and how many submissions may be queued before we shed load
+app.config.setdefault('BALLOT_BATCH_SIZE', int(os.environ.get('BALLOT_BATCH_SIZE', 200)))
+app.config.setdefault('BALLOT_BATCH_WAIT', float(os.environ.get('BALLOT_BATCH_WAIT', 0.005)))
+app.config.setdefault('BALLOT_QUEUE_SIZE', int(os.environ.get('BALLOT_QUEUE_SIZE', 10000)))
+app.config.setdefault('BALLOT_SUBMIT_TIMEOUT', float(os.environ.get('BALLOT_SUBMIT_TIMEOUT', 10)))
+# live results stream: seconds to coalesce changes before a push, and how
+# often to send a keep-alive comment to idle clients
+app.config.setdefault('RESULTS_STREAM_WINDOW', float(os.environ.get('RESULTS_STREAM_WINDOW', 0.5)))
+app.config.setdefault('RESULTS_STREAM_HEARTBEAT', float(os.environ.get('RESULTS_STREAM_HEARTBEAT', 15)))
+# worker processes sharing the database (gunicorn.conf.py sets WEB_CONCURRENCY);
+# with more than one, cache invalidations go through a stamp file and live
+# results re-read the counters every RESULTS_STREAM_POLL seconds
+app.config.setdefault('WORKER_PROCESSES', int(os.environ.get('WEB_CONCURRENCY', 1)))
+app.config.setdefault('RESULTS_STREAM_POLL', float(
+    os.environ.get('RESULTS_STREAM_POLL', 2 if app.config['WORKER_PROCESSES'] > 1 else 0)))
+# password hashing: method/cost for new and upgraded hashes, worker processes
+# (default: one per core, 0 = hash on the request thread), how many checks may
+# wait before logins get 503, and how long a login waits for its check
+app.config.setdefault('PASSWORD_HASH_METHOD', os.environ.get('PASSWORD_HASH_METHOD', 'scrypt:32768:8:1'))
+app.config.setdefault('PASSWORD_WORKERS', int(os.environ['PASSWORD_WORKERS']) if os.environ.get('PASSWORD_WORKERS') else None)
+app.config.setdefault('PASSWORD_MAX_PENDING', int(os.environ.get('PASSWORD_MAX_PENDING', 0)) or None)
+app.config.setdefault('PASSWORD_TIMEOUT', float(os.environ.get('PASSWORD_TIMEOUT', 10)))
+# candidate photos: thumbnail widths (px) and WebP/JPEG quality of the variants
+app.config.setdefault('PHOTO_VARIANT_WIDTHS', VARIANT_WIDTHS)
+app.config.setdefault('PHOTO_QUALITY', int(os.environ.get('PHOTO_QUALITY', 80)))
+# static files: url_for('static') points at the fingerprinted, precompressed
+# copies in static/dist (flask --app run build-assets), which create_app()
+# brings up to date at startup unless STATIC_BUILD=0
+app.config.setdefault('STATIC_BUILD', os.environ.get('STATIC_BUILD', '1') != '0')
+# startup: compiled templates are kept in TEMPLATE_CACHE_DIR across restarts
+# ('' = off), and create_app() compiles every template and loads the active
+# elections' ballots before the first request unless WARM_UP=0
+app.config.setdefault('TEMPLATE_CACHE_DIR', os.environ.get('TEMPLATE_CACHE_DIR', os.path.join(app.instance_path, 'jinja-cache')))
+app.config.setdefault('WARM_UP', os.environ.get('WARM_UP', '1') != '0')
+# instrumentation: statements slower than this are logged with their
+# parameters; SERVER_TIMING=1 adds a Server-Timing header to every response
+app.config.setdefault('SLOW_QUERY_MS', float(os.environ.get('SLOW_QUERY_MS', 100)))
+app.config.setdefault('SERVER_TIMING', os.environ.get('SERVER_TIMING', '0') == '1')
+# N+1 detector: log requests that run one SELECT this many times with different
+# ids; on by default for the debug server (python run.py), NPLUSONE_RAISE=1
+# turns the warning into an error
+app.config.setdefault('NPLUSONE_DETECT', os.environ.get('NPLUSONE_DETECT', '1' if __name__ == '__main__' else '0') == '1')
+app.config.setdefault('NPLUSONE_THRESHOLD', int(os.environ.get('NPLUSONE_THRESHOLD', 3)))
+app.config.setdefault('NPLUSONE_RAISE', os.environ.get('NPLUSONE_RAISE', '0') == '1')
+# background admin jobs: rows per write transaction, and seconds to pause
+# between chunks so voters' ballot transactions get the write lock
+app.config.setdefault('JOB_CHUNK_SIZE', int(os.environ.get('JOB_CHUNK_SIZE', 500)))
+app.config.setdefault('JOB_CHUNK_PAUSE', float(os.environ.get('JOB_CHUNK_PAUSE', 0.05)))
+# uploaded rosters wait here for the import job
+app.config.setdefault('IMPORT_DIR', os.environ.get('IMPORT_DIR', os.path.join(app.instance_path, 'imports')))
+# take an online backup before applying schema migrations at startup
+app.config.setdefault('MIGRATION_BACKUP', os.environ.get('MIGRATION_BACKUP', '1') != '0')
+# voter sessions: signed token lifetime (seconds) and the cookie carrying it
+app.config.setdefault('VOTER_TOKEN_TTL', int(os.environ.get('VOTER_TOKEN_TTL', 3600)))
+app.config.setdefault('VOTER_TOKEN_COOKIE', 'voter_token')
+# admission control, per route class: requests in flight at once and seconds
+# a request waits for a slot before it gets the waiting room. New visitors
+# are let in to sign in at ADMISSION_LOGIN_RATE per second (bursts of
+# ADMISSION_LOGIN_BURST; default 20 per core, about what scrypt checks keep
+# up with, 0 = no limit) and the rest queue in the waiting room
+app.config.setdefault('ADMISSION_ENABLED', os.environ.get('ADMISSION_ENABLED', '1') != '0')
+app.config.setdefault('ADMISSION_LOGIN_RATE', float(os.environ.get('ADMISSION_LOGIN_RATE', 20 * (os.cpu_count() or 1))))
+app.config.setdefault('ADMISSION_LOGIN_BURST', float(os.environ.get('ADMISSION_LOGIN_BURST', 0)) or None)
+app.config.setdefault('ADMISSION_LOGIN_IN_FLIGHT', int(os.environ.get('ADMISSION_LOGIN_IN_FLIGHT', 32)))
+app.config.setdefault('ADMISSION_BALLOT_IN_FLIGHT', int(os.environ.get('ADMISSION_BALLOT_IN_FLIGHT', 64)))
+app.config.setdefault('ADMISSION_SUBMIT_IN_FLIGHT', int(os.environ.get('ADMISSION_SUBMIT_IN_FLIGHT', 64)))
+app.config.setdefault('ADMISSION_MAX_WAIT', float(os.environ.get('ADMISSION_MAX_WAIT', 2)))
+# seconds a visitor let in keeps their pass, to fill in and submit the login form
+app.config.setdefault('ADMISSION_PASS_TTL', int(os.environ.get('ADMISSION_PASS_TTL', 300)))
+# rows per page on the admin listings and their JSON APIs
+app.config.setdefault('ADMIN_PAGE_SIZE', int(os.environ.get('ADMIN_PAGE_SIZE', 50)))
+# rendered voter page cache limits
+app.config.setdefault('PAGE_CACHE_MAX_ENTRIES', int(os.environ.get('PAGE_CACHE_MAX_ENTRIES', 256)))
+app.config.setdefault('PAGE_CACHE_MAX_BYTES', int(os.environ.get('PAGE_CACHE_MAX_BYTES', 16 * 1024 * 1024)))
+
+db = SQLAlchemy(app, session_options={'class_': RoutingSession})
+install_sqlite_tuning(app, db)
+
+if app.config['TEMPLATE_CACHE_DIR']:
+    # keyed by template name and source checksum, so an edited template just recompiles
+    os.makedirs(app.config['TEMPLATE_CACHE_DIR'], exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config['TEMPLATE_CACHE_DIR'])
+
+metrics = Registry()
+with app.app_context():
+    instrument_app(
+        app, dict(db.engines), metrics,
+        slow_query_seconds=app.config['SLOW_QUERY_MS'] / 1000.0,
+        server_timing=app.config['SERVER_TIMING'],
+    )
+    if app.config['NPLUSONE_DETECT']:
+        install_detector(
+            app, db.engines.values(),
+            threshold=app.config['NPLUSONE_THRESHOLD'], raise_errors=app.config['NPLUSONE_RAISE'],
+        )
 
 
 class Voter(db.Model):
@@ -27,6 +195,10 @@ class Voter(db.Model):
         return check_password_hash(self.password_hash, password)
 
 
+# case-insensitive name index: serves the admin listing order and prefix search
+db.Index('ix_voter_fullname_nocase', Voter.fullname.collate('NOCASE'), Voter.id)
+
+
 class Admin(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(120), unique=True, nullable=False)
@@ -37,24 +209,41 @@ class Admin(db.Model):
 
 
 class Election(db.Model):
+    # ids are never reused: rows that pointed at a deleted election (ballots
+    # still being removed, the audit log) must not attach to a new one
+    __table_args__ = {'sqlite_autoincrement': True}
     id = db.Column(db.Integer, primary_key=True)
     title = db.Column(db.String(255), nullable=False)
     description = db.Column(db.Text, nullable=True)
-    start_date = db.Column(db.Date, nullable=False)
+    start_date = db.Column(db.Date, nullable=False, index=True)
     end_date = db.Column(db.Date, nullable=False)
     positions = db.Column(db.String(255), nullable=True)
     status = db.Column(db.String(50), nullable=False, default='Draft')
 
+    # the delete_election job unassigns its candidates in one UPDATE
+    candidates = db.relationship('Candidate', back_populates='election', passive_deletes=True)
+
 
 class Candidate(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     full_name = db.Column(db.String(255), nullable=False)
     photo_filename = db.Column(db.String(255), nullable=True)
+    # position title as shown on ballots and results; kept in step with
+    # position_id, which is what queries join on
     position = db.Column(db.String(120), nullable=False)
+    position_id = db.Column(db.Integer, db.ForeignKey('position.id'), nullable=True)
     party = db.Column(db.String(120), nullable=True)
     bio = db.Column(db.Text, nullable=True)
     election_id = db.Column(db.Integer, db.ForeignKey('election.id'), nullable=True)
 
+    election = db.relationship('Election', back_populates='candidates')
+    # `position` is the title column, so the Position row gets a longer name
+    position_record = db.relationship('Position', back_populates='candidates')
+
+
+db.Index('ix_candidate_position_name', Candidate.position, Candidate.full_name, Candidate.id)
+db.Index('ix_candidate_election_position', Candidate.election_id, Candidate.position_id)
+
 
 class Position(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -65,20 +254,872 @@ class Position(db.Model):
     votes_allowed = db.Column(db.Integer, nullable=False, default=1)
     # election assignment removed; candidates now link to elections
 
+    # admin_delete_position clears candidate.position_id itself
+    candidates = db.relationship('Candidate', back_populates='position_record', passive_deletes=True)
+
+
+class Ballot(db.Model):
+    # one row per submitted ballot; the unique index is what enforces
+    # one ballot per voter per election (no read-then-write check)
+    __table_args__ = (
+        db.UniqueConstraint('election_id', 'voter_id', name='uq_ballot_election_voter'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    election_id = db.Column(db.Integer, db.ForeignKey('election.id'), nullable=False)
+    voter_id = db.Column(db.Integer, db.ForeignKey('voter.id'), nullable=False)
+    submitted_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+    election = db.relationship('Election')
+    voter = db.relationship('Voter')
+    selections = db.relationship('BallotSelection', back_populates='ballot')
+
+
+class BallotSelection(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    ballot_id = db.Column(db.Integer, db.ForeignKey('ballot.id'), nullable=False, index=True)
+    candidate_id = db.Column(db.Integer, db.ForeignKey('candidate.id'), nullable=False)
+    position = db.Column(db.String(120), nullable=False)
+
+    ballot = db.relationship('Ballot', back_populates='selections')
+    candidate = db.relationship('Candidate')
+
+
+class TallyCounter(db.Model):
+    # precomputed votes per (election, position, candidate); bumped in the same
+    # transaction that records a ballot so results never scan the ballot table
+    __table_args__ = (
+        db.UniqueConstraint('election_id', 'position', 'candidate_id', name='uq_tally_counter'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    election_id = db.Column(db.Integer, db.ForeignKey('election.id'), nullable=False)
+    position = db.Column(db.String(120), nullable=False)
+    candidate_id = db.Column(db.Integer, db.ForeignKey('candidate.id'), nullable=False)
+    votes = db.Column(db.Integer, nullable=False, default=0)
+
+
+class TurnoutCounter(db.Model):
+    # ballots cast per election, maintained alongside TallyCounter
+    election_id = db.Column(db.Integer, db.ForeignKey('election.id'), primary_key=True)
+    ballots = db.Column(db.Integer, nullable=False, default=0)
+
+
+class VoterCounter(db.Model):
+    # registered voters (one row, id 1), bumped in the transaction that adds
+    # them so results and the dashboard never count the voter table
+    id = db.Column(db.Integer, primary_key=True)
+    voters = db.Column(db.Integer, nullable=False, default=0)
+
+
+def count_new_voters(conn, n):
+    """Add `n` to the registered-voter counter; `conn` is the inserting connection or session."""
+    if not n:
+        return
+    counter = VoterCounter.__table__
+    stmt = sqlite_insert(counter).values(id=1, voters=n)
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=['id'], set_={'voters': counter.c.voters + stmt.excluded.voters},
+    ))
+
+
+def registered_voters():
+    counter = db.session.get(VoterCounter, 1)
+    return counter.voters if counter else 0
+
+
+class Job(db.Model):
+    # slow admin work run by the job worker (services/jobs.py); done/total
+    # is the progress shown while it runs
+    __table_args__ = (
+        db.Index('ix_job_status', 'status', 'id'),
+    )
+    id = db.Column(db.Integer, primary_key=True)
+    kind = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.Text, nullable=True)
+    status = db.Column(db.String(20), nullable=False, default='queued')
+    done = db.Column(db.Integer, nullable=False, default=0)
+    total = db.Column(db.Integer, nullable=True)
+    message = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+
+class AuditLeaf(db.Model):
+    # one per recorded ballot, numbered in commit order (services/audit.py).
+    # Append-only: no foreign keys, so deleting an election leaves its leaves
+    __tablename__ = 'audit_leaf'
+    seq = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    election_id = db.Column(db.Integer, nullable=False)
+    ballot_id = db.Column(db.Integer, nullable=False)
+    record = db.Column(db.Text, nullable=False)
+    leaf = db.Column(db.LargeBinary, nullable=False)
+
+
+class AuditNode(db.Model):
+    # root of each complete subtree of 2**level leaves, stored as it completes
+    __tablename__ = 'audit_node'
+    level = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    idx = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    hash = db.Column(db.LargeBinary, nullable=False)
+
+
+class AuditCheckpoint(db.Model):
+    # tree size and root after each ballot batch, chained to the one before
+    __tablename__ = 'audit_checkpoint'
+    size = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    root = db.Column(db.LargeBinary, nullable=False)
+    chain = db.Column(db.LargeBinary, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+
+
+def upgrade_database(backup=None):
+    """Bring the schema up to date: versioned migrations, then new tables/indexes.
+
+    A brand-new database is built by create_all and stamped with the latest
+    migration version. An existing one gets its pending migrations in one
+    transaction, after an online backup when `backup` (default
+    MIGRATION_BACKUP) is on. Returns the list of applied (migration, seconds).
+
+    When the stored schema fingerprint matches the models and no migration
+    is pending (every boot after the first), this is two small reads.
+    """
+    if backup is None:
+        backup = app.config['MIGRATION_BACKUP']
+    fingerprint = schema_fingerprint(db.metadata)
+    with app.app_context():
+        with db.engine.connect() as conn:
+            if stored_fingerprint(conn) == fingerprint and not pending(conn, MIGRATIONS):
+                return []
+            tables = set(db.inspect(conn).get_table_names()) - {VERSION_TABLE}
+            todo = pending(conn, MIGRATIONS) if tables else []
+        applied = []
+        if not tables:
+            db.create_all()
+            stamp(db.engine, MIGRATIONS)
+        elif todo:
+            if backup:
+                path = default_backup_path(db_path, todo[0].version - 1)
+                print(f'Backing up database to {path}')
+                backup_database(db_path, path)
+            applied = apply_migrations(db.engine, MIGRATIONS)
+        # create_all skips existing tables, so add tables and indexes declared since then
+        db.create_all()
+        for table in db.metadata.sorted_tables:
+            for index in table.indexes:
+                index.create(db.engine, checkfirst=True)
+        with db.engine.begin() as conn:
+            store_fingerprint(conn, fingerprint)
+        return applied
 
 
 def create_db_and_default_admin():
     """Create DB tables and a default admin account if missing."""
     with app.app_context():
-        db.create_all()
+        upgrade_database()
         default_username = 'admin'
         default_password = 'admin'
         admin = Admin.query.filter_by(username=default_username).first()
         if not admin:
-            admin = Admin(username=default_username, password_hash=generate_password_hash(default_password))
+            admin = Admin(
+                username=default_username,
+                password_hash=generate_password_hash(default_password, method=app.config['PASSWORD_HASH_METHOD']),
+            )
             db.session.add(admin)
             db.session.commit()
             print(f"Created default admin -> username: {default_username} password: {default_password}")
+        requeued = job_queue.recover(db.engine)
+        if requeued:
+            print(f'Requeued {requeued} interrupted background job(s)')
+
+
+password_service = PasswordService(
+    method=app.config['PASSWORD_HASH_METHOD'],
+    workers=app.config['PASSWORD_WORKERS'],
+    max_pending=app.config['PASSWORD_MAX_PENDING'],
+    timeout=app.config['PASSWORD_TIMEOUT'],
+)
+
+
+def check_account_password(account, password):
+    """Verify a Voter/Admin password on the password workers.
+
+    On success a hash stored with an older method or cost is replaced with
+    one using PASSWORD_HASH_METHOD. Raises PasswordServiceBusy when the
+    workers are saturated.
+    """
+    model, account_id, pwhash = type(account), account.id, account.password_hash
+    # don't hold a pooled connection while the hash is being checked
+    db.session.rollback()
+    ok, new_hash = password_service.verify(pwhash, password)
+    if ok and new_hash:
+        # only replace the hash we checked, in case it changed meanwhile
+        model.query.filter_by(id=account_id, password_hash=pwhash).update({'password_hash': new_hash})
+        db.session.commit()
+    return ok
+
+
+@app.errorhandler(PasswordServiceBusy)
+def password_service_busy(e):
+    return 'The server is busy signing people in. Please try again in a few seconds.', 503, {'Retry-After': '2'}
+
+
+def _record_ballot(conn, item):
+    """Insert one ballot and its selections. Runs on the ballot writer thread.
+
+    Returns the new ballot id, or None when the voter already has a ballot for
+    the election (the unique index turns the insert into a no-op).
+    """
+    ballot_id = conn.execute(
+        sqlite_insert(Ballot.__table__)
+        .values(election_id=item['election_id'], voter_id=item['voter_id'], submitted_at=item['submitted_at'])
+        .on_conflict_do_nothing(index_elements=['election_id', 'voter_id'])
+        .returning(Ballot.__table__.c.id)
+    ).scalar()
+    if ballot_id is None:
+        return None
+    conn.execute(BallotSelection.__table__.insert(), [
+        {'ballot_id': ballot_id, 'candidate_id': candidate_id, 'position': position}
+        for position, candidate_id in item['selections']
+    ])
+
+    # bump the precomputed tallies in the same transaction
+    tally = TallyCounter.__table__
+    stmt = sqlite_insert(tally).values([
+        {'election_id': item['election_id'], 'position': position, 'candidate_id': candidate_id, 'votes': 1}
+        for position, candidate_id in item['selections']
+    ])
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=['election_id', 'position', 'candidate_id'],
+        set_={'votes': tally.c.votes + stmt.excluded.votes},
+    ))
+    turnout = TurnoutCounter.__table__
+    stmt = sqlite_insert(turnout).values(election_id=item['election_id'], ballots=1)
+    conn.execute(stmt.on_conflict_do_update(
+        index_elements=['election_id'],
+        set_={'ballots': turnout.c.ballots + stmt.excluded.ballots},
+    ))
+    return ballot_id
+
+
+def results_snapshot(election_id):
+    """Current tally and turnout counters for the live results stream."""
+    with app.app_context():
+        counts = (
+            db.session.query(TallyCounter.candidate_id, db.func.sum(TallyCounter.votes))
+            .filter(TallyCounter.election_id == election_id)
+            .group_by(TallyCounter.candidate_id)
+            .all()
+        )
+        turnout = TurnoutCounter.query.get(election_id)
+        return {
+            'ballots': turnout.ballots if turnout else 0,
+            'candidates': {str(cid): int(votes) for cid, votes in counts},
+        }
+
+
+results_broker = ResultsBroker(
+    results_snapshot, window=app.config['RESULTS_STREAM_WINDOW'], poll=app.config['RESULTS_STREAM_POLL'],
+)
+
+
+audit_log = AuditLog(AuditLeaf.__table__, AuditNode.__table__, AuditCheckpoint.__table__)
+
+
+def _audit_batch(conn, pairs):
+    # the batch's ballots go into the audit log in the transaction that records them
+    recorded = [(item, ballot_id) for item, ballot_id in pairs if ballot_id is not None]
+    appended = audit_log.append(
+        conn,
+        [(item['election_id'], ballot_id, item['audit_record']) for item, ballot_id in recorded],
+        now=datetime.utcnow(),
+    )
+    for (item, _), (seq, leaf) in zip(recorded, appended):
+        item['receipt'] = {'index': seq, 'leaf': leaf.hex()}
+
+
+def _ballots_committed(pairs):
+    for item, ballot_id in pairs:
+        if ballot_id is not None:
+            voted.add(item['election_id'], item['voter_id'])
+    # one notification per election per batch; the broker coalesces further
+    for election_id in {item['election_id'] for item, ballot_id in pairs if ballot_id is not None}:
+        results_broker.mark_dirty(election_id)
+
+
+ballot_queue = GroupCommitQueue(
+    _record_ballot,
+    max_batch=app.config['BALLOT_BATCH_SIZE'],
+    max_wait=app.config['BALLOT_BATCH_WAIT'],
+    maxsize=app.config['BALLOT_QUEUE_SIZE'],
+    name='ballot-writer',
+    on_commit=_ballots_committed,
+    on_batch=_audit_batch,
+)
+
+
+def get_ballot_queue():
+    # the writer thread needs the engine, which is only reachable inside an app context
+    if not ballot_queue.running:
+        ballot_queue.start(db.engine)
+    return ballot_queue
+
+
+def election_results(election_id):
+    """Ranked results for an election, read from the tally counters.
+
+    The cost depends on the number of candidates, not on turnout.
+    """
+    rows = (
+        db.session.query(
+            Candidate.id, Candidate.full_name, Candidate.party,
+            db.func.coalesce(Position.title, Candidate.position), Position.max_winners,
+            db.func.coalesce(db.func.sum(TallyCounter.votes), 0),
+        )
+        .outerjoin(Position, Position.id == Candidate.position_id)
+        .outerjoin(TallyCounter, db.and_(
+            TallyCounter.candidate_id == Candidate.id,
+            TallyCounter.election_id == election_id,
+        ))
+        .filter(Candidate.election_id == election_id)
+        .group_by(Candidate.id)
+        # keep positions in the order they were created in the admin
+        .order_by(Position.id.is_(None), Position.id, Candidate.position)
+        .all()
+    )
+    by_position = {}
+    max_winners = {}
+    for cid, full_name, party, position, winners, votes in rows:
+        position = position or 'Other'
+        by_position.setdefault(position, []).append(
+            {'id': cid, 'full_name': full_name, 'party': party, 'votes': int(votes)}
+        )
+        max_winners.setdefault(position, int(winners or 1))
+
+    positions = []
+    for title, candidates in by_position.items():
+        limit = max_winners[title]
+        positions.append({
+            'title': title,
+            'max_winners': limit,
+            'candidates': rank_position(candidates, limit),
+        })
+
+    turnout = TurnoutCounter.query.get(election_id)
+    return {
+        'election_id': election_id,
+        'ballots': turnout.ballots if turnout else 0,
+        'registered': registered_voters(),
+        'positions': positions,
+    }
+
+
+def rebuild_tally(election_id=None, write=True):
+    """Recompute tally and turnout counters from the raw ballots.
+
+    Returns a list of (election_id, position, candidate_id, counted, stored)
+    for every counter that disagreed with the ballots (candidate_id is None
+    for turnout). With write=False nothing is changed.
+    """
+    where = 'WHERE b.election_id = :eid' if election_id else ''
+    params = {'eid': election_id} if election_id else {}
+    counted = {
+        (eid, pos, cid): n for eid, pos, cid, n in db.session.execute(db.text(
+            'SELECT b.election_id, s.position, s.candidate_id, COUNT(*) '
+            'FROM ballot_selection s JOIN ballot b ON b.id = s.ballot_id '
+            f'{where} GROUP BY b.election_id, s.position, s.candidate_id'
+        ), params)
+    }
+    counted.update({
+        (eid, None, None): n for eid, n in db.session.execute(db.text(
+            f'SELECT b.election_id, COUNT(*) FROM ballot b {where} GROUP BY b.election_id'
+        ), params)
+    })
+
+    counter_q = TallyCounter.query
+    turnout_q = TurnoutCounter.query
+    if election_id:
+        counter_q = counter_q.filter_by(election_id=election_id)
+        turnout_q = turnout_q.filter_by(election_id=election_id)
+    stored = {(c.election_id, c.position, c.candidate_id): c.votes for c in counter_q}
+    stored.update({(t.election_id, None, None): t.ballots for t in turnout_q})
+
+    mismatches = [
+        key + (counted.get(key, 0), stored.get(key, 0))
+        for key in sorted(set(counted) | set(stored), key=str)
+        if counted.get(key, 0) != stored.get(key, 0)
+    ]
+
+    db.session.rollback()
+    if write and mismatches:
+        # delete first so the write lock is held while the counts are re-read;
+        # a ballot committed meanwhile is then either fully in or fully out
+        counter_q.delete(synchronize_session=False)
+        turnout_q.delete(synchronize_session=False)
+        db.session.execute(db.text(
+            'INSERT INTO tally_counter (election_id, position, candidate_id, votes) '
+            'SELECT b.election_id, s.position, s.candidate_id, COUNT(*) '
+            'FROM ballot_selection s JOIN ballot b ON b.id = s.ballot_id '
+            f'{where} GROUP BY b.election_id, s.position, s.candidate_id'
+        ), params)
+        db.session.execute(db.text(
+            'INSERT INTO turnout_counter (election_id, ballots) '
+            f'SELECT b.election_id, COUNT(*) FROM ballot b {where} GROUP BY b.election_id'
+        ), params)
+        db.session.commit()
+    return mismatches
+
+
+@app.cli.command('rebuild-tally')
+@click.option('--election', 'election_id', type=int, default=None, help='Only this election id.')
+@click.option('--check', is_flag=True, help='Report mismatches without rewriting the counters.')
+def rebuild_tally_command(election_id, check):
+    """Recompute tally counters from raw ballots (flask --app run rebuild-tally)."""
+    mismatches = rebuild_tally(election_id, write=not check)
+    for eid, pos, cid, counted, stored in mismatches:
+        what = 'turnout' if cid is None else f'{pos} / candidate {cid}'
+        click.echo(f'election {eid}: {what}: ballots={counted} counter={stored}')
+    if not mismatches:
+        click.echo('Tally counters match the ballots.')
+    elif check:
+        click.echo(f'{len(mismatches)} counter(s) out of date; run without --check to fix.')
+        raise SystemExit(1)
+    else:
+        click.echo(f'Rebuilt {len(mismatches)} counter(s).')
+
+
+
+@app.cli.command('build-photo-variants')
+def build_photo_variants_command():
+    """Make thumbnails/WebP variants for photos uploaded before the pipeline existed."""
+    with app.app_context():
+        names = [n for (n,) in db.session.query(Candidate.photo_filename).distinct() if n]
+    futures = [(n, photo_store.schedule(n)) for n in names if os.path.exists(photo_store.path(n))]
+    for name, future in futures:
+        if future is None:
+            continue
+        try:
+            future.result()
+            click.echo(f'{name}: done')
+        except Exception as e:
+            click.echo(f'{name}: {e}')
+    click.echo(f'{len(names)} photo(s) checked.')
+
+@app.cli.command('migrate')
+@click.option('--dry-run', is_flag=True, help='Show pending migrations and estimated times; change nothing.')
+@click.option('--backup/--no-backup', default=True, show_default=True, help='Online backup before migrating.')
+@click.option('--backup-path', type=click.Path(dir_okay=False), default=None, help='Where to write the backup.')
+def migrate_command(dry_run, backup, backup_path):
+    """Apply pending schema migrations (flask --app run migrate)."""
+    with app.app_context():
+        with db.engine.connect() as conn:
+            report = plan(conn, MIGRATIONS)
+            version = current_version(conn)
+    click.echo(f"Schema version {report['current_version']}, latest {report['target_version']}.")
+    if not report['steps']:
+        click.echo('Nothing to migrate.')
+        return
+    for step in report['steps']:
+        click.echo(f"  {step['version']:04d} {step['name']}: ~{step['rows']} row(s), ~{step['seconds']:.2f}s")
+    click.echo(f"Writers blocked for ~{report['lock_seconds']:.2f}s (readers are not blocked in WAL mode).")
+    if backup:
+        click.echo(f"Backup: {report['backup_bytes'] / 1048576:.1f} MB, ~{report['backup_seconds']:.1f}s, online.")
+    if dry_run:
+        return
+    if backup:
+        path = backup_path or default_backup_path(db_path, version)
+        click.echo(f'Backing up database to {path}')
+        backup_database(db_path, path)
+    applied = upgrade_database(backup=False)
+    for m, seconds in applied:
+        click.echo(f'Applied {m.version:04d} {m.name} in {seconds:.2f}s')
+
+
+def load_ballot_definition(election_id):
+    """Load an election's ballot (candidates grouped by position, limits) for the cache."""
+    # two indexed queries whatever the ballot size: the election by id, then
+    # its candidates (candidate(election_id, position_id)) joined to their
+    # position for the title and vote limit
+    election = db.session.get(Election, election_id, options=[
+        selectinload(Election.candidates).joinedload(Candidate.position_record),
+    ])
+    if not election:
+        return None
+
+    # positions in the order they were created in the admin, then by name
+    candidates = sorted(election.candidates, key=lambda c: (
+        c.position_record is None, c.position_id or 0, c.position, c.full_name,
+    ))
+    positions = {}
+    # mapping of position title -> votes a voter may cast (default 1);
+    # used by both the vote page and voter_submit_votes
+    position_limits = {}
+    for c in candidates:
+        pos = c.position_record
+        pos_title = (pos.title if pos else c.position) or 'Other'
+        positions.setdefault(pos_title, []).append(
+            CandidateView(c.id, c.full_name, c.party, c.photo_filename, pos_title)
+        )
+        if pos and pos.votes_allowed:
+            position_limits.setdefault(pos_title, int(pos.votes_allowed))
+
+    view = ElectionView(
+        election.id, election.title, election.description,
+        election.start_date, election.end_date, election.status,
+    )
+    return make_definition(view, positions.items(), position_limits)
+
+
+ballot_cache = BallotCache(load_ballot_definition)
+page_cache = PageCache(
+    max_entries=app.config['PAGE_CACHE_MAX_ENTRIES'],
+    max_bytes=app.config['PAGE_CACHE_MAX_BYTES'],
+)
+
+
+cache_stamp = CacheStamp(db_path + '.cache-stamp') if app.config['WORKER_PROCESSES'] > 1 else None
+
+
+if cache_stamp is not None:
+    @app.before_request
+    def _sync_worker_caches():
+        # another worker changed something: its ids aren't known here, so drop everything
+        if cache_stamp.changed():
+            ballot_cache.invalidate()
+            page_cache.bump()
+
+
+def invalidate_ballots(*election_ids):
+    """Drop cached ballots (all of them without ids) and every rendered voter page."""
+    ballot_cache.invalidate(*election_ids)
+    page_cache.bump()
+    if cache_stamp is not None:
+        cache_stamp.bump()
+
+
+voter_tokens = VoterTokens(app.secret_key, ttl=app.config['VOTER_TOKEN_TTL'])
+
+
+def _voters_with_ballots(election_id):
+    # one pass over the (election_id, voter_id) unique index
+    with db.engine.connect() as conn:
+        for (voter_id,) in conn.execute(db.select(Ballot.voter_id).where(Ballot.election_id == election_id)):
+            yield voter_id
+
+
+voted = VotedBitmap(_voters_with_ballots)
+
+
+def current_voter():
+    """The signed-in voter's VoterToken (id, grade, expiry), checked without a query."""
+    if 'voter' not in g:
+        g.voter = voter_tokens.verify(request.cookies.get(app.config['VOTER_TOKEN_COOKIE']))
+    return g.voter
+
+
+admission = AdmissionController([
+    RouteClass('login', app.config['ADMISSION_LOGIN_IN_FLIGHT'], rate=app.config['ADMISSION_LOGIN_RATE'],
+               burst=app.config['ADMISSION_LOGIN_BURST'], max_wait=app.config['ADMISSION_MAX_WAIT']),
+    RouteClass('ballot', app.config['ADMISSION_BALLOT_IN_FLIGHT'], max_wait=app.config['ADMISSION_MAX_WAIT']),
+    RouteClass('submit', app.config['ADMISSION_SUBMIT_IN_FLIGHT'], max_wait=app.config['ADMISSION_MAX_WAIT']),
+])
+
+ADMISSION_ROUTES = {
+    'voter_login': 'login',
+    'voter_select': 'ballot',
+    'voter_vote': 'ballot',
+    'voter_submit_votes': 'submit',
+}
+
+
+def waiting_room(position, retry_after):
+    """The waiting-room page (JSON for the ballot API), refreshing after retry_after seconds."""
+    headers = {'Retry-After': str(retry_after), 'Cache-Control': 'no-store'}
+    if request.is_json:
+        return jsonify({
+            'success': False, 'message': 'Server is busy, please try again in a moment',
+            'retry_after': retry_after,
+        }), 503, headers
+    # a refused sign-in comes back to the login form rather than repeating the POST
+    again = request.url if request.method == 'GET' else url_for('voter_login')
+    return render_template('voter/waiting_room.html', position=position, retry_after=retry_after,
+                           again=again), 503, headers
+
+
+if app.config['ADMISSION_ENABLED']:
+    @app.before_request
+    def _admit():
+        route_class = ADMISSION_ROUTES.get(request.endpoint)
+        if route_class is None:
+            return None
+        # voters who have signed in, or were let in to, are already past the door
+        if route_class == 'login' and current_voter() is None and session.get('room_pass', 0) < time.time():
+            decision = admission.check_in('login', session.get('room_ticket'))
+            if not decision.admitted:
+                session['room_ticket'] = decision.ticket
+                return waiting_room(decision.position, decision.retry_after)
+            session.pop('room_ticket', None)
+            session['room_pass'] = int(time.time()) + app.config['ADMISSION_PASS_TTL']
+        if not admission.enter(route_class):
+            return waiting_room(None, 1)
+        g.admitted = route_class
+        return None
+
+    @app.teardown_request
+    def _leave(exc):
+        route_class = g.pop('admitted', None)
+        if route_class is not None:
+            admission.leave(route_class)
+
+
+def cached_page(key, render):
+    """Serve a voter page from the render cache.
+
+    `render` is only called on a miss and may return a redirect instead of
+    HTML, which is passed through uncached. Repeat visits that send the
+    page's ETag get 304 Not Modified.
+    """
+    entry = page_cache.get(key)
+    if entry is None:
+        version = page_cache.version
+        rv = render()
+        if not isinstance(rv, str):
+            return rv
+        entry = page_cache.put(key, rv, version)
+    resp = Response(entry.body, mimetype='text/html')
+    resp.set_etag(entry.etag)
+    # shared caches may keep the page but must revalidate it every time
+    resp.headers['Cache-Control'] = 'public, no-cache'
+    return resp.make_conditional(request)
+
+
+def _photo_variants_ready(filename):
+    # pages rendered before the thumbnails existed point at the full-size photo
+    page_cache.bump()
+    if cache_stamp is not None:
+        cache_stamp.bump()
+
+
+photo_store = PhotoStore(
+    os.path.join(app.static_folder, 'uploads', 'candidates'),
+    widths=app.config['PHOTO_VARIANT_WIDTHS'],
+    quality=app.config['PHOTO_QUALITY'],
+    on_ready=_photo_variants_ready,
+)
+
+
+static_assets = StaticAssets(app.static_folder)
+static_assets.init_app(app)
+static_assets.load(load_manifest(app.static_folder))
+
+
+def build_static_assets():
+    """Rebuild static/dist for files changed since the last build and serve the result."""
+    manifest = build_assets(app.static_folder, quality=app.config['PHOTO_QUALITY'])
+    static_assets.load(manifest)
+    return manifest
+
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Fingerprint and precompress the static files (flask --app run build-assets)."""
+    manifest = build_static_assets()
+    dist = os.path.join(app.static_folder, 'dist')
+    before = after = 0
+    for source, target in sorted(manifest['files'].items()):
+        size = os.path.getsize(os.path.join(app.static_folder, source))
+        best = min(
+            [os.path.getsize(os.path.join(app.static_folder, target))]
+            + [os.path.getsize(os.path.join(app.static_folder, f'{target}.{v}')) for v in manifest['variants'].get(target, ())]
+        )
+        before += size
+        after += best
+        click.echo(f'{source:40} {size:>9} -> {best:>9}  {target}')
+    click.echo(f'{len(manifest["files"])} file(s) in {dist}: {before} bytes, {after} bytes in the smallest variants.')
+
+
+@app.route('/media/candidates/<path:filename>')
+def candidate_photo(filename):
+    # file names are content hashes (or timestamped for older uploads), so a
+    # given URL never changes and browsers may keep it forever
+    resp = send_from_directory(photo_store.root, filename, max_age=31536000)
+    resp.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return resp
+
+
+@app.template_global()
+def photo_srcset(filename, ext):
+    """srcset value for a candidate photo's variants ('' until they exist)."""
+    return ', '.join(
+        f"{url_for('candidate_photo', filename=name)} {width}w"
+        for width, name in photo_store.variants(filename, ext)
+    )
+
+
+def release_photo(filename, keep_id=None):
+    """Delete a photo and its variants unless another candidate still uses it."""
+    if not filename:
+        return
+    others = Candidate.query.filter(Candidate.photo_filename == filename)
+    if keep_id is not None:
+        others = others.filter(Candidate.id != keep_id)
+    if others.first() is None:
+        photo_store.delete(filename)
+
+
+job_queue = JobQueue(
+    Job.__table__,
+    chunk_size=app.config['JOB_CHUNK_SIZE'],
+    pause=app.config['JOB_CHUNK_PAUSE'],
+    context=app.app_context,
+    name='admin-jobs',
+)
+
+
+def get_job_queue():
+    # like the ballot writer, the worker thread starts on first use
+    if not job_queue.running:
+        job_queue.start(db.engine, reader=db.engines.get(READER_BIND))
+    return job_queue
+
+
+def enqueue_job(kind, **params):
+    return get_job_queue().enqueue(db.engine, kind, **params)
+
+
+@job_queue.handler('delete_election')
+def delete_election_job(job, election_id):
+    """Delete an election with its ballots and counters; its candidates are unassigned."""
+    elections = Election.__table__
+    ballots = Ballot.__table__
+    selections = BallotSelection.__table__
+    tallies = TallyCounter.__table__
+    turnout = TurnoutCounter.__table__
+    of_ballots = selections.c.ballot_id.in_(db.select(ballots.c.id).where(ballots.c.election_id == election_id))
+    steps = [
+        (selections, of_ballots),
+        (ballots, ballots.c.election_id == election_id),
+        (tallies, tallies.c.election_id == election_id),
+        (turnout, turnout.c.election_id == election_id),
+    ]
+    job.progress(0, total=1 + sum(job.count(table, where) for table, where in steps), message='Closing the election')
+    # the election row goes first, so from here on its ballot is gone from
+    # the cache and new submissions for it are refused. Election ids are
+    # AUTOINCREMENT, so no new election can take this id while the rest of
+    # its rows are deleted
+    with db.engine.begin() as conn:
+        conn.execute(elections.delete().where(elections.c.id == election_id))
+        conn.execute(
+            Candidate.__table__.update().where(Candidate.__table__.c.election_id == election_id).values(election_id=None)
+        )
+        job.progress(1, message='Deleting ballots', conn=conn)
+    invalidate_ballots(election_id)
+    voted.forget(election_id)
+    removed = 0
+    for table, where in steps:
+        removed += job.delete_chunks(table, where)
+    # a request for this id during the chunks may have loaded the ballots not yet deleted
+    voted.forget(election_id)
+    return f'Election deleted ({removed} ballot and counter rows removed)'
+
+
+@job_queue.handler('delete_candidate')
+def delete_candidate_job(job, candidate_id):
+    """Delete a candidate, then its photo files if no other candidate uses them."""
+    candidate = db.session.get(Candidate, candidate_id)
+    if candidate is None:
+        return 'Candidate already deleted'
+    election_id, photo = candidate.election_id, candidate.photo_filename
+    job.progress(0, total=2, message='Deleting candidate')
+    db.session.delete(candidate)
+    db.session.commit()
+    invalidate_ballots(election_id)
+    job.progress(1, message='Removing photo files')
+    release_photo(photo)
+    job.progress(2)
+    return 'Candidate deleted'
+
+
+@app.cli.command('run-jobs')
+def run_jobs_command():
+    """Run queued background jobs in this process until none are left."""
+    with app.app_context():
+        ran = job_queue.run_pending(db.engine, reader=db.engines.get(READER_BIND))
+    click.echo(f'Ran {ran} job(s).')
+
+
+@app.route('/admin/jobs/<int:job_id>')
+def admin_job_status(job_id):
+    # polled by partials/job_progress.html; also wakes the worker after a restart
+    job = get_job_queue().get(db.engine, job_id)
+    if job is None:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job})
+
+
+def validate_selections(ballot, selections):
+    """Check submitted selections against the election's cached ballot.
+
+    `selections` maps position title -> candidate id or list of ids.
+    Returns (pairs, error) where pairs is a list of (position, candidate_id).
+    """
+    if not isinstance(selections, dict):
+        return None, 'Invalid selections'
+    candidates = ballot.candidate_positions
+    limits = ballot.limits
+
+    pairs = []
+    for position, chosen in selections.items():
+        if not isinstance(chosen, list):
+            chosen = [chosen]
+        seen = set()
+        for raw_id in chosen:
+            try:
+                candidate_id = int(raw_id)
+            except (ValueError, TypeError):
+                return None, 'Invalid candidate selected'
+            if candidates.get(candidate_id) != position:
+                return None, f'Candidate {candidate_id} is not running for {position} in this election'
+            if candidate_id in seen:
+                return None, f'Duplicate selection for {position}'
+            seen.add(candidate_id)
+            pairs.append((position, candidate_id))
+        allowed = limits.get(position, 1)
+        if len(seen) > allowed:
+            return None, f'You may select up to {allowed} candidate(s) for {position}'
+    if not pairs:
+        return None, 'No candidates selected'
+    return pairs, None
+
+
+metrics.callback('ballot_queue_depth', 'Ballots waiting for the group-commit writer.', lambda: ballot_queue.qsize())
+metrics.callback('results_stream_subscribers', 'Open live-results streams.', lambda: results_broker.subscriber_count())
+metrics.callback('voted_bitmap_bytes', 'Memory held by the already-voted bitmaps.', lambda: voted.memory_bytes())
+for route_class in admission.classes:
+    for state, help in [('in_flight', 'Requests being served'), ('room', 'Visitors holding a waiting-room ticket')]:
+        metrics.callback(f'admission_{route_class}_{state}', f'{help} ({route_class}).',
+                         lambda c=route_class, k=state: admission.stats()[c][k])
+    for state, help in [('admitted', 'Requests admitted'), ('queued', 'Waiting-room tickets issued'),
+                        ('shed', 'Requests shed after waiting for a slot')]:
+        metrics.callback(f'admission_{route_class}_{state}_total', f'{help} ({route_class}).',
+                         lambda c=route_class, k=state: admission.stats()[c][k], kind='counter')
+for name, help, read in [
+    ('ballot_batches_total', 'Group-commit transactions written.', lambda: ballot_queue.batches),
+    ('password_checks_shed_total', 'Logins refused because the password workers were full.',
+     lambda: password_service.shed),
+    ('ballot_cache_hits_total', 'Ballot definitions served from memory.', lambda: ballot_cache.hits),
+    ('ballot_cache_misses_total', 'Ballot definitions loaded from the database.', lambda: ballot_cache.misses),
+    ('page_cache_hits_total', 'Voter pages served from the render cache.', lambda: page_cache.hits),
+    ('page_cache_misses_total', 'Voter pages rendered.', lambda: page_cache.misses),
+    ('jobs_completed_total', 'Background jobs finished.', lambda: job_queue.completed),
+    ('jobs_failed_total', 'Background jobs that failed.', lambda: job_queue.failed),
+]:
+    metrics.callback(name, help, read, kind='counter')
+
+
+@app.route('/metrics')
+def metrics_endpoint():
+    # Prometheus text exposition format
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 
 @app.route('/', methods=['GET', 'POST'])
@@ -90,11 +1131,22 @@ def voter_login():
             flash('Please provide school ID and password')
             return redirect(url_for('voter_login'))
         voter = Voter.query.filter_by(school_id=school_id).first()
-        if not voter or not voter.check_password(password):
+        if not voter:
+            flash('Invalid school ID or password')
+            return redirect(url_for('voter_login'))
+        voter_id, grade = voter.id, voter.grade
+        if not check_account_password(voter, password):
             flash('Invalid school ID or password')
             return redirect(url_for('voter_login'))
         flash('Voter logged in successfully')
-        return redirect(url_for('voter_select'))
+        resp = redirect(url_for('voter_select'))
+        # later voter requests read who this is from the signed token alone
+        resp.set_cookie(
+            app.config['VOTER_TOKEN_COOKIE'], voter_tokens.issue(voter_id, grade),
+            max_age=app.config['VOTER_TOKEN_TTL'], httponly=True, samesite='Lax',
+            secure=app.config['SESSION_COOKIE_SECURE'],
+        )
+        return resp
     return render_template('voter/login.html')
 
 
@@ -121,9 +1173,11 @@ def voter_register():
             school_id=school_id,
             fullname=fullname,
             grade=grade,
-            password_hash=generate_password_hash(password),
+            password_hash=password_service.hash(password),
         )
         db.session.add(voter)
+        db.session.flush()
+        count_new_voters(db.session, 1)
         db.session.commit()
         flash('Registration successful. You can now log in.')
         return redirect(url_for('voter_login'))
@@ -144,43 +1198,32 @@ def voter_vote():
         flash('Invalid election selected')
         return redirect(url_for('voter_select'))
 
-    election = Election.query.get(election_id_int)
-    if not election:
+    voter = current_voter()
+    if voter is None:
+        flash('Please log in to vote')
+        return redirect(url_for('voter_login'))
+    # only ask about elections that exist, so a deleted one's bitmap is never reloaded
+    if not ballot_cache.get(election_id_int):
         flash('Election not found')
         return redirect(url_for('voter_select'))
+    if voted.has_voted(election_id_int, voter.voter_id):
+        flash('You have already voted in this election')
+        return redirect(url_for('voter_select'))
 
-    # load candidates for that election and group by position
-    try:
-        candidates = Candidate.query.filter_by(election_id=election_id_int).order_by(Candidate.full_name.asc()).all()
-    except Exception:
-        candidates = []
-
-    positions = {}
-    # mapping of position title -> max_winners (default 1)
-    position_limits = {}
-    for c in candidates:
-        pos_title = c.position or 'Other'
-        positions.setdefault(pos_title, []).append(c)
-
-    # try to fetch Position records to get max_winners per title
-    try:
-        all_positions = Position.query.all()
-        for p in all_positions:
-            if p and p.title:
-                position_limits[p.title] = int(p.max_winners or 1)
-    except Exception:
-        # fallback: default 1 for any position
-        position_limits = {}
-
-    # positions_list: list of tuples (position_title, candidates_list)
-    positions_list = list(positions.items())
+    def render():
+        # election, grouped candidates and limits come from the in-process cache
+        ballot = ballot_cache.get(election_id_int)
+        if not ballot:
+            flash('Election not found')
+            return redirect(url_for('voter_select'))
+        return render_template('voter/vote.html', election=ballot.election, positions=ballot.positions, position_limits=ballot.limits)
 
-    return render_template('voter/vote.html', election=election, positions=positions_list, position_limits=position_limits)
+    return cached_page(('voter_vote', election_id_int), render)
 
 
 @app.route('/voter/submit_votes', methods=['POST'])
 def voter_submit_votes():
-    # Accepts JSON { election_id: int, selections: { position: candidate_id, ... } }
+    # Accepts JSON { election_id: int, selections: { position: [candidate_id, ...], ... } }
     data = request.get_json(silent=True) or {}
     election_id = data.get('election_id')
     selections = data.get('selections')
@@ -188,20 +1231,104 @@ def voter_submit_votes():
     if not election_id or not selections:
         return jsonify({'success': False, 'message': 'Missing election or selections'}), 400
 
-    # Note: this endpoint currently does not persist votes to the database.
-    # It validates payload shape and returns success. Persisting votes and
-    # voter-authenticated submissions can be added in a follow-up change.
-    return jsonify({'success': True, 'message': 'Votes submitted successfully'})
+    voter = current_voter()
+    if voter is None:
+        return jsonify({'success': False, 'message': 'Please log in before voting'}), 401
+    voter_id = voter.voter_id
+
+    try:
+        election_id = int(election_id)
+    except (ValueError, TypeError):
+        return jsonify({'success': False, 'message': 'Invalid election'}), 400
+    ballot = ballot_cache.get(election_id)
+    if not ballot:
+        return jsonify({'success': False, 'message': 'Election not found'}), 404
+    if voted.has_voted(election_id, voter_id):
+        return jsonify({'success': False, 'message': 'You have already voted in this election'}), 409
+
+    pairs, error = validate_selections(ballot, selections)
+    if error:
+        return jsonify({'success': False, 'message': error}), 400
+
+    # hand the ballot to the group-commit writer and wait for its batch to commit;
+    # release this request's pooled connection first, we are done reading
+    db.session.close()
+    item = {
+        'election_id': election_id,
+        'voter_id': voter_id,
+        'selections': pairs,
+        'submitted_at': datetime.utcnow(),
+        # salted and serialized here, so the writer thread only hashes it
+        'audit_record': make_record(election_id, pairs),
+    }
+    try:
+        future = get_ballot_queue().submit(item)
+    except QueueFull:
+        return jsonify({'success': False, 'message': 'Server is busy, please try again in a moment'}), 503
+    try:
+        ballot_id = future.result(timeout=app.config['BALLOT_SUBMIT_TIMEOUT'])
+    except FutureTimeout:
+        return jsonify({'success': False, 'message': 'Your ballot is still being processed, please check again shortly'}), 504
+    except Exception:
+        app.logger.exception('Failed to record ballot')
+        return jsonify({'success': False, 'message': 'Could not record your ballot'}), 500
+
+    if ballot_id is None:
+        # voted through another worker process; remember it here too
+        voted.add(election_id, voter_id)
+        return jsonify({'success': False, 'message': 'You have already voted in this election'}), 409
+    # the receipt lets the voter check /audit/proof/<index> against the published root
+    return jsonify({'success': True, 'message': 'Votes submitted successfully', 'ballot_id': ballot_id,
+                    'receipt': item['receipt']})
+
+
+@app.route('/audit/root')
+def audit_root():
+    # the latest checkpoint, for publishing; no voters or choices in here
+    with (db.engines.get(READER_BIND) or db.engine).connect() as conn:
+        checkpoint = audit_log.latest(conn)
+    if checkpoint is None:
+        return jsonify({'size': 0, 'root': None, 'chain': None, 'created_at': None})
+    return jsonify({
+        'size': checkpoint.size,
+        'root': checkpoint.root.hex(),
+        'chain': checkpoint.chain.hex(),
+        'created_at': checkpoint.created_at.isoformat(),
+    })
+
+
+@app.route('/audit/proof/<int:index>')
+def audit_proof(index):
+    # inclusion proof for a receipt, against the latest root or ?size=<checkpoint>
+    with (db.engines.get(READER_BIND) or db.engine).connect() as conn:
+        found = audit_log.proof(conn, index, request.args.get('size', type=int))
+    if found is None:
+        return jsonify({'success': False, 'message': 'No such entry or checkpoint'}), 404
+    leaf, checkpoint, path = found
+    return jsonify({
+        'index': index,
+        'leaf': leaf.hex(),
+        'tree_size': checkpoint.size,
+        'root': checkpoint.root.hex(),
+        'path': [h.hex() for h in path],
+    })
 
 
 @app.route('/voter/select')
 def voter_select():
     # list elections for voter to choose from
-    try:
-        elections = Election.query.order_by(Election.start_date.desc()).all()
-    except Exception:
-        elections = []
-    return render_template('voter/select_election.html', elections=elections)
+    if current_voter() is None:
+        flash('Please log in to vote')
+        return redirect(url_for('voter_login'))
+
+    def render():
+        try:
+            elections = Election.query.order_by(Election.start_date.desc()).all()
+        except Exception:
+            elections = []
+        return render_template('voter/select_election.html', elections=elections)
+
+    return cached_page(('voter_select',), render)
 
 
 @app.route('/admin/login', methods=['GET', 'POST'])
@@ -213,7 +1340,7 @@ def admin_login():
             flash('Please provide username and password')
             return redirect(url_for('admin_login'))
         admin = Admin.query.filter_by(username=username).first()
-        if not admin or not admin.check_password(password):
+        if not admin or not check_account_password(admin, password):
             flash('Invalid username or password')
             return redirect(url_for('admin_login'))
         flash('Admin logged in successfully')
@@ -222,12 +1349,189 @@ def admin_login():
 
 @app.route('/admin/dashboard')
 def admin_dashboard():
-    return render_template('admin/dashboard.html')
+    elections = Election.query.order_by(Election.start_date.desc()).all()
+    ongoing = [e for e in elections if e.status == 'Active']
+    # the dashboard cards follow the newest active election (or the newest one)
+    current = ongoing[0] if ongoing else (elections[0] if elections else None)
+    turnout = TurnoutCounter.query.get(current.id) if current else None
+    return render_template(
+        'admin/dashboard.html',
+        elections=elections,
+        ongoing_count=len(ongoing),
+        current=current,
+        ballots=turnout.ballots if turnout else 0,
+        registered=registered_voters(),
+    )
 
 @app.route('/admin/voters')
 def admin_voters():
-    voters = Voter.query.order_by(Voter.fullname.asc()).all()
-    return render_template('admin/voters.html', voters=voters)
+    q = (request.args.get('q') or '').strip()
+    voters, next_cursor = list_voters(q)
+    return render_template('admin/voters.html', voters=voters, next_cursor=next_cursor, q=q)
+
+
+def _page_args():
+    # (search prefix, cursor values, page size) from the query string
+    try:
+        limit = min(max(int(request.args.get('limit', app.config['ADMIN_PAGE_SIZE'])), 1), 200)
+    except ValueError:
+        limit = app.config['ADMIN_PAGE_SIZE']
+    return (request.args.get('q') or '').strip(), decode_cursor(request.args.get('after')), limit
+
+
+def list_voters(q='', after=None, limit=None):
+    """One page of voters by name, optionally filtered by school ID / name prefix."""
+    name = Voter.fullname.collate('NOCASE')
+    query = Voter.query
+    if q:
+        prefix = escape_like(q) + '%'
+        query = query.filter(db.or_(
+            Voter.school_id.like(prefix, escape='\\'),
+            Voter.fullname.like(prefix, escape='\\'),
+        ))
+    rows, more = seek(query, [name, Voter.id], after, limit or app.config['ADMIN_PAGE_SIZE'])
+    return rows, encode_cursor([rows[-1].fullname, rows[-1].id]) if more else None
+
+
+def list_candidates(q='', after=None, limit=None):
+    """One page of candidates by position and name, optionally filtered by name prefix."""
+    # the listing shows each candidate's election; joined in, not one query per row
+    query = Candidate.query.options(joinedload(Candidate.election))
+    if q:
+        query = query.filter(Candidate.full_name.like(escape_like(q) + '%', escape='\\'))
+    columns = [Candidate.position, Candidate.full_name, Candidate.id]
+    rows, more = seek(query, columns, after, limit or app.config['ADMIN_PAGE_SIZE'])
+    last = rows[-1] if rows else None
+    return rows, encode_cursor([last.position, last.full_name, last.id]) if more else None
+
+
+def list_elections(q='', after=None, limit=None):
+    """One page of elections, newest start date first."""
+    query = Election.query
+    if q:
+        query = query.filter(Election.title.like(escape_like(q) + '%', escape='\\'))
+    columns = [Election.start_date, Election.id]
+    rows, more = seek(query, columns, after, limit or app.config['ADMIN_PAGE_SIZE'], descending=True)
+    last = rows[-1] if rows else None
+    return rows, encode_cursor([last.start_date.isoformat(), last.id]) if more else None
+
+
+@app.route('/admin/api/voters')
+def admin_api_voters():
+    rows, next_cursor = list_voters(*_page_args())
+    return jsonify({
+        'items': [{'id': v.id, 'school_id': v.school_id, 'fullname': v.fullname, 'grade': v.grade} for v in rows],
+        'next': next_cursor,
+    })
+
+
+@app.route('/admin/api/candidates')
+def admin_api_candidates():
+    rows, next_cursor = list_candidates(*_page_args())
+    return jsonify({
+        'items': [{
+            'id': c.id, 'full_name': c.full_name, 'position': c.position, 'position_id': c.position_id,
+            'party': c.party,
+            'bio': c.bio, 'photo_filename': c.photo_filename, 'election_id': c.election_id,
+            'election_title': c.election.title if c.election else None,
+        } for c in rows],
+        'next': next_cursor,
+    })
+
+
+@app.route('/admin/api/elections')
+def admin_api_elections():
+    rows, next_cursor = list_elections(*_page_args())
+    return jsonify({
+        'items': [{
+            'id': e.id, 'title': e.title, 'description': e.description,
+            'start_date': e.start_date.isoformat(), 'end_date': e.end_date.isoformat(),
+            'positions': e.positions, 'status': e.status,
+        } for e in rows],
+        'next': next_cursor,
+    })
+
+@app.route('/admin/voters/import', methods=['POST'])
+def admin_import_voters():
+    # bulk roster upload (CSV or XLSX); the import runs on the job worker and
+    # the page polls the returned status URL for its report
+    roster = request.files.get('roster')
+    if not roster or not roster.filename:
+        return jsonify({'success': False, 'message': 'Please choose a roster file'}), 400
+    ext = os.path.splitext(roster.filename)[1].lower()
+    if ext not in ('.csv', '.txt', '.xlsx', ''):
+        return jsonify({'success': False, 'message': f'Unsupported roster format: {ext}'}), 400
+    os.makedirs(app.config['IMPORT_DIR'], exist_ok=True)
+    path = os.path.join(app.config['IMPORT_DIR'], secrets.token_hex(8) + (ext or '.csv'))
+    roster.save(path)
+    # job params are shown on the status page; the password stays in a file beside the upload
+    with open(path + '.json', 'w', encoding='utf-8') as f:
+        json.dump({'default_password': request.form.get('default_password') or None}, f)
+    job_id = enqueue_job('import_voters', path=path)
+    return jsonify({'success': True, 'job_id': job_id, 'status_url': url_for('admin_job_status', job_id=job_id)}), 202
+
+
+@job_queue.handler('import_voters')
+def import_voters_job(job, path):
+    """Import an uploaded roster a batch at a time, then remove the upload."""
+    def batch_done(conn, report, inserted):
+        count_new_voters(conn, inserted)
+        job.progress(report.imported + report.skipped, message=f'Imported {report.imported} voter(s)', conn=conn)
+
+    try:
+        with open(path + '.json', encoding='utf-8') as f:
+            options = json.load(f)
+        job.progress(0, message='Importing voters')
+        with open(path, 'rb') as f:
+            report = import_roster(
+                db.engine, Voter.__table__, iter_roster(f, path),
+                method=app.config['PASSWORD_HASH_METHOD'],
+                default_password=options['default_password'],
+                pause=job.queue.pause,
+                on_batch=batch_done,
+            )
+    finally:
+        for leftover in (path, path + '.json'):
+            if os.path.exists(leftover):
+                os.remove(leftover)
+    message = f'Imported {report.imported} voter(s), {report.error_count} row(s) rejected, {report.skipped} skipped.'
+    details = '; '.join(f"line {e['line']}: {e['school_id'] or '-'} - {e['message']}" for e in report.errors[:5])
+    if details:
+        message += f' {details}' + ('; ...' if report.error_count > 5 else '')
+    return message
+
+
+@app.cli.command('import-voters')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--default-password', default=None, help='Initial password for rows without one.')
+@click.option('--batch-size', default=500, show_default=True, help='Rows hashed and inserted per batch.')
+@click.option('--workers', default=None, type=int, help='Hashing processes (default: one per core).')
+@click.option('--report', 'report_path', type=click.Path(dir_okay=False), help='Write rejected rows to this CSV file.')
+def import_voters_command(path, default_password, batch_size, workers, report_path):
+    """Import a voter roster file (flask --app run import-voters roster.csv)."""
+    with open(path, 'rb') as f:
+        try:
+            report = import_roster(
+                db.engine, Voter.__table__, iter_roster(f, path),
+                method=app.config['PASSWORD_HASH_METHOD'],
+                default_password=default_password,
+                batch_size=batch_size,
+                workers=workers,
+                on_batch=lambda conn, report, inserted: count_new_voters(conn, inserted),
+            )
+        except RosterError as e:
+            raise click.ClickException(str(e))
+    click.echo(f'Imported {report.imported} voter(s), {report.error_count} row(s) rejected, {report.skipped} skipped.')
+    if report_path and report.errors:
+        with open(report_path, 'w', newline='', encoding='utf-8') as out:
+            writer = csv.DictWriter(out, fieldnames=['line', 'school_id', 'message'])
+            writer.writeheader()
+            writer.writerows(report.errors)
+        click.echo(f'Rejected rows written to {report_path}')
+    else:
+        for err in report.errors[:20]:
+            click.echo(f"  line {err['line']}: {err['school_id'] or '-'}: {err['message']}")
+
 
 @app.route('/admin/elections', methods=['GET', 'POST'])
 def admin_elections():
@@ -246,7 +1550,6 @@ def admin_elections():
             return redirect(url_for('admin_elections'))
 
         # parse dates
-        from datetime import datetime
         try:
             sd = datetime.strptime(start_date, '%Y-%m-%d').date()
             ed = datetime.strptime(end_date, '%Y-%m-%d').date()
@@ -281,24 +1584,200 @@ def admin_elections():
             )
             db.session.add(election)
         db.session.commit()
+        invalidate_ballots(election.id)
         flash('Election created successfully')
         return redirect(url_for('admin_elections'))
 
-    # GET: list elections
-    elections = Election.query.order_by(Election.start_date.desc()).all()
-    return render_template('admin/elections.html', elections=elections)
+    # GET: first page of elections; the rest is loaded from admin_api_elections
+    q = (request.args.get('q') or '').strip()
+    elections, next_cursor = list_elections(q)
+    return render_template('admin/elections.html', elections=elections, next_cursor=next_cursor, q=q)
+
+EXPORT_DATASETS = ('voters', 'turnout', 'ballots', 'results')
+
+
+def export_rows(dataset, election_id=None):
+    """(columns, row iterator) for an export, streamed from the read-only engine."""
+    engine = db.engines.get(READER_BIND) or db.engine
+    if dataset == 'voters':
+        columns = ['id', 'school_id', 'fullname', 'grade']
+        stmt = db.select(Voter.id, Voter.school_id, Voter.fullname, Voter.grade).order_by(Voter.id)
+        return columns, iter_rows(engine, stmt)
+    if dataset not in EXPORT_DATASETS:
+        raise ExportError(f'Unknown export: {dataset}')
+    if election_id is None:
+        raise ExportError(f'The {dataset} export needs an election_id')
+    if dataset == 'results':
+        # already aggregated in the tally counters: one row per candidate
+        results = election_results(election_id)
+        columns = ['position', 'candidate_id', 'candidate', 'party', 'votes', 'rank', 'winner', 'tied']
+        return columns, (
+            (pos['title'], c['id'], c['full_name'], c['party'], c['votes'], c['rank'], c['winner'], c['tied'])
+            for pos in results['positions'] for c in pos['candidates']
+        )
+    # who voted (in voter order) and how ballots voted (in submission order)
+    # are exported separately, without times, so the two can't be lined up.
+    # Both plans walk a table in rowid order: no sort, so nothing is
+    # buffered before the first row
+    if dataset == 'turnout':
+        columns = ['school_id', 'fullname', 'grade']
+        voted = db.select(Ballot.id).where(Ballot.election_id == election_id, Ballot.voter_id == Voter.id)
+        stmt = db.select(Voter.school_id, Voter.fullname, Voter.grade).where(voted.exists()).order_by(Voter.id)
+    else:
+        columns = ['ballot', 'position', 'candidate_id', 'candidate']
+        stmt = (
+            db.select(Ballot.id, BallotSelection.position, BallotSelection.candidate_id, Candidate.full_name)
+            .join(BallotSelection, BallotSelection.ballot_id == Ballot.id)
+            .outerjoin(Candidate, Candidate.id == BallotSelection.candidate_id)
+            # "+ 0" keeps SQLite off the (election_id, voter_id) index, which
+            # would need a full sort to come back in ballot order
+            .where(Ballot.election_id + 0 == election_id)
+            .order_by(Ballot.id)
+        )
+    return columns, iter_rows(engine, stmt)
+
+
+@app.route('/admin/export/<dataset>.<fmt>')
+def admin_export(dataset, fmt):
+    # streamed as it is read; gzip when the client accepts it (?gzip=0 to opt out)
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({'success': False, 'message': f'Unknown export format: {fmt}'}), 404
+    try:
+        columns, rows = export_rows(dataset, request.args.get('election_id', type=int))
+    except ExportError as e:
+        return jsonify({'success': False, 'message': str(e)}), 400
+    gzip = request.args.get('gzip') != '0' and 'gzip' in request.accept_encodings
+    suffix = f"-{request.args['election_id']}" if request.args.get('election_id') else ''
+    resp = Response(stream_with_context(export_chunks(fmt, columns, rows, gzip=gzip)), mimetype=EXPORT_FORMATS[fmt])
+    resp.headers['Content-Disposition'] = f'attachment; filename="{dataset}{suffix}.{fmt}"'
+    resp.headers['Cache-Control'] = 'no-store'
+    resp.headers['Vary'] = 'Accept-Encoding'
+    if gzip:
+        resp.headers['Content-Encoding'] = 'gzip'
+    return resp
+
+
+@app.cli.command('export')
+@click.argument('dataset', type=click.Choice(EXPORT_DATASETS))
+@click.option('--format', 'fmt', type=click.Choice(sorted(EXPORT_FORMATS)), default='csv', show_default=True)
+@click.option('--election-id', type=int, default=None, help='Election for turnout, ballots and results.')
+@click.option('--output', '-o', type=click.Path(dir_okay=False), default='-', help='File to write (default: stdout).')
+@click.option('--gzip', is_flag=True, help='Compress the output.')
+def export_command(dataset, fmt, election_id, output, gzip):
+    """Stream an export to a file (flask --app run export ballots --election-id 1 -o ballots.csv)."""
+    with app.app_context():
+        try:
+            columns, rows = export_rows(dataset, election_id)
+        except ExportError as e:
+            raise click.ClickException(str(e))
+        with click.open_file(output, 'wb') as out:
+            for chunk in export_chunks(fmt, columns, rows, gzip=gzip):
+                out.write(chunk)
+
+
+def audit_log_entries(records=False):
+    """The whole audit log as entries, streamed from the read-only engine.
+
+    Records hold the choices, so they are only read for checks run on the server.
+    """
+    engine = db.engines.get(READER_BIND) or db.engine
+    columns = [AuditLeaf.seq, AuditLeaf.election_id, AuditLeaf.leaf] + ([AuditLeaf.record] if records else [])
+    leaves = db.select(*columns).order_by(AuditLeaf.seq)
+    checkpoints = db.select(AuditCheckpoint.size, AuditCheckpoint.root, AuditCheckpoint.chain).order_by(AuditCheckpoint.size)
+    return log_entries(iter_rows(engine, leaves), iter_rows(engine, checkpoints))
+
+
+@app.route('/audit/log.jsonl')
+def audit_log_export():
+    # every leaf hash and checkpoint, for an independent check with
+    # scripts/verify_audit_log.py. No records: next to a receipt, a record
+    # would let a voter prove how they voted
+    gzip = request.args.get('gzip') != '0' and 'gzip' in request.accept_encodings
+    chunks = jsonl_chunks(None, audit_log_entries())
+    if gzip:
+        chunks = gzip_chunks(chunks)
+    resp = Response(stream_with_context(chunks), mimetype=EXPORT_FORMATS['jsonl'])
+    resp.headers['Content-Disposition'] = 'attachment; filename="audit-log.jsonl"'
+    resp.headers['Cache-Control'] = 'no-store'
+    resp.headers['Vary'] = 'Accept-Encoding'
+    if gzip:
+        resp.headers['Content-Encoding'] = 'gzip'
+    return resp
+
+
+@app.cli.command('audit-verify')
+@click.option('--root', default=None, help='Published root (hex) the latest checkpoint must match.')
+def audit_verify_command(root):
+    """Rebuild the audit log's tree from its records and check every checkpoint."""
+    with app.app_context():
+        try:
+            verifier = verify_entries(audit_log_entries(records=True))
+        except AuditError as e:
+            raise click.ClickException(f'Audit log check failed: {e}')
+    actual = verifier.root.hex() if verifier.root else None
+    if root is not None and root.lower() != actual:
+        raise click.ClickException(f'Latest root {actual} does not match {root}')
+    click.echo(f'{verifier.size} ballots, {verifier.checkpoints} checkpoints verified; root {actual}')
+
+
+@app.route('/admin/elections/<int:election_id>/results')
+def admin_election_results(election_id):
+    election = Election.query.get(election_id)
+    if not election:
+        flash('Election not found')
+        return redirect(url_for('admin_elections'))
+    results = election_results(election_id)
+    if request.args.get('format') == 'json':
+        return jsonify(results)
+    return render_template('admin/results.html', election=election, results=results)
+
+
+@app.route('/admin/elections/<int:election_id>/stream')
+def admin_election_stream(election_id):
+    # Server-Sent Events: a full snapshot first, then only changed counters
+    if not Election.query.get(election_id):
+        return jsonify({'success': False, 'message': 'Election not found'}), 404
+    sub = results_broker.subscribe(election_id)
+    snap = results_snapshot(election_id)
+    results_broker.remember(election_id, snap)
+    # the stream may stay open for hours; don't hold a pooled connection
+    db.session.close()
+    heartbeat = app.config['RESULTS_STREAM_HEARTBEAT']
+
+    def events():
+        try:
+            yield 'retry: 3000\n\n'
+            yield format_sse(snap, 'snapshot')
+            while True:
+                delta = sub.get(timeout=heartbeat)
+                if delta is None:
+                    yield ': keep-alive\n\n'
+                else:
+                    yield format_sse(delta, 'delta')
+        finally:
+            results_broker.unsubscribe(sub)
+
+    return Response(events(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no',
+    })
+
 
 @app.route('/admin/candidates')
 def admin_candidates():
-    # list candidates
-    candidates = Candidate.query.order_by(Candidate.position.asc(), Candidate.full_name.asc()).all()
+    # first page of candidates; the rest is loaded from admin_api_candidates
+    q = (request.args.get('q') or '').strip()
+    candidates, next_cursor = list_candidates(q)
     positions = []
     try:
         positions = Position.query.order_by(Position.title.asc()).all()
     except Exception:
         positions = []
     elections = Election.query.order_by(Election.start_date.desc()).all()
-    return render_template('admin/candidates.html', candidates=candidates, positions=positions, elections=elections)
+    return render_template(
+        'admin/candidates.html', candidates=candidates, positions=positions, elections=elections,
+        next_cursor=next_cursor, q=q,
+    )
 
 
 @app.route('/admin/candidates', methods=['POST'])
@@ -306,35 +1785,39 @@ def admin_create_or_update_candidate():
     # create or update candidate
     candidate_id = request.form.get('candidate_id')
     full_name = request.form.get('full_name')
-    position = request.form.get('position')
+    position_id = request.form.get('position_id')
     party = request.form.get('party')
     bio = request.form.get('bio')
     election_select = request.form.get('election_id')
 
-    if not full_name or not position:
+    if not full_name or not position_id:
         flash('Please provide candidate name and position')
         return redirect(url_for('admin_candidates'))
+    position = Position.query.get(position_id)
+    if not position:
+        flash('Position not found')
+        return redirect(url_for('admin_candidates'))
 
-    # handle file upload
+    # photos are stored under their content hash; thumbnails follow in the background
     photo = request.files.get('photo')
     photo_filename = None
     if photo and photo.filename:
-        uploads_dir = os.path.join(app.static_folder, 'uploads', 'candidates')
-        os.makedirs(uploads_dir, exist_ok=True)
-        # secure filename: keep simple, prepend timestamp
-        from datetime import datetime
-        ts = datetime.utcnow().strftime('%Y%m%d%H%M%S')
-        _, ext = os.path.splitext(photo.filename)
-        photo_filename = f"{ts}_{secure_filename(photo.filename)}"
-        photo.save(os.path.join(uploads_dir, photo_filename))
+        try:
+            photo_filename = photo_store.save(photo.stream)
+        except PhotoError as e:
+            flash(str(e))
+            return redirect(url_for('admin_candidates'))
 
     if candidate_id:
         candidate = Candidate.query.get(candidate_id)
         if not candidate:
             flash('Candidate not found')
             return redirect(url_for('admin_candidates'))
+        old_election_id = candidate.election_id
+        old_photo = candidate.photo_filename
         candidate.full_name = full_name
-        candidate.position = position
+        candidate.position = position.title
+        candidate.position_id = position.id
         candidate.party = party
         candidate.bio = bio
         candidate.election_id = election_select or None
@@ -343,14 +1826,21 @@ def admin_create_or_update_candidate():
     else:
         candidate = Candidate(
             full_name=full_name,
-            position=position,
+            position=position.title,
+            position_id=position.id,
             party=party,
             bio=bio,
             photo_filename=photo_filename,
             election_id=election_select or None,
         )
         db.session.add(candidate)
+        old_election_id = None
+        old_photo = None
     db.session.commit()
+    if old_photo and old_photo != candidate.photo_filename:
+        release_photo(old_photo)
+    # the candidate may have moved between elections; both ballots change
+    invalidate_ballots(candidate.election_id, old_election_id)
     flash('Candidate saved')
     return redirect(url_for('admin_candidates'))
 
@@ -365,18 +1855,10 @@ def admin_delete_candidate():
     if not candidate:
         flash('Candidate not found')
         return redirect(url_for('admin_candidates'))
-    # remove photo file if exists
-    if candidate.photo_filename:
-        try:
-            path = os.path.join(app.static_folder, 'uploads', 'candidates', candidate.photo_filename)
-            if os.path.exists(path):
-                os.remove(path)
-        except Exception:
-            pass
-    db.session.delete(candidate)
-    db.session.commit()
-    flash('Candidate deleted')
-    return redirect(url_for('admin_candidates'))
+    # the row and its photo files go on the job worker
+    job_id = enqueue_job('delete_candidate', candidate_id=candidate.id)
+    flash(f'Deleting candidate (job #{job_id})')
+    return redirect(url_for('admin_candidates', job=job_id))
 
 @app.route('/admin/position', methods=['GET', 'POST'])
 def admin_position():
@@ -413,6 +1895,8 @@ def admin_position():
                 flash('Position not found')
                 return redirect(url_for('admin_position'))
             pos.title = title
+            # candidates carry the title too
+            Candidate.query.filter_by(position_id=pos.id).update({'position': title})
             pos.description = description
             pos.max_winners = max_winners
             pos.votes_allowed = votes_allowed
@@ -420,6 +1904,8 @@ def admin_position():
             pos = Position(title=title, description=description, max_winners=max_winners, votes_allowed=votes_allowed)
             db.session.add(pos)
         db.session.commit()
+        # positions are shared by every election
+        invalidate_ballots()
         flash('Position saved')
         return redirect(url_for('admin_position'))
 
@@ -438,8 +1924,11 @@ def admin_delete_position():
     if not pos:
         flash('Position not found')
         return redirect(url_for('admin_position'))
+    # its candidates keep the title but no longer point at a position
+    Candidate.query.filter_by(position_id=pos.id).update({'position_id': None})
     db.session.delete(pos)
     db.session.commit()
+    invalidate_ballots()
     flash('Position deleted')
     return redirect(url_for('admin_position'))
 
@@ -454,21 +1943,78 @@ def admin_delete_election():
     if not election:
         flash('Election not found')
         return redirect(url_for('admin_elections'))
-    db.session.delete(election)
-    db.session.commit()
-    flash('Election deleted')
-    return redirect(url_for('admin_elections'))
+    # its ballots are deleted in chunks on the job worker, between voters' writes
+    job_id = enqueue_job('delete_election', election_id=election.id)
+    flash(f'Deleting election (job #{job_id})')
+    return redirect(url_for('admin_elections', job=job_id))
 
 
 @app.route('/logout', methods=['POST'])
 def logout():
-    # clear any session data (if used) and redirect to admin login
+    # clear any session data (if used); voters also lose their token and go
+    # back to the voter login, everyone else to the admin login
     try:
         session.clear()
     except Exception:
         pass
     flash('You have been logged out')
-    return redirect(url_for('admin_login'))
+    voter = current_voter()
+    if voter is None:
+        return redirect(url_for('admin_login'))
+    voter_tokens.revoke(voter)
+    resp = redirect(url_for('voter_login'))
+    resp.delete_cookie(app.config['VOTER_TOKEN_COOKIE'])
+    return resp
+
+def warm_up():
+    """Compile every template and load the active elections' ballots and voted bitmaps.
+
+    Returns (templates, elections) counts.
+    """
+    templates = app.jinja_env.list_templates(extensions=['html'])
+    for name in templates:
+        app.jinja_env.get_template(name)
+    with app.app_context():
+        active = [eid for (eid,) in db.session.query(Election.id).filter(Election.status == 'Active')]
+        for election_id in active:
+            ballot_cache.get(election_id)
+            voted.has_voted(election_id, 0)
+        db.session.remove()
+    return len(templates), len(active)
+
+
+def create_app():
+    """Return the app with its database ready to serve (see wsgi.py).
+
+    Routes and services are set up on the module-level ``app`` at import;
+    this does the one-off startup work: the schema upgrade, default admin,
+    static file build and warm-up. A pre-fork server calls it once in the
+    master process (so every worker starts with the templates compiled and
+    the ballots loaded) and ``after_fork`` in every worker.
+    """
+    if not os.environ.get('FLASK_SECRET'):
+        app.logger.warning('FLASK_SECRET is not set; signing with the key in %s. Servers sharing this '
+                           'database must share one FLASK_SECRET.', os.path.join(app.instance_path, 'secret_key'))
+    create_db_and_default_admin()
+    if app.config['STATIC_BUILD'] and not up_to_date(app.static_folder, load_manifest(app.static_folder)):
+        build_static_assets()
+    if app.config['WARM_UP']:
+        warm_up()
+    # everything loaded so far lives as long as the process: keep the garbage
+    # collector from rescanning it (and, after a fork, from touching the
+    # workers' shared copy-on-write pages)
+    gc.freeze()
+    return app
+
+
+def after_fork():
+    """Drop what a forked worker must not share with its parent."""
+    # pooled SQLite connections opened by the master (migrations, admin check)
+    with app.app_context():
+        for engine in db.engines.values():
+            engine.dispose(close=False)
+    password_service.after_fork()
+
 
 if __name__ == '__main__':
     create_db_and_default_admin()
@@ -0,0 +1,206 @@
+"""
+Cold-start benchmark: how soon a freshly started server answers, and how fast.
+
+Starts ``python wsgi.py`` (waitress) on a small database again and again and
+measures, for each start, the time from spawning the process to the first
+200 from ``/`` (boot to first response), then the first and second request
+to each of PAGES on that process. A first request much slower than the
+second is work a new worker does on its first visitors: compiling a
+template, loading a ballot. With ``--compare`` every start is also made with
+the startup work switched off (WARM_UP=0, no template bytecode cache), and
+the two are printed side by side.
+
+``--profile`` instead profiles one start in this process, import of the app
+included, and prints where the time goes (startup profile mode).
+
+Run:
+    python scripts\\bench_cold_start.py --runs 5 --compare --out cold.json
+    python scripts\\bench_cold_start.py --profile startup.prof
+"""
+import argparse
+import cProfile
+import http.client
+import json
+import os
+import platform
+import pstats
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PAGES = ['/', '/voter/register', '/admin/login']
+
+PRIME = """
+from datetime import date
+import run
+run.create_app()
+with run.app.app_context():
+    if not run.Election.query.filter_by(status='Active').first():
+        run.db.session.add(run.Election(title='Cold start', start_date=date.today(), end_date=date.today(), status='Active'))
+        run.db.session.commit()
+"""
+
+VARIANTS = {
+    'tuned': {},
+    # what every start cost before: no compiled templates kept, nothing warmed
+    'cold': {'WARM_UP': '0', 'TEMPLATE_CACHE_DIR': ''},
+}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def base_env(workdir):
+    return dict(
+        os.environ,
+        DATABASE_PATH=os.path.join(workdir, 'cold.db'),
+        TEMPLATE_CACHE_DIR=os.path.join(workdir, 'jinja-cache'),
+        MIGRATION_BACKUP='0',
+    )
+
+
+def prime(workdir):
+    """Build the database and fill the bytecode cache, as an earlier worker would have."""
+    subprocess.run([sys.executable, '-c', PRIME], cwd=ROOT, env=base_env(workdir), check=True,
+                   stdout=subprocess.DEVNULL)
+
+
+def get(port, path):
+    conn = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    try:
+        started = time.perf_counter()
+        conn.request('GET', path)
+        resp = conn.getresponse()
+        resp.read()
+        return resp.status, (time.perf_counter() - started) * 1000
+    finally:
+        conn.close()
+
+
+def one_start(workdir, overrides):
+    port = free_port()
+    env = base_env(workdir) | overrides | {'HOST': '127.0.0.1', 'PORT': str(port)}
+    started = time.perf_counter()
+    proc = subprocess.Popen([sys.executable, 'wsgi.py'], cwd=ROOT, env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        deadline = started + 60
+        while True:
+            try:
+                status, _ = get(port, PAGES[0])
+                if status == 200:
+                    break
+            except OSError:
+                pass
+            if proc.poll() is not None or time.perf_counter() > deadline:
+                raise SystemExit(f'wsgi.py did not come up (exit status {proc.poll()})')
+            time.sleep(0.005)
+        boot = (time.perf_counter() - started) * 1000
+        # the probe above was the first hit on '/'; measure the rest fresh
+        pages = {}
+        for path in PAGES:
+            first = get(port, path)[1] if path != PAGES[0] else None
+            pages[path] = {'first_ms': first, 'second_ms': get(port, path)[1]}
+        return {'boot_to_first_response_ms': boot, 'pages': pages}
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def summarize(starts):
+    summary = {'boot_to_first_response_ms': round(statistics.median(s['boot_to_first_response_ms'] for s in starts), 1),
+               'pages': {}}
+    for path in PAGES:
+        firsts = [s['pages'][path]['first_ms'] for s in starts if s['pages'][path]['first_ms'] is not None]
+        summary['pages'][path] = {
+            'first_ms': round(statistics.median(firsts), 2) if firsts else None,
+            'second_ms': round(statistics.median(s['pages'][path]['second_ms'] for s in starts), 2),
+        }
+    return summary
+
+
+def profile(workdir, out, top):
+    os.environ.update(base_env(workdir))
+    prof = cProfile.Profile()
+    started = time.perf_counter()
+    prof.enable()
+    import run
+    run.create_app()
+    client = run.app.test_client()
+    for path in PAGES:
+        client.get(path)
+    prof.disable()
+    print(f'import + create_app + first request to {len(PAGES)} pages: {(time.perf_counter() - started) * 1000:.0f} ms')
+    prof.dump_stats(out)
+    pstats.Stats(out).sort_stats('cumulative').print_stats(top)
+    print(f'Profile written to {out} (python -m pstats {out})')
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--runs', type=int, default=5, help='Starts per variant (medians are reported).')
+    parser.add_argument('--compare', action='store_true', help='Also start with the startup work switched off.')
+    parser.add_argument('--profile', metavar='PATH', default=None, help='Profile one start in-process instead.')
+    parser.add_argument('--top', type=int, default=30, help='Functions to list with --profile.')
+    parser.add_argument('--out', default=None, help='Write results to this JSON file.')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='bench-cold-')
+    prime(workdir)
+    if args.profile:
+        profile(workdir, args.profile, args.top)
+        return
+
+    variants = ['tuned', 'cold'] if args.compare else ['tuned']
+    results = {}
+    for name in variants:
+        starts = [one_start(workdir, VARIANTS[name]) for _ in range(args.runs)]
+        results[name] = summarize(starts)
+
+    print(f'{"":<24}' + ''.join(f'{name:>12}' for name in variants))
+    print(f'{"boot to first response":<24}'
+          + ''.join(f'{results[n]["boot_to_first_response_ms"]:>10.0f}ms' for n in variants))
+    for path in PAGES:
+        for which in ('first_ms', 'second_ms'):
+            values = [results[n]['pages'][path][which] for n in variants]
+            if all(v is None for v in values):
+                continue
+            label = f'{path} ({which.split("_")[0]})'
+            print(f'{label:<24}' + ''.join(f'{v:>10.1f}ms' if v is not None else f'{"-":>12}' for v in values))
+
+    if args.out:
+        result = {
+            'created': datetime.now().isoformat(timespec='seconds'),
+            'commit': git_commit(),
+            'runs': args.runs,
+            'environment': {
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpus': os.cpu_count(),
+            },
+            'variants': results,
+        }
+        with open(args.out, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f'Results written to {args.out}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,135 @@
+"""
+Load benchmark: read latency while writes are running, default vs tuned SQLite.
+
+For each mode a scratch database is filled with voters and ballots, then a
+writer thread keeps inserting ballots in small transactions while reader
+threads run the kind of indexed lookups the voter pages do. Read latency
+percentiles and lock errors are printed for both modes.
+
+Run:
+    python scripts\\bench_sqlite_tuning.py [--seconds 10] [--readers 8] [--voters 20000]
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from services.database import DEFAULT_PRAGMAS, apply_pragmas  # noqa: E402
+
+
+def connect(path, tuned):
+    conn = sqlite3.connect(path, timeout=5 if tuned else 0.1, check_same_thread=False)
+    if tuned:
+        apply_pragmas(conn, DEFAULT_PRAGMAS)
+    return conn
+
+
+def setup(path, voters, tuned):
+    conn = connect(path, tuned)
+    conn.executescript('''
+        CREATE TABLE voter (id INTEGER PRIMARY KEY, school_id TEXT UNIQUE NOT NULL, fullname TEXT NOT NULL);
+        CREATE TABLE ballot (id INTEGER PRIMARY KEY, election_id INTEGER NOT NULL, voter_id INTEGER NOT NULL,
+                             UNIQUE (election_id, voter_id));
+    ''')
+    conn.executemany('INSERT INTO voter (school_id, fullname) VALUES (?, ?)',
+                     ((f'S{i:06d}', f'Student {i}') for i in range(voters)))
+    conn.commit()
+    conn.close()
+
+
+def percentile(values, pct):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def run(mode, seconds, readers, voters):
+    tuned = mode == 'tuned'
+    fd, path = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    os.remove(path)
+    setup(path, voters, tuned)
+
+    stop = threading.Event()
+    latencies = []
+    errors = {'read': 0, 'write': 0}
+    writes = [0]
+    lock = threading.Lock()
+
+    def writer():
+        conn = connect(path, tuned)
+        voter_id = 0
+        while not stop.is_set():
+            try:
+                with conn:
+                    for _ in range(20):
+                        voter_id += 1
+                        conn.execute('INSERT INTO ballot (election_id, voter_id) VALUES (1, ?)', (voter_id,))
+                writes[0] += 20
+            except sqlite3.OperationalError:
+                errors['write'] += 1
+        conn.close()
+
+    def reader(seed):
+        conn = connect(path, tuned)
+        n = seed
+        local = []
+        while not stop.is_set():
+            n = (n * 7919 + 1) % voters
+            t0 = time.perf_counter()
+            try:
+                conn.execute('SELECT id, fullname FROM voter WHERE school_id = ?', (f'S{n:06d}',)).fetchone()
+                conn.execute('SELECT COUNT(*) FROM ballot WHERE election_id = 1 AND voter_id = ?', (n,)).fetchone()
+                local.append((time.perf_counter() - t0) * 1000)
+            except sqlite3.OperationalError:
+                with lock:
+                    errors['read'] += 1
+        conn.close()
+        with lock:
+            latencies.extend(local)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader, args=(i,)) for i in range(readers)]
+    for t in threads:
+        t.start()
+    time.sleep(seconds)
+    stop.set()
+    for t in threads:
+        t.join()
+
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    return {
+        'mode': mode,
+        'reads': len(latencies),
+        'p50': percentile(latencies, 50),
+        'p95': percentile(latencies, 95),
+        'p99': percentile(latencies, 99),
+        'read_errors': errors['read'],
+        'writes': writes[0],
+        'write_errors': errors['write'],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--voters', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f'{"mode":<8} {"reads":>8} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"rd err":>7} {"writes":>8} {"wr err":>7}')
+    for mode in ('default', 'tuned'):
+        r = run(mode, args.seconds, args.readers, args.voters)
+        print(f'{r["mode"]:<8} {r["reads"]:>8} {r["p50"]:>8.3f} {r["p95"]:>8.3f} {r["p99"]:>8.3f} '
+              f'{r["read_errors"]:>7} {r["writes"]:>8} {r["write_errors"]:>7}')
+
+
+if __name__ == '__main__':
+    main()
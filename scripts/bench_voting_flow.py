@@ -0,0 +1,381 @@
+"""
+Election-day benchmark: drive the real app through login -> select -> vote -> submit.
+
+A synthetic database (N voters, M elections, P positions with K candidates
+each) is built in a temporary file, then U simulated voters run the flow
+with C at a time, either through Flask's test client (in-process) or over
+HTTP against the Werkzeug development server (``server``), waitress, or
+gunicorn with the settings in gunicorn.conf.py. Latency percentiles and
+throughput per route are printed and saved as JSON; given a baseline JSON
+from an earlier run, throughput is compared route by route, routes that got
+slower are flagged and the exit status is 1.
+
+Run:
+    python scripts\\bench_voting_flow.py --voters 2000 --elections 3 --concurrency 16 --out bench.json
+    python scripts\\bench_voting_flow.py --mode server --out dev.json
+    python scripts\\bench_voting_flow.py --mode gunicorn --workers 4 --baseline dev.json
+"""
+import argparse
+import http.client
+import json
+import os
+import platform
+import random
+import socket
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+ROUTES = ['voter_login', 'voter_select', 'voter_vote', 'voter_submit_votes']
+PASSWORD = 'bench-password'
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * pct / 100))]
+
+
+def load_app(db_path, hash_method):
+    # the app reads its settings at import time
+    os.environ['DATABASE_PATH'] = db_path
+    os.environ['MIGRATION_BACKUP'] = '0'
+    # measure capacity, not the waiting room
+    os.environ.setdefault('ADMISSION_LOGIN_RATE', '0')
+    if hash_method:
+        os.environ['PASSWORD_HASH_METHOD'] = hash_method
+    import run
+    run.create_db_and_default_admin()
+    return run
+
+
+def build_database(run, voters, elections, positions, candidates):
+    """Fill the database; returns {election_id: {position title: [candidate ids]}}."""
+    from werkzeug.security import generate_password_hash
+
+    db = run.db
+    # every voter shares one password, so seeding hashes once but logins
+    # still pay the full cost of the configured method
+    pwhash = generate_password_hash(PASSWORD, method=run.app.config['PASSWORD_HASH_METHOD'])
+    with run.app.app_context():
+        for start in range(0, voters, 5000):
+            db.session.execute(run.Voter.__table__.insert(), [
+                {'school_id': f'bench{i:07d}', 'fullname': f'Bench Voter {i}', 'grade': '12', 'password_hash': pwhash}
+                for i in range(start, min(voters, start + 5000))
+            ])
+        run.count_new_voters(db.session, voters)
+        today = date.today()
+        db.session.execute(run.Election.__table__.insert(), [
+            {'title': f'Bench Election {e}', 'description': 'synthetic', 'start_date': today,
+             'end_date': today + timedelta(days=1), 'status': 'Ongoing'}
+            for e in range(elections)
+        ])
+        db.session.execute(run.Position.__table__.insert(), [
+            {'title': f'Bench Position {p}', 'description': '', 'max_winners': 1, 'votes_allowed': 1}
+            for p in range(positions)
+        ])
+        db.session.flush()
+        election_ids = [e.id for e in run.Election.query.filter(run.Election.title.like('Bench Election %'))]
+        position_rows = run.Position.query.filter(run.Position.title.like('Bench Position %')).all()
+        db.session.execute(run.Candidate.__table__.insert(), [
+            {'full_name': f'Candidate {e}-{p.id}-{k}', 'position': p.title, 'position_id': p.id,
+             'party': f'Party {k}', 'election_id': e}
+            for e in election_ids for p in position_rows for k in range(candidates)
+        ])
+        db.session.commit()
+        ballots = defaultdict(lambda: defaultdict(list))
+        for c in run.Candidate.query.filter(run.Candidate.election_id.in_(election_ids)):
+            ballots[c.election_id][c.position].append(c.id)
+    return {e: dict(p) for e, p in ballots.items()}
+
+
+class TestClientSession:
+    def __init__(self, app):
+        self.client = app.test_client()
+
+    def request(self, method, path, form=None, json_body=None):
+        resp = self.client.open(path, method=method, data=form, json=json_body)
+        return resp.status_code, resp.headers.get('Location', '')
+
+
+class HttpSession:
+    """Minimal cookie-keeping HTTP client for the local server."""
+
+    def __init__(self, host, port):
+        self.host, self.port = host, port
+        self.cookies = {}
+
+    def request(self, method, path, form=None, json_body=None):
+        from urllib.parse import urlencode
+
+        headers = {}
+        body = None
+        if form is not None:
+            body = urlencode(form)
+            headers['Content-Type'] = 'application/x-www-form-urlencoded'
+        elif json_body is not None:
+            body = json.dumps(json_body)
+            headers['Content-Type'] = 'application/json'
+        if self.cookies:
+            headers['Cookie'] = '; '.join(f'{k}={v}' for k, v in self.cookies.items())
+        conn = http.client.HTTPConnection(self.host, self.port, timeout=60)
+        try:
+            conn.request(method, path, body=body, headers=headers)
+            resp = conn.getresponse()
+            resp.read()
+            for set_cookie in resp.headers.get_all('Set-Cookie') or []:
+                name, _, value = set_cookie.split(';', 1)[0].partition('=')
+                self.cookies[name.strip()] = value
+            return resp.status, resp.getheader('Location', '')
+        finally:
+            conn.close()
+
+
+def start_server(app):
+    from werkzeug.serving import make_server
+
+    server = make_server('127.0.0.1', 0, app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server.server_port, server.shutdown
+
+
+def start_waitress(app, threads):
+    from waitress import create_server
+
+    server = create_server(app, host='127.0.0.1', port=0, threads=threads, backlog=1024)
+    threading.Thread(target=server.run, daemon=True).start()
+    return server.effective_port, server.close
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def start_gunicorn(db_path, hash_method, workers, threads):
+    """gunicorn in a child process, on the database already built; returns (port, stop)."""
+    port = free_port()
+    env = dict(os.environ, DATABASE_PATH=db_path, MIGRATION_BACKUP='0', PASSWORD_HASH_METHOD=hash_method)
+    cmd = [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+           '--threads', str(threads), '--log-level', 'warning']
+    if workers:
+        cmd += ['--workers', str(workers)]
+        env['WEB_CONCURRENCY'] = str(workers)
+    proc = subprocess.Popen(cmd + ['wsgi:app'], cwd=ROOT, env=env)
+    deadline = time.monotonic() + 60
+    while True:
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=1).close()
+            break
+        except OSError:
+            if proc.poll() is not None or time.monotonic() > deadline:
+                proc.kill()
+                raise SystemExit('gunicorn did not start')
+            time.sleep(0.1)
+
+    def stop():
+        proc.terminate()
+        proc.wait(timeout=30)
+    return port, stop
+
+
+def run_flow(make_session, voter_index, election_id, ballot, rng, record):
+    """One voter's visit; each step is timed and recorded under its route name."""
+    s = make_session()
+
+    def step(route, expect, method, path, **kw):
+        started = time.perf_counter()
+        status, location = s.request(method, path, **kw)
+        ok = status == expect and (route != 'voter_login' or location.endswith('/voter/select'))
+        record(route, (time.perf_counter() - started) * 1000, status, ok)
+        return ok
+
+    if not step('voter_login', 302, 'POST', '/', form={'school-id': f'bench{voter_index:07d}', 'password': PASSWORD}):
+        return
+    step('voter_select', 200, 'GET', '/voter/select')
+    step('voter_vote', 200, 'GET', f'/voter/vote?election_id={election_id}')
+    selections = {title: [rng.choice(ids)] for title, ids in ballot.items()}
+    step('voter_submit_votes', 200, 'POST', '/voter/submit_votes',
+         json_body={'election_id': election_id, 'selections': selections})
+
+
+def summarize(samples, statuses, failures, wall):
+    routes = {}
+    for route in ROUTES:
+        values = sorted(samples[route])
+        routes[route] = {
+            'count': len(values),
+            'errors': failures[route],
+            'statuses': {str(k): v for k, v in sorted(statuses[route].items())},
+            'p50_ms': round(percentile(values, 50), 3),
+            'p95_ms': round(percentile(values, 95), 3),
+            'p99_ms': round(percentile(values, 99), 3),
+            'mean_ms': round(sum(values) / len(values), 3) if values else 0.0,
+            'max_ms': round(values[-1], 3) if values else 0.0,
+            'throughput_rps': round(len(values) / wall, 2) if wall else 0.0,
+        }
+    return routes
+
+
+def compare(result, baseline, threshold):
+    """Routes whose p95 rose or throughput fell by more than `threshold` (a fraction)."""
+    flagged = []
+    for route, now in result['routes'].items():
+        before = baseline.get('routes', {}).get(route)
+        if not before or not before['count']:
+            continue
+        if before['p95_ms'] and now['p95_ms'] > before['p95_ms'] * (1 + threshold):
+            flagged.append(f"{route}: p95 {before['p95_ms']:.1f} -> {now['p95_ms']:.1f} ms")
+        if before['throughput_rps'] and now['throughput_rps'] < before['throughput_rps'] * (1 - threshold):
+            flagged.append(f"{route}: throughput {before['throughput_rps']:.1f} -> {now['throughput_rps']:.1f} req/s")
+        if now['errors'] > before['errors']:
+            flagged.append(f"{route}: errors {before['errors']} -> {now['errors']}")
+    return flagged
+
+
+def speedups(result, baseline):
+    """[(route, baseline req/s, req/s)] for routes present in both runs."""
+    rows = []
+    for route, now in result['routes'].items():
+        before = baseline.get('routes', {}).get(route)
+        if before and before['throughput_rps']:
+            rows.append((route, before['throughput_rps'], now['throughput_rps']))
+    return rows
+
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('--voters', type=int, default=2000, help='Voters in the synthetic database.')
+    parser.add_argument('--elections', type=int, default=3)
+    parser.add_argument('--positions', type=int, default=5, help='Positions on every ballot.')
+    parser.add_argument('--candidates', type=int, default=4, help='Candidates per position per election.')
+    parser.add_argument('--users', type=int, default=None, help='Voters who go through the flow (default: all).')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--mode', choices=['testclient', 'server', 'waitress', 'gunicorn'], default='testclient',
+                        help='server is the Werkzeug development server.')
+    parser.add_argument('--workers', type=int, default=None, help='gunicorn worker processes (default: its config).')
+    parser.add_argument('--server-threads', type=int, default=8, help='Threads per waitress/gunicorn process.')
+    parser.add_argument('--hash-method', default=None, help='PASSWORD_HASH_METHOD for the run (default: the app\'s).')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--out', default=None, help='Write results to this JSON file.')
+    parser.add_argument('--baseline', default=None, help='Earlier results JSON to compare against.')
+    parser.add_argument('--threshold', type=float, default=0.2, help='Allowed slowdown before flagging (0.2 = 20%%).')
+    args = parser.parse_args()
+    users = min(args.users or args.voters, args.voters)
+
+    workdir = tempfile.mkdtemp(prefix='bench-voting-')
+    db_path = os.path.join(workdir, 'bench.db')
+    run = load_app(db_path, args.hash_method)
+    started = time.perf_counter()
+    ballots = build_database(run, args.voters, args.elections, args.positions, args.candidates)
+    print(f'Built synthetic database in {time.perf_counter() - started:.1f}s ({db_path})')
+
+    stop = None
+    if args.mode == 'testclient':
+        def make_session():
+            return TestClientSession(run.app)
+    else:
+        if args.mode == 'server':
+            port, stop = start_server(run.app)
+        elif args.mode == 'waitress':
+            port, stop = start_waitress(run.app, args.server_threads)
+        else:
+            # the benchmark's own copy of the app must not hold the write lock
+            with run.app.app_context():
+                for engine in run.db.engines.values():
+                    engine.dispose()
+            port, stop = start_gunicorn(db_path, run.app.config['PASSWORD_HASH_METHOD'], args.workers,
+                                        args.server_threads)
+
+        def make_session():
+            return HttpSession('127.0.0.1', port)
+
+    samples = defaultdict(list)
+    statuses = defaultdict(Counter)
+    failures = Counter()
+    lock = threading.Lock()
+
+    def record(route, ms, status, ok):
+        with lock:
+            samples[route].append(ms)
+            statuses[route][status] += 1
+            if not ok:
+                failures[route] += 1
+
+    election_ids = sorted(ballots)
+    rng = random.Random(args.seed)
+    plan = [(i, election_ids[i % len(election_ids)], random.Random(rng.random())) for i in range(users)]
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+        for f in [pool.submit(run_flow, make_session, i, e, ballots[e], r, record) for i, e, r in plan]:
+            f.result()
+    wall = time.perf_counter() - started
+    if stop:
+        stop()
+
+    result = {
+        'created': datetime.now().isoformat(timespec='seconds'),
+        'commit': git_commit(),
+        'config': {k: getattr(args, k) for k in ('voters', 'elections', 'positions', 'candidates', 'concurrency', 'mode', 'seed')}
+        | {'users': users, 'hash_method': run.app.config['PASSWORD_HASH_METHOD']}
+        | ({'workers': args.workers, 'server_threads': args.server_threads}
+           if args.mode in ('waitress', 'gunicorn') else {}),
+        'environment': {
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+        },
+        'wall_seconds': round(wall, 3),
+        'flows_per_second': round(users / wall, 2) if wall else 0.0,
+        'routes': summarize(samples, statuses, failures, wall),
+    }
+
+    print(f"{users} voters, concurrency {args.concurrency}, {args.mode}: {wall:.1f}s, {result['flows_per_second']} flows/s")
+    print(f'{"route":<20} {"count":>6} {"errors":>6} {"p50 ms":>8} {"p95 ms":>8} {"p99 ms":>8} {"req/s":>8}')
+    for route, r in result['routes'].items():
+        print(f"{route:<20} {r['count']:>6} {r['errors']:>6} {r['p50_ms']:>8.1f} {r['p95_ms']:>8.1f} "
+              f"{r['p99_ms']:>8.1f} {r['throughput_rps']:>8.1f}")
+
+    if args.out:
+        with open(args.out, 'w') as f:
+            json.dump(result, f, indent=2)
+        print(f'Results written to {args.out}')
+
+    run.password_service.shutdown()
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get('config') != result['config']:
+            print('Note: the baseline was run with different settings:', baseline.get('config'))
+        print(f"{'route':<20} {'baseline':>9} {'now':>9} {'speedup':>8}   (req/s)")
+        for route, before, now in speedups(result, baseline):
+            print(f'{route:<20} {before:>9.1f} {now:>9.1f} {now / before:>7.2f}x')
+        flagged = compare(result, baseline, args.threshold)
+        if flagged:
+            print('Regressions against', args.baseline)
+            for line in flagged:
+                print('  ' + line)
+            raise SystemExit(1)
+        print('No regressions against', args.baseline)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+"""
+Check a downloaded ballot audit log, or one receipt, without the server.
+
+The log is what ``/audit/log.jsonl`` returns (gzipped or not): leaf hashes
+and checkpoints, without the ballot records. The tree is rebuilt in order
+and each checkpoint's root and chain link compared; ``--root`` also
+compares the last checkpoint with a published root. Records, where a line
+has one, are hashed again and must match their leaf. With ``--proof`` the
+file is instead a saved response from ``/audit/proof/<index>``, checked
+against ``--root`` (or its own root).
+
+Run:
+    python scripts\\verify_audit_log.py audit-log.jsonl.gz --root 3f1c...
+    python scripts\\verify_audit_log.py proof-17.json --proof --root 3f1c...
+"""
+import argparse
+import gzip
+import json
+import os
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from services.audit import AuditError, verify_entries, verify_inclusion  # noqa: E402
+
+
+def read_entries(path):
+    with open(path, 'rb') as f:
+        gzipped = f.read(2) == b'\x1f\x8b'
+    opener = gzip.open if gzipped else open
+    with opener(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+def check_log(path, root):
+    try:
+        verifier = verify_entries(read_entries(path))
+    except AuditError as e:
+        raise SystemExit(f'FAILED: {e}')
+    actual = verifier.root.hex() if verifier.root else None
+    if root is not None and root.lower() != actual:
+        raise SystemExit(f'FAILED: latest root {actual} does not match {root}')
+    print(f'OK: {verifier.size} ballots, {verifier.checkpoints} checkpoints; root {actual}')
+
+
+def check_proof(path, root):
+    with open(path, encoding='utf-8') as f:
+        proof = json.load(f)
+    root = root or proof['root']
+    ok = verify_inclusion(proof['index'], proof['tree_size'], bytes.fromhex(proof['leaf']),
+                          [bytes.fromhex(h) for h in proof['path']], bytes.fromhex(root))
+    if not ok:
+        raise SystemExit(f'FAILED: entry {proof["index"]} is not in the tree of size {proof["tree_size"]} with root {root}')
+    print(f'OK: entry {proof["index"]} is in the tree of size {proof["tree_size"]} with root {root}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[0])
+    parser.add_argument('path', help='Downloaded log (.jsonl or .jsonl.gz), or a proof with --proof.')
+    parser.add_argument('--root', default=None, help='Published root (hex) to check against.')
+    parser.add_argument('--proof', action='store_true', help='Check a saved inclusion proof instead.')
+    args = parser.parse_args()
+    if args.proof:
+        check_proof(args.path, args.root)
+    else:
+        check_log(args.path, args.root)
+
+
+if __name__ == '__main__':
+    main()
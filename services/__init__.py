@@ -0,0 +1,5 @@
+"""Supporting services for the voting app (queues, caches, helpers).
+
+Modules here do not import ``run`` so they can be used from scripts and
+background threads without pulling in the Flask app.
+"""
@@ -0,0 +1,130 @@
+"""
+Admission control for election-open spikes.
+
+Requests are grouped into route classes (login, ballot, submit). Each class
+has a cap on requests in flight and, optionally, a token bucket limiting
+how fast new visitors are let in (``rate`` per second, up to ``burst`` at
+once).
+
+A request that finds its class full waits up to ``max_wait`` seconds for a
+slot, in arrival order, and is then shed. New visitors the bucket turns
+away get a numbered ticket instead: tickets are called in order at the
+class's rate, and a ticket holder who comes back (the waiting-room page
+refreshes itself after ``retry_after``) goes in once called, ahead of
+anyone who arrived later. Admitted requests finish at full speed instead of
+everybody slowing down together.
+"""
+import math
+import threading
+import time
+from collections import namedtuple
+
+Decision = namedtuple('Decision', 'admitted ticket position retry_after')
+
+
+class RouteClass:
+    def __init__(self, name, max_in_flight, rate=None, burst=None, max_wait=1.0):
+        self.name = name
+        self.max_in_flight = max_in_flight
+        # token bucket for new visitors; rate None lets everyone straight in
+        self.rate = rate or None
+        self.burst = burst or (rate * 2 if rate else None)
+        self.max_wait = max_wait
+        self.tokens = float(self.burst or 0)
+        self.refilled = time.monotonic()
+        self.in_flight = 0
+        self.waiting = 0
+        # waiting-room tickets: handed out up to `issued`, called up to `called`
+        self.issued = 0
+        self.called = 0.0
+        self.cond = None
+        # counters, read by diagnostics
+        self.admitted = 0
+        self.queued = 0
+        self.shed = 0
+
+
+class AdmissionController:
+    def __init__(self, classes):
+        self._lock = threading.Lock()
+        self.classes = {}
+        for cls in classes:
+            cls.cond = threading.Condition(self._lock)
+            self.classes[cls.name] = cls
+
+    def _refill(self, cls, now):
+        elapsed = now - cls.refilled
+        cls.refilled = now
+        if cls.rate is None:
+            return
+        # waiting tickets are called at the class's rate and take the tokens
+        # that accrue while anyone is waiting; new visitors only get the rest
+        if cls.called < cls.issued:
+            cls.called = min(float(cls.issued), cls.called + elapsed * cls.rate)
+            if cls.called < cls.issued:
+                return
+        cls.tokens = min(float(cls.burst), cls.tokens + elapsed * cls.rate)
+
+    def _retry_after(self, cls, position):
+        return max(1, min(60, math.ceil(position / cls.rate))) if cls.rate else 1
+
+    def check_in(self, name, ticket=None):
+        """Let a new visitor in through the bucket, or give them a waiting-room ticket.
+
+        `ticket` is the one they were given on an earlier visit, if any.
+        """
+        cls = self.classes[name]
+        with self._lock:
+            self._refill(cls, time.monotonic())
+            if cls.rate is None:
+                return Decision(True, None, 0, 0)
+            if ticket is not None and 0 < ticket <= cls.issued:
+                if ticket <= cls.called:
+                    return Decision(True, None, 0, 0)
+                position = ticket - int(cls.called)
+                return Decision(False, ticket, position, self._retry_after(cls, position))
+            # nobody waiting and a token to spare: straight in
+            if cls.called >= cls.issued and cls.tokens >= 1:
+                cls.tokens -= 1
+                return Decision(True, None, 0, 0)
+            cls.issued += 1
+            cls.queued += 1
+            position = cls.issued - int(cls.called)
+            return Decision(False, cls.issued, position, self._retry_after(cls, position))
+
+    def enter(self, name):
+        """Take an in-flight slot, waiting up to the class's max_wait. False if shed."""
+        cls = self.classes[name]
+        with self._lock:
+            if cls.in_flight >= cls.max_in_flight:
+                deadline = time.monotonic() + cls.max_wait
+                cls.waiting += 1
+                try:
+                    while cls.in_flight >= cls.max_in_flight:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            cls.shed += 1
+                            return False
+                        cls.cond.wait(remaining)
+                finally:
+                    cls.waiting -= 1
+            cls.in_flight += 1
+            cls.admitted += 1
+            return True
+
+    def leave(self, name):
+        cls = self.classes[name]
+        with self._lock:
+            cls.in_flight -= 1
+            cls.cond.notify()
+
+    def stats(self):
+        with self._lock:
+            return {
+                name: {
+                    'in_flight': c.in_flight, 'waiting': c.waiting,
+                    'room': max(0, c.issued - int(c.called)),
+                    'admitted': c.admitted, 'queued': c.queued, 'shed': c.shed,
+                }
+                for name, c in self.classes.items()
+            }
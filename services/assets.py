@@ -0,0 +1,275 @@
+"""
+Fingerprinted, precompressed static files.
+
+``build()`` copies every file under ``static/`` (uploads excepted) to
+``static/dist/`` with a hash of its contents in the name, so a URL never
+changes meaning and browsers may keep it forever. Stylesheets have their
+``url()`` references rewritten to the fingerprinted names first. Next to
+each copy go the variants worth having: ``.br`` and ``.gz`` for text, WebP
+and AVIF for photos and backgrounds (each kept only when smaller). The
+source -> fingerprinted name map is written to ``dist/manifest.json``.
+
+``StaticAssets`` makes ``url_for('static', filename=...)`` return the
+fingerprinted URL and serves it as ``immutable``, picking the smallest
+variant the browser says it accepts. Files without a current build are
+served as before.
+
+Brotli needs the ``brotli`` package and AVIF a Pillow built with it; the
+build skips what isn't available.
+"""
+import gzip
+import hashlib
+import io
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import time
+
+from flask import request, send_from_directory
+
+DIST_DIR = 'dist'
+MANIFEST = 'manifest.json'
+# user uploads have their own content-addressed store
+SKIP_DIRS = {'uploads', DIST_DIR}
+TEXT_EXTENSIONS = {'.css', '.js', '.svg', '.json', '.txt', '.map'}
+IMAGE_EXTENSIONS = {'.png', '.jpg', '.jpeg'}
+# best first; (variant suffix, Content-Encoding or image type)
+ENCODINGS = (('br', 'br'), ('gz', 'gzip'))
+IMAGE_FORMATS = (('avif', 'image/avif', 'AVIF'), ('webp', 'image/webp', 'WEBP'))
+IMMUTABLE = 'public, max-age=31536000, immutable'
+CSS_URL = re.compile(r'''url\(\s*(['"]?)([^'")]+)\1\s*\)''')
+
+
+def _brotli():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def _pillow_formats():
+    """The image variant formats this Pillow can write."""
+    try:
+        from PIL import Image, features
+    except ImportError:
+        return None, ()
+    usable = []
+    for ext, mimetype, fmt in IMAGE_FORMATS:
+        try:
+            ok = features.check(ext)
+        except ValueError:
+            ok = False
+        if ok:
+            usable.append((ext, mimetype, fmt))
+    return Image, tuple(usable)
+
+
+def fingerprinted(path, data):
+    stem, ext = posixpath.splitext(path)
+    return f'{DIST_DIR}/{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}'
+
+
+def _write_atomic(path, data):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = path + '.part'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def _sources(static_dir):
+    for root, dirs, files in os.walk(static_dir):
+        rel_root = os.path.relpath(root, static_dir).replace(os.sep, '/')
+        if rel_root == '.':
+            rel_root = ''
+            dirs[:] = [d for d in dirs if d not in SKIP_DIRS]
+        for name in files:
+            if not name.startswith('.'):
+                yield posixpath.join(rel_root, name)
+
+
+def _rewrite_css(path, text, files):
+    """Point a stylesheet's url()s at the fingerprinted files."""
+    here = posixpath.dirname(path)
+    built_here = posixpath.join(DIST_DIR, here)
+
+    def sub(m):
+        quote, url = m.group(1), m.group(2)
+        if url.startswith(('data:', 'http:', 'https:', '//', '#')):
+            return m.group(0)
+        target = posixpath.normpath(posixpath.join(here, url.split('?')[0].split('#')[0]))
+        if target not in files:
+            return m.group(0)
+        return f'url({quote}{posixpath.relpath(files[target], built_here)}{quote})'
+
+    return CSS_URL.sub(sub, text)
+
+
+def _text_variants(data, brotli):
+    if brotli is not None:
+        yield 'br', brotli.compress(data, quality=11)
+    # mtime=0 keeps the output identical from one build to the next
+    yield 'gz', gzip.compress(data, compresslevel=9, mtime=0)
+
+
+def _image_variants(data, Image, formats, quality):
+    with Image.open(io.BytesIO(data)) as im:
+        im.load()
+        for ext, _, fmt in formats:
+            out = io.BytesIO()
+            im.save(out, fmt, quality=quality)
+            yield ext, out.getvalue()
+
+
+def build(static_dir, quality=80):
+    """Build dist/ and its manifest; returns the manifest.
+
+    Outputs are named by content, so files that haven't changed since the
+    last build are not encoded again. The previous build's files are kept:
+    servers still running with its manifest, and pages cached with its
+    URLs, go on serving them until the next build replaces this one.
+    """
+    brotli = _brotli()
+    Image, image_formats = _pillow_formats()
+    previous = _read_manifest(static_dir) or {}
+    built_before = set(previous.get('files', {}).values())
+    sources = sorted(_sources(static_dir))
+    files, variants = {}, {}
+    # stylesheets last, so the files they point at already have their names
+    for path in sorted(sources, key=lambda p: p.endswith('.css')):
+        with open(os.path.join(static_dir, path), 'rb') as f:
+            data = f.read()
+        ext = posixpath.splitext(path)[1].lower()
+        if ext == '.css':
+            data = _rewrite_css(path, data.decode('utf-8'), files).encode('utf-8')
+        target = fingerprinted(path, data)
+        files[path] = target
+        dest = os.path.join(static_dir, *target.split('/'))
+        if target in built_before and os.path.exists(dest):
+            made = previous.get('variants', {}).get(target, [])
+        else:
+            _write_atomic(dest, data)
+            if ext in TEXT_EXTENSIONS:
+                encoded = _text_variants(data, brotli)
+            elif ext in IMAGE_EXTENSIONS and image_formats:
+                encoded = _image_variants(data, Image, image_formats, quality)
+            else:
+                encoded = ()
+            made = []
+            for suffix, body in encoded:
+                # a variant that isn't smaller is never worth sending
+                if len(body) < len(data):
+                    _write_atomic(f'{dest}.{suffix}', body)
+                    made.append(suffix)
+        if made:
+            variants[target] = made
+    manifest = {'built': time.time(), 'files': files, 'variants': variants}
+    _prune(os.path.join(static_dir, DIST_DIR),
+           [(files, variants), (previous.get('files', {}), previous.get('variants', {}))])
+    _write_atomic(os.path.join(static_dir, DIST_DIR, MANIFEST), json.dumps(manifest, indent=1).encode('utf-8'))
+    return manifest
+
+
+def _prune(dist_dir, builds):
+    # drop what builds before the given (files, variants) ones made
+    keep = {MANIFEST}
+    for files, variants in builds:
+        for target in files.values():
+            rel = target.split('/', 1)[1]
+            keep.add(rel)
+            keep.update(f'{rel}.{suffix}' for suffix in variants.get(target, ()))
+    for root, _, names in os.walk(dist_dir):
+        for name in names:
+            rel = os.path.relpath(os.path.join(root, name), dist_dir).replace(os.sep, '/')
+            if rel not in keep:
+                os.remove(os.path.join(root, name))
+
+
+def _read_manifest(static_dir):
+    try:
+        with open(os.path.join(static_dir, DIST_DIR, MANIFEST), encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def load_manifest(static_dir):
+    """The last build's manifest, without entries whose source changed since; None if never built."""
+    manifest = _read_manifest(static_dir)
+    if manifest is None:
+        return None
+    stale = []
+    for path, target in manifest['files'].items():
+        try:
+            changed = os.stat(os.path.join(static_dir, path)).st_mtime > manifest['built']
+        except OSError:
+            changed = True
+        if changed or not os.path.exists(os.path.join(static_dir, target)):
+            stale.append(path)
+    for path in stale:
+        del manifest['files'][path]
+    return manifest
+
+
+def up_to_date(static_dir, manifest):
+    """True if `manifest` (from load_manifest) covers every current static file."""
+    return manifest is not None and set(_sources(static_dir)) == set(manifest['files'])
+
+
+class StaticAssets:
+    def __init__(self, static_dir):
+        self.static_dir = static_dir
+        self.files = {}
+        self.variants = {}
+        self._built = set()
+
+    def load(self, manifest):
+        manifest = manifest or {}
+        self.files = manifest.get('files', {})
+        self.variants = manifest.get('variants', {})
+        self._built = set(self.files.values())
+
+    def init_app(self, app):
+        app.url_defaults(self._url_defaults)
+        self._send_static = app.view_functions['static']
+        app.view_functions['static'] = self.send
+
+    def _url_defaults(self, endpoint, values):
+        if endpoint == 'static':
+            target = self.files.get(values.get('filename'))
+            if target is not None:
+                values['filename'] = target
+
+    def _pick(self, filename):
+        """(variant file, Content-Encoding, Content-Type, Vary) for this request."""
+        made = self.variants.get(filename, ())
+        ext = posixpath.splitext(filename)[1].lower()
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        if ext in TEXT_EXTENSIONS:
+            for suffix, encoding in ENCODINGS:
+                if suffix in made and request.accept_encodings[encoding]:
+                    return f'{filename}.{suffix}', encoding, mimetype, 'Accept-Encoding'
+            return filename, None, mimetype, 'Accept-Encoding'
+        if ext in IMAGE_EXTENSIONS:
+            # only types named outright: */* says nothing about AVIF support
+            accepted = {value for value, quality in request.accept_mimetypes if quality > 0}
+            for suffix, image_type, _ in IMAGE_FORMATS:
+                if suffix in made and image_type in accepted:
+                    return f'{filename}.{suffix}', None, image_type, 'Accept'
+            return filename, None, mimetype, 'Accept'
+        return filename, None, mimetype, None
+
+    def send(self, filename):
+        if filename not in self._built:
+            return self._send_static(filename=filename)
+        path, encoding, mimetype, vary = self._pick(filename)
+        resp = send_from_directory(self.static_dir, path, mimetype=mimetype, max_age=31536000)
+        resp.headers['Cache-Control'] = IMMUTABLE
+        if encoding:
+            resp.headers['Content-Encoding'] = encoding
+        if vary:
+            resp.vary.add(vary)
+        return resp
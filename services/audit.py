@@ -0,0 +1,292 @@
+"""
+Append-only, hash-chained ballot audit log.
+
+Every recorded ballot becomes a leaf ``SHA-256(0x00 || record)``. The record
+is canonical JSON of the election, the selections and a random salt; it
+holds no voter and no time, and the salt keeps a leaf from being matched to
+a choice by trying every possible ballot. Leaves are numbered in commit
+order and hashed into a Merkle tree as in RFC 6962 (Certificate
+Transparency), with interior nodes ``SHA-256(0x01 || left || right)``.
+
+The tree is kept incrementally. Only its right edge (one perfect-subtree
+root per set bit of the size) is held in memory, and each perfect subtree's
+root is stored once, when it completes. Appending is O(log n), and an
+inclusion proof is O(log n) hashes read from the stored nodes. Each group
+commit appends its batch of leaves and one checkpoint in the same
+transaction. A checkpoint is the new size and root, chained to the one
+before by ``chain = SHA-256(previous chain || size || root)``.
+
+Checking needs no database. ``verify_inclusion`` checks a voter's proof
+against a published root. ``StreamVerifier`` rebuilds every checkpoint
+from the leaves in order, with O(log n) memory however long the log; the
+log is exported as JSON Lines (``log_entries``) and checked line by line
+(``verify_entries``).
+"""
+import hashlib
+import json
+import secrets
+
+from sqlalchemy import func, select
+
+EMPTY_ROOT = hashlib.sha256(b'').digest()
+GENESIS_CHAIN = bytes(32)
+
+
+class AuditError(Exception):
+    """The log doesn't match a root, a chain link or its own records."""
+
+
+def make_record(election_id, selections, salt=None):
+    """Canonical JSON for a ballot: election, sorted (position, candidate id) pairs, salt."""
+    return json.dumps(
+        {
+            'election_id': election_id,
+            'selections': sorted([position, candidate_id] for position, candidate_id in selections),
+            'salt': salt or secrets.token_hex(16),
+        },
+        sort_keys=True, separators=(',', ':'),
+    )
+
+
+def leaf_hash(record):
+    return hashlib.sha256(b'\x00' + record.encode('utf-8')).digest()
+
+
+def node_hash(left, right):
+    return hashlib.sha256(b'\x01' + left + right).digest()
+
+
+def chain_hash(previous, size, root):
+    return hashlib.sha256(previous + size.to_bytes(8, 'big') + root).digest()
+
+
+class Frontier:
+    """The right edge of a tree: (level, hash) of each perfect subtree, largest first."""
+
+    def __init__(self, size=0, nodes=None):
+        self.size = size
+        self.nodes = list(nodes or [])
+
+    def append(self, leaf):
+        """Add a leaf; returns the (level, index, hash) of every subtree it completes."""
+        completed = []
+        level, index, node = 0, self.size, leaf
+        while self.nodes and self.nodes[-1][0] == level:
+            _, left = self.nodes.pop()
+            node = node_hash(left, node)
+            level += 1
+            index >>= 1
+            completed.append((level, index, node))
+        self.nodes.append((level, node))
+        self.size += 1
+        return completed
+
+    def root(self):
+        if not self.nodes:
+            return EMPTY_ROOT
+        # RFC 6962 splits at the largest power of two, so fold from the right
+        root = self.nodes[-1][1]
+        for _, left in reversed(self.nodes[:-1]):
+            root = node_hash(left, root)
+        return root
+
+
+def _split(n):
+    """Largest power of two below n (n > 1)."""
+    return 1 << ((n - 1).bit_length() - 1)
+
+
+def _perfect_subtrees(lo, hi):
+    """(level, index) of the perfect subtrees making up leaves [lo, hi), left to right."""
+    while lo < hi:
+        level = (hi - lo).bit_length() - 1
+        yield level, lo >> level
+        lo += 1 << level
+
+
+class AuditLog:
+    def __init__(self, leaves, nodes, checkpoints):
+        # leaves: seq, election_id, ballot_id, record, leaf
+        # nodes: level, idx, hash (perfect subtrees of two or more leaves)
+        # checkpoints: size, root, chain, created_at
+        self.leaves = leaves
+        self.nodes = nodes
+        self.checkpoints = checkpoints
+        # written only by the ballot writer thread
+        self._frontier = None
+        self._chain = GENESIS_CHAIN
+
+    def latest(self, conn):
+        """The newest checkpoint row, or None for an empty log."""
+        c = self.checkpoints.c
+        return conn.execute(select(self.checkpoints).order_by(c.size.desc()).limit(1)).first()
+
+    def _node(self, conn, level, index):
+        if level == 0:
+            t = self.leaves
+            return conn.execute(select(t.c.leaf).where(t.c.seq == index)).scalar_one()
+        t = self.nodes
+        return conn.execute(select(t.c.hash).where(t.c.level == level, t.c.idx == index)).scalar_one()
+
+    def _range_hash(self, conn, lo, hi):
+        """Merkle tree hash of leaves [lo, hi), from the stored perfect subtrees."""
+        hashes = [self._node(conn, level, index) for level, index in _perfect_subtrees(lo, hi)]
+        root = hashes[-1]
+        for left in reversed(hashes[:-1]):
+            root = node_hash(left, root)
+        return root
+
+    def _load(self, conn, latest):
+        if latest is None:
+            return Frontier(), GENESIS_CHAIN
+        nodes = [(level, self._node(conn, level, index)) for level, index in _perfect_subtrees(0, latest.size)]
+        return Frontier(latest.size, nodes), latest.chain
+
+    def append(self, conn, entries, now=None):
+        """Append leaves and a checkpoint inside the caller's transaction.
+
+        `entries` are (election_id, ballot_id, record) in commit order;
+        returns [(seq, leaf hash)] for them.
+        """
+        if not entries:
+            return []
+        latest = self.latest(conn)
+        frontier = self._frontier
+        # another process may have appended since, or our last batch rolled back
+        if frontier is None or latest is None or frontier.size != latest.size or frontier.root() != latest.root:
+            frontier, self._chain = self._load(conn, latest)
+        self._frontier = None
+        leaves, nodes, appended = [], [], []
+        for election_id, ballot_id, record in entries:
+            leaf = leaf_hash(record)
+            seq = frontier.size
+            nodes.extend({'level': level, 'idx': index, 'hash': h} for level, index, h in frontier.append(leaf))
+            leaves.append({'seq': seq, 'election_id': election_id, 'ballot_id': ballot_id,
+                           'record': record, 'leaf': leaf})
+            appended.append((seq, leaf))
+        conn.execute(self.leaves.insert(), leaves)
+        if nodes:
+            conn.execute(self.nodes.insert(), nodes)
+        root = frontier.root()
+        chain = chain_hash(self._chain, frontier.size, root)
+        conn.execute(self.checkpoints.insert().values(size=frontier.size, root=root, chain=chain, created_at=now))
+        # kept only if this commits; a rollback shows up as a size/root mismatch next time
+        self._frontier, self._chain = frontier, chain
+        return appended
+
+    def proof(self, conn, seq, size=None):
+        """Inclusion proof for leaf `seq` in the tree at checkpoint `size` (default: latest).
+
+        Returns (leaf hash, checkpoint row, path) or None if there is no such leaf or checkpoint.
+        """
+        c = self.checkpoints.c
+        if size is None:
+            checkpoint = self.latest(conn)
+        else:
+            checkpoint = conn.execute(select(self.checkpoints).where(c.size == size)).first()
+        if checkpoint is None or not 0 <= seq < checkpoint.size:
+            return None
+        path = []
+        lo, hi = 0, checkpoint.size
+        # RFC 6962 PATH(m, D[lo:hi]), collected top-down and returned leaf-first
+        while hi - lo > 1:
+            k = _split(hi - lo)
+            if seq < lo + k:
+                path.append(self._range_hash(conn, lo + k, hi))
+                hi = lo + k
+            else:
+                path.append(self._range_hash(conn, lo, lo + k))
+                lo += k
+        path.reverse()
+        return self._node(conn, 0, seq), checkpoint, path
+
+    def size(self, conn):
+        return conn.execute(select(func.coalesce(func.max(self.checkpoints.c.size), 0))).scalar()
+
+
+def verify_inclusion(seq, size, leaf, path, root):
+    """Check an inclusion proof (RFC 9162, 2.1.3.2)."""
+    if not 0 <= seq < size:
+        return False
+    fn, sn, r = seq, size - 1, leaf
+    for p in path:
+        if sn == 0:
+            return False
+        if fn & 1 or fn == sn:
+            r = node_hash(p, r)
+            if not fn & 1:
+                while not fn & 1 and fn != 0:
+                    fn >>= 1
+                    sn >>= 1
+        else:
+            r = node_hash(r, p)
+        fn >>= 1
+        sn >>= 1
+    return sn == 0 and r == root
+
+
+class StreamVerifier:
+    """Rebuild the tree from leaves in order and check each checkpoint on the way."""
+
+    def __init__(self):
+        self.frontier = Frontier()
+        self.chain = GENESIS_CHAIN
+        self.checkpoints = 0
+        # the last checkpoint checked
+        self.size = 0
+        self.root = None
+
+    def leaf(self, seq, leaf=None, record=None):
+        """Add leaf `seq`: its hash, its record, or both (then they must agree)."""
+        if seq != self.frontier.size:
+            raise AuditError(f'leaf {seq} out of order, expected {self.frontier.size}')
+        if record is not None:
+            computed = leaf_hash(record)
+            if leaf is not None and computed != leaf:
+                raise AuditError(f'leaf {seq} does not match its record')
+            leaf = computed
+        self.frontier.append(leaf)
+
+    def checkpoint(self, size, root, chain=None):
+        if size != self.frontier.size:
+            raise AuditError(f'checkpoint {size} arrived after {self.frontier.size} leaves')
+        if self.frontier.root() != root:
+            raise AuditError(f'root mismatch at size {size}')
+        expected = chain_hash(self.chain, size, root)
+        if chain is not None and chain != expected:
+            raise AuditError(f'chain broken at size {size}')
+        self.chain = expected
+        self.checkpoints += 1
+        self.size, self.root = size, root
+
+
+def log_entries(leaves, checkpoints):
+    """Interleave leaf rows (seq, election_id, leaf[, record]) and checkpoint rows
+    (size, root, chain), both in ascending order, into log entries."""
+    checkpoints = iter(checkpoints)
+    checkpoint = next(checkpoints, None)
+    for row in leaves:
+        seq = row.seq
+        entry = {'seq': seq, 'election_id': row.election_id, 'leaf': row.leaf.hex()}
+        record = row._mapping.get('record')
+        if record is not None:
+            entry['record'] = record
+        yield entry
+        while checkpoint is not None and checkpoint.size <= seq + 1:
+            if checkpoint.size == seq + 1:
+                yield {'size': checkpoint.size, 'root': checkpoint.root.hex(), 'chain': checkpoint.chain.hex()}
+            checkpoint = next(checkpoints, None)
+
+
+def verify_entries(entries):
+    """Check a whole log in order; returns the StreamVerifier or raises AuditError."""
+    verifier = StreamVerifier()
+    for entry in entries:
+        try:
+            if 'seq' in entry:
+                verifier.leaf(entry['seq'], bytes.fromhex(entry['leaf']), entry.get('record'))
+            else:
+                verifier.checkpoint(entry['size'], bytes.fromhex(entry['root']), bytes.fromhex(entry['chain']))
+        except (KeyError, TypeError, ValueError) as e:
+            raise AuditError(f'malformed log entry {entry!r}') from e
+    return verifier
@@ -0,0 +1,77 @@
+"""
+In-process cache of ballot definitions (election + grouped candidates + limits).
+
+The vote page and ballot validation need the same data for every voter in
+an election, so it is loaded once per election and kept as immutable
+tuples until an admin write invalidates it.
+"""
+import threading
+from collections import namedtuple
+from types import MappingProxyType
+
+ElectionView = namedtuple('ElectionView', 'id title description start_date end_date status')
+CandidateView = namedtuple('CandidateView', 'id full_name party photo_filename position')
+
+
+class BallotDefinition(namedtuple('BallotDefinition', 'election positions limits candidate_positions')):
+    """Read-only ballot for one election.
+
+    positions: tuple of (position_title, tuple of CandidateView)
+    limits: position_title -> votes a voter may cast
+    candidate_positions: candidate_id -> position_title
+    """
+    __slots__ = ()
+
+
+def make_definition(election, positions, limits):
+    positions = tuple((title, tuple(cands)) for title, cands in positions)
+    candidate_positions = {c.id: title for title, cands in positions for c in cands}
+    return BallotDefinition(
+        election=election,
+        positions=positions,
+        limits=MappingProxyType(dict(limits)),
+        candidate_positions=MappingProxyType(candidate_positions),
+    )
+
+
+class BallotCache:
+    def __init__(self, loader):
+        # loader(election_id) -> BallotDefinition or None
+        self.loader = loader
+        self._entries = {}
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, election_id):
+        entry = self._entries.get(election_id)
+        if entry is not None:
+            self.hits += 1
+            return entry
+        # one loader per miss storm: everybody else waits for the first load
+        with self._lock:
+            entry = self._entries.get(election_id)
+            if entry is not None:
+                self.hits += 1
+                return entry
+            self.misses += 1
+            generation = self._generation
+            entry = self.loader(election_id)
+            # an invalidation during the load means the result may be stale
+            if entry is not None and generation == self._generation:
+                self._entries[election_id] = entry
+            return entry
+
+    def invalidate(self, *election_ids):
+        """Drop the given elections, or everything when called without ids."""
+        with self._lock:
+            self._generation += 1
+            if not election_ids:
+                self._entries.clear()
+                return
+            for election_id in election_ids:
+                try:
+                    self._entries.pop(int(election_id), None)
+                except (TypeError, ValueError):
+                    continue
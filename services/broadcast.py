@@ -0,0 +1,141 @@
+"""
+Coalescing fan-out of live result changes to Server-Sent Events clients.
+
+Writers call ``mark_dirty(election_id)`` after a commit. One publisher
+thread wakes at most once per ``window`` seconds, takes one snapshot per
+dirty election that somebody is watching, diffs it against the previous
+snapshot and puts the delta on every subscriber's queue. However many
+ballots arrive and however many admin tabs are open, the database is read
+once per election per window.
+
+Ballots written by another worker process never call ``mark_dirty`` here;
+with ``poll`` set, every watched election is re-read that often anyway.
+"""
+import json
+import queue
+import threading
+import time
+
+
+class Subscription:
+    def __init__(self, election_id, maxsize=64):
+        self.election_id = election_id
+        self.queue = queue.Queue(maxsize=maxsize)
+
+    def get(self, timeout):
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+def diff_snapshots(old, new):
+    """Return only the parts of `new` that differ from `old` (None if nothing did).
+
+    Snapshots are ``{'ballots': int, 'candidates': {candidate_id: votes}}``;
+    values are absolute so a client can apply deltas idempotently.
+    """
+    old = old or {}
+    delta = {}
+    if old.get('ballots') != new.get('ballots'):
+        delta['ballots'] = new.get('ballots')
+    old_c = old.get('candidates') or {}
+    changed = {cid: votes for cid, votes in (new.get('candidates') or {}).items() if old_c.get(cid) != votes}
+    if changed:
+        delta['candidates'] = changed
+    return delta or None
+
+
+def format_sse(data, event=None):
+    msg = ''
+    if event:
+        msg += f'event: {event}\n'
+    msg += f'data: {json.dumps(data, separators=(",", ":"))}\n\n'
+    return msg
+
+
+class ResultsBroker:
+    def __init__(self, snapshot, window=0.5, poll=None):
+        # snapshot(election_id) -> {'ballots': int, 'candidates': {id: votes}}
+        self.snapshot = snapshot
+        self.window = window
+        self.poll = poll or None
+        self._subs = {}
+        self._last = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+
+    def subscribe(self, election_id):
+        sub = Subscription(election_id)
+        with self._lock:
+            self._subs.setdefault(election_id, set()).add(sub)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name='results-broker', daemon=True)
+                self._thread.start()
+        return sub
+
+    def unsubscribe(self, sub):
+        with self._lock:
+            subs = self._subs.get(sub.election_id)
+            if subs:
+                subs.discard(sub)
+                if not subs:
+                    del self._subs[sub.election_id]
+                    self._last.pop(sub.election_id, None)
+
+    def remember(self, election_id, snap):
+        # record the snapshot a new subscriber started from so the next delta is relative to it
+        with self._lock:
+            self._last.setdefault(election_id, snap)
+
+    def mark_dirty(self, election_id):
+        with self._lock:
+            if election_id not in self._subs:
+                return
+            self._dirty.add(election_id)
+        self._wake.set()
+
+    def subscriber_count(self, election_id=None):
+        with self._lock:
+            if election_id is not None:
+                return len(self._subs.get(election_id, ()))
+            return sum(len(s) for s in self._subs.values())
+
+    def _run(self):
+        while True:
+            woken = self._wake.wait(self.poll)
+            # let more changes pile up before reading the database
+            time.sleep(self.window)
+            with self._lock:
+                self._wake.clear()
+                dirty, self._dirty = self._dirty, set()
+                if not woken:
+                    dirty.update(self._subs)
+            for election_id in dirty:
+                self._publish(election_id)
+
+    def _publish(self, election_id):
+        try:
+            snap = self.snapshot(election_id)
+        except Exception:
+            return
+        with self._lock:
+            delta = diff_snapshots(self._last.get(election_id), snap)
+            if delta is None:
+                return
+            self._last[election_id] = snap
+            subs = list(self._subs.get(election_id, ()))
+        for sub in subs:
+            try:
+                sub.queue.put_nowait(delta)
+            except queue.Full:
+                # a stalled client: drop its backlog and hand it the full
+                # snapshot instead (same shape as a delta, values are absolute)
+                try:
+                    while True:
+                        sub.queue.get_nowait()
+                except queue.Empty:
+                    pass
+                sub.queue.put_nowait(snap)
@@ -0,0 +1,57 @@
+"""
+Cross-process cache invalidation through a stamp file.
+
+The ballot and page caches live inside each worker process. Under a
+pre-fork server an admin edit handled by one worker has to reach the
+others: ``bump()`` replaces a small file next to the database, and every
+worker compares that file's identity with the last one it saw before
+serving a request (one ``os.stat``, at most every ``interval`` seconds).
+"""
+import os
+import threading
+import time
+
+
+def _identity(st):
+    # os.replace gives the stamp a new inode, so this changes even where
+    # mtimes are coarse
+    return st.st_ino, st.st_mtime_ns
+
+
+class CacheStamp:
+    def __init__(self, path, interval=0.5):
+        self.path = path
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._seen = self._read()
+        self._checked = time.monotonic()
+
+    def _read(self):
+        try:
+            return _identity(os.stat(self.path))
+        except FileNotFoundError:
+            return None
+
+    def bump(self):
+        """Tell the other processes their caches are stale."""
+        tmp = f'{self.path}.{os.getpid()}.part'
+        with open(tmp, 'w') as f:
+            f.write(str(time.time_ns()))
+        mine = _identity(os.stat(tmp))
+        os.replace(tmp, self.path)
+        # this process has already dropped its own caches
+        with self._lock:
+            self._seen = mine
+
+    def changed(self):
+        """True once for each bump made by another process since the last call."""
+        now = time.monotonic()
+        if now - self._checked < self.interval:
+            return False
+        with self._lock:
+            self._checked = now
+            current = self._read()
+            if current == self._seen:
+                return False
+            self._seen = current
+            return True
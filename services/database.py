@@ -0,0 +1,117 @@
+"""
+SQLite production tuning: per-connection pragmas, pools and a read/write split.
+
+Every connection gets the pragmas in ``SQLITE_PRAGMAS`` (WAL, synchronous,
+cache_size, mmap_size, busy_timeout, ...). The default engine is the writer:
+a small pool whose transactions start with BEGIN IMMEDIATE so two writers
+queue on busy_timeout instead of failing with "database is locked" when a
+read lock can't be upgraded. A second "reader" engine with a larger pool
+and ``query_only`` set serves plain SELECTs, which in WAL mode never wait
+for the writer.
+
+RoutingSession sends a session's SELECTs to the reader until the session
+flushes or runs anything that isn't a SELECT; from then until the end of
+the transaction everything goes to the writer so it reads its own writes.
+"""
+from functools import partial
+
+import sqlalchemy as sa
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.sql import Select
+
+READER_BIND = 'reader'
+
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -32000,        # KiB (negative) -> ~32 MB page cache per connection
+    'mmap_size': 268435456,      # 256 MB memory-mapped reads
+    'busy_timeout': 5000,        # ms to wait for a lock before SQLITE_BUSY
+    'temp_store': 'MEMORY',
+}
+
+
+def apply_pragmas(dbapi_conn, pragmas):
+    cur = dbapi_conn.cursor()
+    try:
+        for name, value in pragmas.items():
+            cur.execute(f'PRAGMA {name}={value}')
+    finally:
+        cur.close()
+
+
+def _on_connect(pragmas, query_only, immediate, dbapi_conn, record):
+    if immediate:
+        # let SQLAlchemy's "begin" hook issue BEGIN itself (see _begin_immediate)
+        dbapi_conn.isolation_level = None
+    apply_pragmas(dbapi_conn, pragmas)
+    if query_only:
+        apply_pragmas(dbapi_conn, {'query_only': 'ON'})
+
+
+def _begin_immediate(conn):
+    conn.exec_driver_sql('BEGIN IMMEDIATE')
+
+
+def configure_sqlite(config, db_path):
+    """Fill in SQLALCHEMY_* settings for a tuned, file-backed SQLite database.
+
+    Reads SQLITE_PRAGMAS, SQLITE_WRITER_POOL_SIZE, SQLITE_READER_POOL_SIZE,
+    SQLITE_POOL_TIMEOUT and SQLITE_READ_REPLICA from `config`.
+    """
+    uri = 'sqlite:///' + db_path
+    busy_ms = int(config['SQLITE_PRAGMAS'].get('busy_timeout', 5000))
+    connect_args = {'check_same_thread': False, 'timeout': busy_ms / 1000.0}
+    config['SQLALCHEMY_DATABASE_URI'] = uri
+    config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'poolclass': sa.pool.QueuePool,
+        'pool_size': config['SQLITE_WRITER_POOL_SIZE'],
+        'max_overflow': config['SQLITE_WRITER_POOL_SIZE'],
+        'pool_timeout': config['SQLITE_POOL_TIMEOUT'],
+        'connect_args': connect_args,
+    }
+    if config['SQLITE_READ_REPLICA']:
+        config['SQLALCHEMY_BINDS'] = {
+            READER_BIND: {
+                'url': uri,
+                'poolclass': sa.pool.QueuePool,
+                'pool_size': config['SQLITE_READER_POOL_SIZE'],
+                'max_overflow': config['SQLITE_READER_POOL_SIZE'],
+                'pool_timeout': config['SQLITE_POOL_TIMEOUT'],
+                'connect_args': dict(connect_args),
+            },
+        }
+
+
+def install_sqlite_tuning(app, db):
+    """Attach the pragma/BEGIN hooks to the app's engines (call before first use)."""
+    pragmas = app.config['SQLITE_PRAGMAS']
+    with app.app_context():
+        engines = dict(db.engines)
+    writer = engines[None]
+    if writer.dialect.name != 'sqlite':
+        return
+    immediate = app.config['SQLITE_WRITER_BEGIN_IMMEDIATE']
+    event.listen(writer, 'connect', partial(_on_connect, pragmas, False, immediate))
+    if immediate:
+        event.listen(writer, 'begin', _begin_immediate)
+    reader = engines.get(READER_BIND)
+    if reader is not None:
+        event.listen(reader, 'connect', partial(_on_connect, pragmas, True, False))
+
+
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and not self._flushing and not self.info.get('writer') and isinstance(clause, Select):
+            reader = self._db.engines.get(READER_BIND)
+            if reader is not None:
+                return reader
+        self.info['writer'] = True
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+@event.listens_for(RoutingSession, 'after_transaction_end')
+def _reset_routing(session, transaction):
+    if transaction.parent is None:
+        session.info.pop('writer', None)
@@ -0,0 +1,153 @@
+"""
+Batched group-commit write queue.
+
+Request threads call ``submit(item)`` and wait on the returned future. A
+single writer thread drains the queue, applies up to ``max_batch`` items
+inside one transaction and commits once, so a burst of submissions costs
+one fsync per batch instead of one per request and SQLite only ever sees
+one writer from this process.
+
+If a batch fails as a whole (for example a constraint we did not expect),
+it is rolled back and the items are retried one transaction each so one
+bad item cannot fail its neighbours.
+"""
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+
+class QueueFull(Exception):
+    """Raised by submit() when the queue is at capacity (caller should shed load)."""
+
+
+class GroupCommitQueue:
+    def __init__(self, apply_item, max_batch=200, max_wait=0.005, maxsize=10000, name='group-commit',
+                 on_commit=None, on_batch=None):
+        # apply_item(conn, item) -> result; runs inside the batch transaction
+        self.apply_item = apply_item
+        # on_batch(conn, [(item, result), ...]) runs inside the transaction
+        # after the last item, for work done once per batch; if it raises,
+        # the batch fails like an item would
+        self.on_batch = on_batch
+        # on_commit([(item, result), ...]) is called on the writer thread after each commit
+        self.on_commit = on_commit
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self.name = name
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._engine = None
+        self._conn = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        # simple counters, read by diagnostics
+        self.batches = 0
+        self.items = 0
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, engine):
+        with self._lock:
+            if self.running:
+                return
+            self._engine = engine
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def stop(self, timeout=5):
+        self._stopping.set()
+        thread = self._thread
+        if thread is not None:
+            thread.join(timeout)
+        self._thread = None
+
+    def submit(self, item):
+        fut = Future()
+        try:
+            self._queue.put_nowait((item, fut))
+        except queue.Full:
+            raise QueueFull('write queue is full')
+        return fut
+
+    def qsize(self):
+        return self._queue.qsize()
+
+    def _collect(self):
+        # block for the first item, then gather more until the batch is full
+        # or max_wait has passed since the first one arrived
+        try:
+            first = self._queue.get(timeout=0.25)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining > 0:
+                    batch.append(self._queue.get(timeout=remaining))
+                else:
+                    batch.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        # the writer keeps one dedicated connection so it never competes with
+        # request threads for a pool slot
+        self._conn = self._engine.connect()
+        try:
+            while not (self._stopping.is_set() and self._queue.empty()):
+                batch = self._collect()
+                if batch:
+                    self._write(batch)
+        finally:
+            self._conn.close()
+
+    def _write(self, batch):
+        conn = self._conn
+        results = []
+        try:
+            with conn.begin():
+                for item, _ in batch:
+                    results.append(self.apply_item(conn, item))
+                if self.on_batch is not None:
+                    self.on_batch(conn, [(item, result) for (item, _), result in zip(batch, results)])
+        except Exception:
+            # fall back to one transaction per item
+            for item, fut in batch:
+                self._write_one(item, fut)
+            self.batches += 1
+            return
+        for (_, fut), result in zip(batch, results):
+            fut.set_result(result)
+        self.batches += 1
+        self.items += len(batch)
+        self._committed([(item, result) for (item, _), result in zip(batch, results)])
+
+    def _write_one(self, item, fut):
+        conn = self._conn
+        try:
+            with conn.begin():
+                result = self.apply_item(conn, item)
+                if self.on_batch is not None:
+                    self.on_batch(conn, [(item, result)])
+        except Exception as exc:
+            fut.set_exception(exc)
+            return
+        fut.set_result(result)
+        self.items += 1
+        self._committed([(item, result)])
+
+    def _committed(self, pairs):
+        if self.on_commit is None:
+            return
+        try:
+            self.on_commit(pairs)
+        except Exception:
+            # notifications are best effort; the data is already committed
+            pass
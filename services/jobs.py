@@ -0,0 +1,225 @@
+"""
+Background jobs for slow admin operations, queued in a SQLite table.
+
+An admin request calls ``enqueue(kind, **params)`` and returns at once with
+the job id; a worker thread claims queued jobs one at a time and runs the
+handler registered for their kind, recording progress in the job row so any
+process can report it.
+
+Handlers should do their writes through ``Job.delete_chunks`` (or their own
+short transactions): each chunk commits on its own and the worker sleeps
+``pause`` seconds before the next, so a large delete never keeps voters'
+ballot transactions waiting on the write lock for more than one chunk.
+Handlers must be safe to run again from the start: a job that was running
+when the process died is queued again by ``recover()``.
+"""
+import json
+import logging
+import threading
+import time
+from datetime import datetime
+
+from sqlalchemy import func, select
+
+log = logging.getLogger('voting.jobs')
+
+
+class Job:
+    """What a handler gets: its id and params, plus progress and chunked writes."""
+
+    def __init__(self, queue, engine, row):
+        self.queue = queue
+        self.engine = engine
+        self.id = row.id
+        self.kind = row.kind
+        self.params = json.loads(row.params or '{}')
+        self.done = 0
+        self.total = None
+
+    def progress(self, done=None, total=None, message=None, conn=None):
+        """Record progress; pass `conn` to write it in the caller's transaction."""
+        if done is not None:
+            self.done = done
+        if total is not None:
+            self.total = total
+        values = {'done': self.done, 'total': self.total}
+        if message is not None:
+            values['message'] = message
+        stmt = self.queue.table.update().where(self.queue.table.c.id == self.id).values(**values)
+        if conn is not None:
+            conn.execute(stmt)
+        else:
+            with self.engine.begin() as own:
+                own.execute(stmt)
+
+    def count(self, table, where):
+        with self.engine.connect() as conn:
+            return conn.execute(select(func.count()).select_from(table).where(where)).scalar()
+
+    def delete_chunks(self, table, where):
+        """Delete the rows of `table` matching `where`, `chunk_size` per transaction.
+
+        Progress advances by the rows deleted; returns how many that was.
+        """
+        key = list(table.primary_key.columns)[0]
+        deleted = 0
+        while True:
+            with self.engine.begin() as conn:
+                chunk = select(key).where(where).limit(self.queue.chunk_size)
+                n = conn.execute(table.delete().where(key.in_(chunk))).rowcount
+                deleted += n
+                self.progress(self.done + n, conn=conn)
+            if n < self.queue.chunk_size:
+                return deleted
+            # give queued ballot transactions the write lock
+            time.sleep(self.queue.pause)
+
+
+class JobQueue:
+    def __init__(self, table, chunk_size=500, pause=0.05, poll=2.0, context=None, name='jobs'):
+        # table columns: id, kind, params, status, done, total, message,
+        # created_at, started_at, finished_at
+        self.table = table
+        self.chunk_size = chunk_size
+        self.pause = pause
+        # seconds between looks at the table for jobs enqueued by other processes
+        self.poll = poll
+        # context() -> context manager every job runs inside (the app context)
+        self.context = context
+        self.name = name
+        self.handlers = {}
+        self._engine = None
+        # read-only engine for looking at the table while idle (default: the writer)
+        self._reader = None
+        self._thread = None
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        # simple counters, read by diagnostics
+        self.completed = 0
+        self.failed = 0
+
+    def handler(self, kind):
+        """Decorator: register ``fn(job, **params)`` for jobs of `kind`."""
+        def register(fn):
+            self.handlers[kind] = fn
+            return fn
+        return register
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, engine, reader=None):
+        with self._lock:
+            if self.running:
+                return
+            self._engine = engine
+            self._reader = reader
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+
+    def enqueue(self, engine, kind, **params):
+        """Queue a job and return its id."""
+        if kind not in self.handlers:
+            raise ValueError(f'No handler for job kind {kind!r}')
+        with engine.begin() as conn:
+            job_id = conn.execute(self.table.insert().values(
+                kind=kind, params=json.dumps(params), status='queued', done=0, created_at=datetime.utcnow(),
+            )).inserted_primary_key[0]
+        self._wake.set()
+        return job_id
+
+    def get(self, engine, job_id):
+        """The job's row as a dict, or None."""
+        with engine.connect() as conn:
+            row = conn.execute(self.table.select().where(self.table.c.id == job_id)).mappings().first()
+        return as_dict(row) if row else None
+
+    def recover(self, engine):
+        """Queue again the jobs a dead process left running; returns how many."""
+        with engine.begin() as conn:
+            return conn.execute(
+                self.table.update().where(self.table.c.status == 'running').values(status='queued')
+            ).rowcount
+
+    def _pending(self):
+        t = self.table
+        with (self._reader or self._engine).connect() as conn:
+            return conn.execute(select(t.c.id).where(t.c.status == 'queued').limit(1)).first() is not None
+
+    def _claim(self):
+        # look first without a write transaction: the writer's BEGIN IMMEDIATE
+        # would take the write lock on every idle poll
+        if not self._pending():
+            return None
+        t = self.table
+        with self._engine.begin() as conn:
+            row = conn.execute(
+                t.select().where(t.c.status == 'queued').order_by(t.c.id).limit(1)
+            ).first()
+            if row is None:
+                return None
+            # another process may have claimed it between the select and here
+            claimed = conn.execute(
+                t.update().where(t.c.id == row.id, t.c.status == 'queued')
+                .values(status='running', started_at=datetime.utcnow())
+            ).rowcount
+        return row if claimed else None
+
+    def run_pending(self, engine=None, reader=None):
+        """Run queued jobs until there are none; returns how many ran."""
+        if engine is not None:
+            self._engine = engine
+            self._reader = reader
+        ran = 0
+        while True:
+            row = self._claim()
+            if row is None:
+                return ran
+            self._execute(row)
+            ran += 1
+
+    def _execute(self, row):
+        job = Job(self, self._engine, row)
+        handler = self.handlers.get(row.kind)
+        try:
+            if handler is None:
+                raise ValueError(f'No handler for job kind {row.kind!r}')
+            if self.context is not None:
+                with self.context():
+                    message = handler(job, **job.params)
+            else:
+                message = handler(job, **job.params)
+        except Exception as exc:
+            log.exception('job %s (%s) failed', row.id, row.kind)
+            self._finish(row.id, 'failed', str(exc) or exc.__class__.__name__)
+            self.failed += 1
+            return
+        self._finish(row.id, 'done', message)
+        self.completed += 1
+
+    def _finish(self, job_id, status, message):
+        values = {'status': status, 'finished_at': datetime.utcnow()}
+        if message is not None:
+            values['message'] = message
+        with self._engine.begin() as conn:
+            conn.execute(self.table.update().where(self.table.c.id == job_id).values(**values))
+
+    def _run(self):
+        while True:
+            try:
+                self.run_pending()
+            except Exception:
+                log.exception('job worker error')
+            self._wake.wait(self.poll)
+            self._wake.clear()
+
+
+def as_dict(row):
+    job = dict(row)
+    job['params'] = json.loads(job['params'] or '{}')
+    for key in ('created_at', 'started_at', 'finished_at'):
+        if job.get(key) is not None:
+            job[key] = job[key].isoformat(timespec='seconds')
+    job['percent'] = round(100.0 * job['done'] / job['total'], 1) if job.get('total') else None
+    return job
@@ -0,0 +1,229 @@
+"""
+Request and SQL instrumentation with a Prometheus text exposition.
+
+``instrument_app`` hooks Flask's request cycle, template signals and the
+SQLAlchemy engines' cursor events. Each request records its latency, the
+number of SQL statements it ran, the time spent in them and in Jinja
+rendering; statements slower than a threshold are logged with their
+parameters. Everything is kept in fixed-bucket histograms and counters
+(a few dict updates per request), so it is cheap enough to leave on.
+"""
+import bisect
+import logging
+import threading
+import time
+
+from flask import g, has_request_context, request
+from flask.signals import before_render_template, template_rendered
+from sqlalchemy import event
+
+slow_query_log = logging.getLogger('voting.sql.slow')
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{' + ','.join(f'{k}="{_escape(v)}"' for k, v in pairs) + '}'
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    kind = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = list(self._values.items())
+        for labels, value in sorted(items):
+            yield f'{self.name}{_labels(self.labelnames, labels)} {_number(value)}'
+
+
+class Histogram:
+    kind = 'histogram'
+
+    def __init__(self, name, help, buckets, labels=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> per-bucket counts (last one is +Inf), then the sum
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        idx = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[idx] += 1
+            series[-1] += value
+
+    def samples(self):
+        with self._lock:
+            items = [(labels, list(series)) for labels, series in self._series.items()]
+        for labels, series in sorted(items):
+            running = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series[:-1]):
+                running += count
+                le = bound if bound == '+Inf' else _number(float(bound))
+                yield f'{self.name}_bucket{_labels(self.labelnames, labels, [("le", le)])} {running}'
+            yield f'{self.name}_sum{_labels(self.labelnames, labels)} {_number(series[-1])}'
+            yield f'{self.name}_count{_labels(self.labelnames, labels)} {running}'
+
+
+class Callback:
+    """A value read at scrape time from somewhere else (a queue, a cache)."""
+
+    def __init__(self, name, help, read, kind='gauge'):
+        self.name, self.help, self.read, self.kind = name, help, read, kind
+
+    def samples(self):
+        yield f'{self.name} {_number(self.read())}'
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def add(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self.add(Counter(name, help, labels))
+
+    def histogram(self, name, help, buckets, labels=()):
+        return self.add(Histogram(name, help, buckets, labels))
+
+    def callback(self, name, help, read, kind='gauge'):
+        """`read()` is called at scrape time; kind is 'gauge' or 'counter'."""
+        return self.add(Callback(name, help, read, kind))
+
+    def render(self):
+        lines = []
+        for m in self._metrics:
+            lines.append(f'# HELP {m.name} {m.help}')
+            lines.append(f'# TYPE {m.name} {m.kind}')
+            lines.extend(m.samples())
+        return '\n'.join(lines) + '\n'
+
+
+def instrument_app(app, engines, registry, slow_query_seconds=0.1, server_timing=False):
+    """Record per-request latency, SQL and template timings into `registry`.
+
+    `engines` are the SQLAlchemy engines to watch. With `server_timing` on,
+    responses get a Server-Timing header (db, render and total time).
+    """
+    request_seconds = registry.histogram(
+        'http_request_duration_seconds', 'Request latency by endpoint.', LATENCY_BUCKETS, ('endpoint', 'method'))
+    requests_total = registry.counter(
+        'http_requests_total', 'Requests by endpoint and status.', ('endpoint', 'method', 'status'))
+    request_queries = registry.histogram(
+        'db_queries_per_request', 'SQL statements run by one request.', QUERY_COUNT_BUCKETS, ('endpoint',))
+    request_db_seconds = registry.histogram(
+        'db_seconds_per_request', 'Time one request spent in SQL.', LATENCY_BUCKETS, ('endpoint',))
+    render_seconds = registry.histogram(
+        'template_render_seconds_per_request', 'Time one request spent rendering templates.', LATENCY_BUCKETS,
+        ('endpoint',))
+    statements_total = registry.counter(
+        'db_statements_total', 'SQL statements run, including background threads.', ('engine',))
+    slow_total = registry.counter(
+        'db_slow_statements_total', 'SQL statements slower than the slow-query threshold.', ('engine',))
+
+    # start times by cursor; after_cursor_execute is skipped when a statement
+    # fails, so handle_error drops those, or they would pile up on pooled connections
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('_query_started', {})[id(cursor)] = time.perf_counter()
+
+    def handle_error(exception_context):
+        # a connection runs one statement at a time: whatever is pending failed
+        conn = exception_context.connection
+        if conn is not None:
+            conn.info.pop('_query_started', None)
+
+    def make_after(engine_name):
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            started = conn.info.get('_query_started', {}).pop(id(cursor), None)
+            if started is None:
+                return
+            elapsed = time.perf_counter() - started
+            statements_total.inc(engine_name)
+            if has_request_context() and '_metrics_db' in g:
+                stats = g._metrics_db
+                stats[0] += 1
+                stats[1] += elapsed
+            if elapsed >= slow_query_seconds:
+                slow_total.inc(engine_name)
+                params = repr(parameters)
+                slow_query_log.warning(
+                    'slow query (%.1f ms, %s): %s | params: %s', elapsed * 1000, engine_name,
+                    ' '.join(statement.split()), params if len(params) <= 500 else params[:500] + '...',
+                )
+        return after_cursor_execute
+
+    for name, engine in engines.items():
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+        event.listen(engine, 'after_cursor_execute', make_after(name or 'default'))
+        event.listen(engine, 'handle_error', handle_error)
+
+    def on_render_start(sender, template, context, **extra):
+        if has_request_context() and '_metrics_render' in g:
+            g._metrics_render_started.append(time.perf_counter())
+
+    def on_rendered(sender, template, context, **extra):
+        if has_request_context() and g.get('_metrics_render_started'):
+            elapsed = time.perf_counter() - g._metrics_render_started.pop()
+            # nested includes are part of the outer template's time
+            if not g._metrics_render_started:
+                g._metrics_render[0] += elapsed
+
+    before_render_template.connect(on_render_start, app, weak=False)
+    template_rendered.connect(on_rendered, app, weak=False)
+
+    @app.before_request
+    def _metrics_start():
+        g._metrics_started = time.perf_counter()
+        g._metrics_db = [0, 0.0]
+        g._metrics_render = [0.0]
+        g._metrics_render_started = []
+
+    @app.after_request
+    def _metrics_finish(response):
+        started = g.get('_metrics_started')
+        if started is None:
+            return response
+        elapsed = time.perf_counter() - started
+        # unmatched URLs are grouped under their status to keep labels bounded
+        endpoint = request.endpoint or str(response.status_code)
+        queries, db_seconds = g._metrics_db
+        rendering = g._metrics_render[0]
+        request_seconds.observe(elapsed, endpoint, request.method)
+        requests_total.inc(endpoint, request.method, str(response.status_code))
+        request_queries.observe(queries, endpoint)
+        request_db_seconds.observe(db_seconds, endpoint)
+        render_seconds.observe(rendering, endpoint)
+        if server_timing:
+            response.headers.add(
+                'Server-Timing',
+                f'db;dur={db_seconds * 1000:.1f};desc="{queries} queries", '
+                f'render;dur={rendering * 1000:.1f}, total;dur={elapsed * 1000:.1f}',
+            )
+        return response
@@ -0,0 +1,192 @@
+"""
+Versioned schema migrations for the SQLite database.
+
+A migration is a module with ``VERSION``, ``NAME``, ``upgrade(conn)`` and
+``estimate(conn)`` (rows it will rewrite; 0 for metadata-only changes).
+Applied versions are recorded in the ``schema_version`` table, and all
+pending migrations run inside one transaction, so a failure leaves the
+database exactly as it was.
+
+Startup skips the schema checks when nothing changed: the database header's
+``user_version`` holds a fingerprint of the declared tables and indexes,
+written once they are known to exist (``schema_fingerprint``).
+
+Backups use SQLite's online backup API in a single step: one read
+transaction, so the copy is a consistent snapshot, and in WAL mode readers
+and writers carry on while it is taken. (A copy made a few pages at a time
+starts over whenever another connection writes, and under a steady stream
+of ballots it may never finish.)
+"""
+import hashlib
+import os
+import sqlite3
+import time
+from collections import namedtuple
+from datetime import datetime
+
+VERSION_TABLE = 'schema_version'
+
+# rough throughput figures used by plan(); rewriting a table runs at about
+# this many narrow rows per second on an SSD, and the backup copies pages
+# at about this many bytes per second
+REWRITE_ROWS_PER_SECOND = 100_000
+BACKUP_BYTES_PER_SECOND = 100 * 1024 * 1024
+
+Migration = namedtuple('Migration', 'version name upgrade estimate')
+
+
+def load_migrations(modules):
+    """Build the ordered Migration list from migration modules."""
+    migrations = sorted(
+        (Migration(m.VERSION, m.NAME, m.upgrade, getattr(m, 'estimate', None)) for m in modules),
+        key=lambda m: m.version,
+    )
+    versions = [m.version for m in migrations]
+    if len(set(versions)) != len(versions):
+        raise ValueError(f'Duplicate migration versions: {versions}')
+    return migrations
+
+
+def table_columns(conn, table):
+    """Column names of `table` (empty if the table doesn't exist)."""
+    return [row[1] for row in conn.exec_driver_sql(f'PRAGMA table_info({table})')]
+
+
+def table_rows(conn, table):
+    return conn.exec_driver_sql(f'SELECT COUNT(*) FROM {table}').scalar() if table_columns(conn, table) else 0
+
+
+def ensure_version_table(conn):
+    conn.exec_driver_sql(
+        f'CREATE TABLE IF NOT EXISTS {VERSION_TABLE} ('
+        ' version INTEGER PRIMARY KEY,'
+        ' name VARCHAR(200) NOT NULL,'
+        ' applied_at VARCHAR(32) NOT NULL)'
+    )
+
+
+def current_version(conn):
+    """Highest applied version, or 0 for an unversioned database."""
+    tables = {name for (name,) in conn.exec_driver_sql("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if VERSION_TABLE not in tables:
+        return 0
+    return conn.exec_driver_sql(f'SELECT COALESCE(MAX(version), 0) FROM {VERSION_TABLE}').scalar()
+
+
+def schema_fingerprint(metadata):
+    """A 31-bit hash of the declared tables, columns and indexes."""
+    parts = []
+    for table in metadata.sorted_tables:
+        parts.append(table.name)
+        parts.extend(f'{c.name}:{c.type}:{c.nullable}' for c in table.columns)
+        parts.extend(
+            f'{i.name}:{",".join(c.name for c in i.columns)}:{i.unique}'
+            for i in sorted(table.indexes, key=lambda i: i.name)
+        )
+    return int.from_bytes(hashlib.sha256('\n'.join(parts).encode('utf-8')).digest()[:4], 'big') >> 1
+
+
+def stored_fingerprint(conn):
+    return conn.exec_driver_sql('PRAGMA user_version').scalar()
+
+
+def store_fingerprint(conn, fingerprint):
+    # PRAGMA takes no bound parameters; fingerprint is always an int
+    conn.exec_driver_sql(f'PRAGMA user_version = {int(fingerprint)}')
+
+
+def pending(conn, migrations):
+    version = current_version(conn)
+    return [m for m in migrations if m.version > version]
+
+
+def _record(conn, migration):
+    conn.exec_driver_sql(
+        f'INSERT INTO {VERSION_TABLE} (version, name, applied_at) VALUES (?, ?, ?)',
+        (migration.version, migration.name, datetime.utcnow().isoformat(timespec='seconds')),
+    )
+
+
+def stamp(engine, migrations):
+    """Mark every migration as applied (for a database just built by create_all)."""
+    with engine.begin() as conn:
+        ensure_version_table(conn)
+        for m in pending(conn, migrations):
+            _record(conn, m)
+
+
+def apply_migrations(engine, migrations, echo=print):
+    """Apply all pending migrations in one transaction.
+
+    Returns a list of (migration, seconds). On any error the transaction is
+    rolled back and the exception propagates; no version is recorded.
+    """
+    applied = []
+    with engine.begin() as conn:
+        ensure_version_table(conn)
+        for m in pending(conn, migrations):
+            echo(f'Applying {m.version:04d} {m.name}...')
+            started = time.perf_counter()
+            m.upgrade(conn)
+            _record(conn, m)
+            applied.append((m, time.perf_counter() - started))
+    return applied
+
+
+def backup_database(src_path, dest_path, progress=None):
+    """Copy the live database to `dest_path` with the online backup API.
+
+    `progress(remaining, total)` is called once the copy is done. Returns
+    the backup's size in bytes.
+    """
+    tmp_path = dest_path + '.part'
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+    src = sqlite3.connect(f'file:{src_path}?mode=ro', uri=True)
+    dest = sqlite3.connect(tmp_path)
+
+    def step(status, remaining, total):
+        if progress:
+            progress(remaining, total)
+
+    try:
+        src.backup(dest, pages=-1, progress=step)
+    finally:
+        dest.close()
+        src.close()
+    # only replace an older backup once the new one is complete
+    os.replace(tmp_path, dest_path)
+    return os.path.getsize(dest_path)
+
+
+def default_backup_path(db_path, version):
+    when = datetime.utcnow().strftime('%Y%m%d%H%M%S')
+    return f'{db_path}.v{version:04d}.{when}.bak'
+
+
+def plan(conn, migrations):
+    """Dry run: what would be applied, and roughly how long it would take.
+
+    Nothing is written. ``lock_seconds`` is how long writers would wait on
+    the migration transaction; in WAL mode readers are not blocked by it.
+    """
+    page_count = conn.exec_driver_sql('PRAGMA page_count').scalar()
+    page_size = conn.exec_driver_sql('PRAGMA page_size').scalar()
+    steps = []
+    for m in pending(conn, migrations):
+        rows = m.estimate(conn) if m.estimate else 0
+        steps.append({
+            'version': m.version,
+            'name': m.name,
+            'rows': rows,
+            'seconds': rows / REWRITE_ROWS_PER_SECOND,
+        })
+    db_bytes = page_count * page_size
+    return {
+        'current_version': current_version(conn),
+        'target_version': max((m.version for m in migrations), default=0),
+        'steps': steps,
+        'lock_seconds': sum(s['seconds'] for s in steps),
+        'backup_bytes': db_bytes,
+        'backup_seconds': db_bytes / BACKUP_BYTES_PER_SECOND,
+    }
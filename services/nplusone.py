@@ -0,0 +1,70 @@
+"""
+Development-mode N+1 query detector.
+
+A lazy-loaded relationship touched inside a loop shows up as the same
+SELECT run over and over with a different id each time. ``install_detector``
+watches the SQLAlchemy engines and, at the end of each request, logs every
+SELECT that ran at least ``threshold`` times with distinct parameters, with
+the endpoint, the statement and a few sample parameter sets, so the view can
+be given a ``selectinload``/``joinedload`` option instead.
+
+It keeps every SELECT's parameters for the length of a request, so it is
+meant for the debug server, not production.
+"""
+import logging
+
+from flask import g, has_request_context, request
+from sqlalchemy import event
+
+log = logging.getLogger('voting.sql.nplusone')
+
+SAMPLE_PARAMS = 3
+
+
+class NPlusOneError(Exception):
+    """Raised (with ``raise_errors``) when a request repeats a SELECT."""
+
+
+def repeated_selects(statements, threshold):
+    """[(statement, [params])] run at least `threshold` times with distinct params."""
+    return [
+        (statement, params) for statement, params in statements.items()
+        if len(set(params)) >= threshold
+    ]
+
+
+def install_detector(app, engines, threshold=3, raise_errors=False):
+    """Flag requests that run one SELECT `threshold` or more times with different ids.
+
+    With `raise_errors` the request fails with NPlusOneError instead of only
+    being logged, which makes the problem hard to miss in tests.
+    """
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if executemany or not has_request_context() or '_nplusone' not in g:
+            return
+        if statement.lstrip()[:6].upper() != 'SELECT':
+            return
+        g._nplusone.setdefault(statement, []).append(repr(parameters))
+
+    for engine in engines:
+        event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+
+    @app.before_request
+    def _nplusone_start():
+        g._nplusone = {}
+
+    @app.after_request
+    def _nplusone_check(response):
+        statements = g.pop('_nplusone', None)
+        if not statements:
+            return response
+        found = repeated_selects(statements, threshold)
+        for statement, params in found:
+            log.warning(
+                'possible N+1 in %s %s: %d x %s | params: %s', request.method, request.endpoint or request.path,
+                len(params), ' '.join(statement.split()), ', '.join(params[:SAMPLE_PARAMS]),
+            )
+        if found and raise_errors:
+            raise NPlusOneError(f'{len(found)} repeated SELECT(s) in {request.endpoint or request.path}')
+        return response
@@ -0,0 +1,63 @@
+"""
+Rendered-HTML cache for pages that are identical for every visitor.
+
+Entries are keyed by the caller (endpoint + arguments), capped by count and
+total bytes with LRU eviction, and carry a strong ETag derived from the
+body so a revalidating browser or proxy gets ``304 Not Modified`` without
+the page being rendered again. Admin writes call ``bump()``, which drops
+everything rendered under the previous version.
+"""
+import hashlib
+import threading
+from collections import OrderedDict, namedtuple
+
+CachedPage = namedtuple('CachedPage', 'body etag version')
+
+
+class PageCache:
+    def __init__(self, max_entries=256, max_bytes=16 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.version = 0
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry.version != self.version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key, body, version):
+        """Store a rendered body; `version` is the cache version seen before rendering."""
+        if isinstance(body, str):
+            body = body.encode('utf-8')
+        entry = CachedPage(body, hashlib.sha1(body).hexdigest()[:20], version)
+        if len(body) > self.max_bytes:
+            return entry
+        with self._lock:
+            # a bump while we were rendering: serve it once but don't keep it
+            if version != self.version:
+                return entry
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= len(old.body)
+            self._entries[key] = entry
+            self._bytes += len(body)
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted.body)
+        return entry
+
+    def bump(self):
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+            self._bytes = 0
@@ -0,0 +1,59 @@
+"""
+Keyset (seek) pagination helpers.
+
+Instead of OFFSET, each page continues after the sort key of the last row
+of the previous page, so fetching page 400 costs the same as page 1 as long
+as the sort columns are indexed. The position is handed to the client as an
+opaque cursor.
+"""
+import base64
+import json
+
+from sqlalchemy import and_, or_, tuple_
+
+
+def encode_cursor(values):
+    raw = json.dumps(list(values), default=str, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def decode_cursor(token):
+    """Return the list of key values in `token`, or None if it is missing/garbled."""
+    if not token:
+        return None
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError):
+        return None
+    return values if isinstance(values, list) else None
+
+
+def escape_like(prefix):
+    return prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+def _after_key(columns, values, descending):
+    # spelled "a >= x AND (a > x OR (b, ...) > (y, ...))" rather than as one
+    # row-value comparison: SQLite only seeks the index on the leading column
+    # this way when that column carries a COLLATE
+    first, value = columns[0], values[0]
+    if len(columns) == 1:
+        return first < value if descending else first > value
+    rest, rest_values = tuple_(*columns[1:]), tuple_(*values[1:])
+    if descending:
+        return and_(first <= value, or_(first < value, rest < rest_values))
+    return and_(first >= value, or_(first > value, rest > rest_values))
+
+
+def seek(query, columns, after=None, limit=50, descending=False):
+    """Return (rows, has_more) for the page that follows the key `after`.
+
+    `columns` must end with a unique column (normally the primary key) so
+    the ordering is total.
+    """
+    if after is not None and len(after) == len(columns):
+        query = query.filter(_after_key(columns, after, descending))
+    order = [c.desc() if descending else c.asc() for c in columns]
+    rows = query.order_by(*order).limit(limit + 1).all()
+    return rows[:limit], len(rows) > limit
@@ -0,0 +1,102 @@
+"""
+Password hashing and verification off the request thread.
+
+PBKDF2/scrypt checks are pure CPU, so a burst of logins on the request
+threads starves everything else. PasswordService runs them on a process
+pool sized to the machine, refuses new work with PasswordServiceBusy once
+``max_pending`` checks are queued (the caller answers 503), and on a
+successful check re-hashes passwords stored with an older method/cost so
+the cost can be tuned without a password reset.
+"""
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from werkzeug.security import check_password_hash, generate_password_hash
+
+
+class PasswordServiceBusy(Exception):
+    """Too many password checks are already queued; try again shortly."""
+
+
+def hash_method(pwhash):
+    # werkzeug hashes look like "<method>$<salt>$<hash>"
+    return (pwhash or '').split('$', 1)[0]
+
+
+def _verify(pwhash, password, method):
+    # runs in a worker process
+    if not check_password_hash(pwhash, password):
+        return False, None
+    if hash_method(pwhash) != method:
+        return True, generate_password_hash(password, method=method)
+    return True, None
+
+
+def hash_password(password, method):
+    return generate_password_hash(password, method=method)
+
+
+class PasswordService:
+    def __init__(self, method='scrypt:32768:8:1', workers=None, max_pending=None, timeout=10):
+        self.method = method
+        # workers=0 keeps hashing on the calling thread (tests, single-user dev)
+        if workers is None:
+            workers = os.cpu_count() or 1
+        self.workers = workers
+        self.max_pending = max_pending or max(self.workers, 1) * 8
+        self.timeout = timeout
+        self._pool = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self.shed = 0
+
+    def _executor(self):
+        if self._pool is None:
+            with self._lock:
+                if self._pool is None:
+                    self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def after_fork(self):
+        """Forget the parent's worker pool in a forked child; it is rebuilt on first use."""
+        self._pool = None
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def _run(self, fn, *args):
+        if not self.workers:
+            return fn(*args)
+        with self._lock:
+            if self._pending >= self.max_pending:
+                self.shed += 1
+                raise PasswordServiceBusy()
+            self._pending += 1
+        try:
+            future = self._executor().submit(fn, *args)
+        except Exception:
+            self._done(None)
+            raise
+        # count the slot as busy until the worker is really finished with it
+        future.add_done_callback(self._done)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeout:
+            raise PasswordServiceBusy()
+
+    def _done(self, future):
+        with self._lock:
+            self._pending -= 1
+
+    def verify(self, pwhash, password):
+        """Return (ok, new_hash); new_hash is set when the stored hash should be upgraded."""
+        return self._run(_verify, pwhash, password, self.method)
+
+    def hash(self, password):
+        return self._run(hash_password, password, self.method)
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
@@ -0,0 +1,140 @@
+"""
+Candidate photo storage: content-addressed originals plus resized variants.
+
+An upload is checked with Pillow and stored under the SHA-256 of its bytes,
+so uploading the same photo again reuses the file already on disk. Square
+thumbnails in WebP and JPEG at each of ``widths`` are made on a background
+thread; until they exist pages fall back to the original. Because a file
+name never changes meaning, everything here can be served as immutable.
+"""
+import hashlib
+import io
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# ballot photos are shown at 100x100 CSS pixels; these cover 1x-3x screens
+VARIANT_WIDTHS = (100, 200, 300)
+VARIANT_FORMATS = {'webp': 'WEBP', 'jpg': 'JPEG'}
+UPLOAD_FORMATS = {'JPEG': '.jpg', 'PNG': '.png', 'GIF': '.gif', 'WEBP': '.webp'}
+
+
+class PhotoError(Exception):
+    """The upload isn't an image we can store."""
+
+
+def _image_module():
+    try:
+        from PIL import Image, ImageOps
+    except ImportError:
+        raise PhotoError('Photo uploads need the Pillow package (pip install pillow)')
+    return Image, ImageOps
+
+
+def variant_name(filename, width, ext):
+    stem = os.path.splitext(filename)[0]
+    return f'{stem}.w{width}.{ext}'
+
+
+def _write_atomic(path, data):
+    tmp = path + '.part'
+    with open(tmp, 'wb') as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class PhotoStore:
+    def __init__(self, root, widths=VARIANT_WIDTHS, quality=80, workers=1, on_ready=None):
+        self.root = root
+        self.widths = tuple(sorted(widths))
+        self.quality = quality
+        # called with the original's file name once its variants are written
+        self.on_ready = on_ready
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='photo-variants')
+        self._pending = set()
+        self._lock = threading.Lock()
+        self.deduplicated = 0
+
+    def path(self, filename):
+        return os.path.join(self.root, filename)
+
+    def save(self, stream):
+        """Store an uploaded image; returns its content-addressed file name."""
+        data = stream.read()
+        Image, _ = _image_module()
+        try:
+            with Image.open(io.BytesIO(data)) as im:
+                im.verify()
+                fmt = im.format
+        except Exception:
+            raise PhotoError('The uploaded file is not a readable image')
+        ext = UPLOAD_FORMATS.get(fmt)
+        if not ext:
+            raise PhotoError(f'Unsupported image format: {fmt}')
+        filename = hashlib.sha256(data).hexdigest()[:32] + ext
+        os.makedirs(self.root, exist_ok=True)
+        if os.path.exists(self.path(filename)):
+            self.deduplicated += 1
+        else:
+            _write_atomic(self.path(filename), data)
+        self.schedule(filename)
+        return filename
+
+    def missing_variants(self, filename):
+        return [
+            (width, ext) for width in self.widths for ext in VARIANT_FORMATS
+            if not os.path.exists(self.path(variant_name(filename, width, ext)))
+        ]
+
+    def schedule(self, filename):
+        """Build any missing variants of `filename` in the background.
+
+        Returns a Future, or None if there is nothing to do.
+        """
+        if not self.missing_variants(filename):
+            return None
+        with self._lock:
+            if filename in self._pending:
+                return None
+            self._pending.add(filename)
+        return self._executor.submit(self._build, filename)
+
+    def _build(self, filename):
+        Image, ImageOps = _image_module()
+        try:
+            with Image.open(self.path(filename)) as im:
+                im = ImageOps.exif_transpose(im)
+                im = im.convert('RGBA' if 'A' in im.getbands() else 'RGB')
+                for width, ext in self.missing_variants(filename):
+                    # square crop: the ballot shows photos as circles
+                    thumb = ImageOps.fit(im, (width, width), Image.LANCZOS)
+                    if ext == 'jpg' and thumb.mode == 'RGBA':
+                        flat = Image.new('RGB', thumb.size, (255, 255, 255))
+                        flat.paste(thumb, mask=thumb.getchannel('A'))
+                        thumb = flat
+                    buf = io.BytesIO()
+                    thumb.save(buf, VARIANT_FORMATS[ext], quality=self.quality, optimize=True)
+                    _write_atomic(self.path(variant_name(filename, width, ext)), buf.getvalue())
+        finally:
+            with self._lock:
+                self._pending.discard(filename)
+        if self.on_ready:
+            self.on_ready(filename)
+
+    def variants(self, filename, ext):
+        """[(width, file name)] of the variants of `filename` that exist so far."""
+        return [
+            (width, name) for width in self.widths
+            for name in [variant_name(filename, width, ext)]
+            if os.path.exists(self.path(name))
+        ]
+
+    def delete(self, filename):
+        for name in [filename] + [variant_name(filename, w, ext) for w in self.widths for ext in VARIANT_FORMATS]:
+            try:
+                os.remove(self.path(name))
+            except FileNotFoundError:
+                pass
+
+    def shutdown(self, wait=True):
+        self._executor.shutdown(wait=wait)
@@ -0,0 +1,178 @@
+"""
+Streaming bulk import of voter rosters (CSV or XLSX).
+
+Rows are read one at a time, checked against an in-memory set of known
+school IDs, hashed in parallel worker processes a batch at a time and
+inserted with executemany. Hashing happens before the batch's transaction
+opens, and each batch commits on its own, so the write lock is held only
+for one insert. Memory stays bounded by the batch size plus the set of
+school IDs.
+"""
+import csv
+import io
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from services.passwords import hash_password
+
+# accepted header spellings -> voter column
+HEADER_ALIASES = {
+    'school_id': 'school_id', 'school-id': 'school_id', 'school id': 'school_id', 'id': 'school_id',
+    'fullname': 'fullname', 'full_name': 'fullname', 'full name': 'fullname', 'name': 'fullname',
+    'grade': 'grade', 'section': 'grade', 'grade/section': 'grade',
+    'password': 'password',
+}
+MAX_REPORTED_ERRORS = 1000
+
+
+class RosterError(Exception):
+    """The roster file itself can't be read (bad format, missing columns)."""
+
+
+def _normalise_header(header):
+    cols = [HEADER_ALIASES.get((h or '').strip().lower()) for h in header]
+    if 'school_id' not in cols or 'fullname' not in cols:
+        raise RosterError('Roster needs at least school_id and fullname columns')
+    return cols
+
+
+def _rows(header, records):
+    cols = _normalise_header(header)
+    for line_no, values in records:
+        row = {}
+        for col, value in zip(cols, values):
+            if col:
+                row[col] = '' if value is None else str(value).strip()
+        if any(row.values()):
+            yield line_no, row
+
+
+def iter_csv(stream):
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    reader = csv.reader(text)
+    try:
+        header = next(reader)
+    except StopIteration:
+        return
+    # line 1 is the header
+    yield from _rows(header, ((idx + 2, values) for idx, values in enumerate(reader)))
+
+
+def iter_xlsx(stream):
+    try:
+        import openpyxl
+    except ImportError:
+        raise RosterError('XLSX rosters need the openpyxl package (pip install openpyxl)')
+    wb = openpyxl.load_workbook(stream, read_only=True, data_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        try:
+            header = next(rows)
+        except StopIteration:
+            return
+        yield from _rows(header, ((idx + 2, values) for idx, values in enumerate(rows)))
+    finally:
+        wb.close()
+
+
+def iter_roster(stream, filename):
+    """Yield (line_no, row dict) from a CSV or XLSX roster."""
+    ext = os.path.splitext(filename or '')[1].lower()
+    if ext == '.xlsx':
+        return iter_xlsx(stream)
+    if ext in ('.csv', '.txt', ''):
+        return iter_csv(stream)
+    raise RosterError(f'Unsupported roster format: {ext}')
+
+
+class ImportReport:
+    def __init__(self):
+        self.imported = 0
+        self.skipped = 0
+        self.error_count = 0
+        self.errors = []
+
+    def error(self, line_no, school_id, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({'line': line_no, 'school_id': school_id, 'message': message})
+
+    def to_dict(self):
+        return {
+            'imported': self.imported,
+            'skipped': self.skipped,
+            'errors': self.error_count,
+            'error_rows': self.errors,
+            'errors_truncated': self.error_count > len(self.errors),
+        }
+
+
+def import_roster(engine, voter_table, rows, method, default_password=None,
+                  batch_size=500, workers=None, pause=0, on_batch=None):
+    """Insert roster rows into `voter_table`; returns an ImportReport.
+
+    `rows` yields (line_no, dict) as produced by iter_roster. Rows without a
+    password use `default_password`; rows whose school ID already exists
+    (in the database or earlier in the file) are reported and skipped.
+    `on_batch(conn, report, inserted)` runs in each batch's transaction, and the
+    import sleeps `pause` seconds after each commit so ballot writes
+    waiting on the lock get their turn.
+    """
+    report = ImportReport()
+    with engine.connect() as conn:
+        known = {sid for (sid,) in conn.execute(voter_table.select().with_only_columns(voter_table.c.school_id))}
+
+    insert = sqlite_insert(voter_table).on_conflict_do_nothing(index_elements=['school_id'])
+    hasher = partial(hash_password, method=method)
+    workers = workers or os.cpu_count() or 1
+
+    def flush(pending, pool):
+        passwords = [p for _, p in pending]
+        # hashing takes most of the time; no transaction is open while it runs
+        hashes = list(pool.map(hasher, passwords, chunksize=16) if pool else map(hasher, passwords))
+        values = [dict(row, password_hash=h) for (row, _), h in zip(pending, hashes)]
+        with engine.begin() as conn:
+            result = conn.execute(insert, values)
+            # rows registered by someone else since we read `known` are ignored by the insert
+            inserted = result.rowcount if result.rowcount is not None and result.rowcount >= 0 else len(values)
+            report.imported += inserted
+            report.skipped += len(values) - inserted
+            if on_batch is not None:
+                on_batch(conn, report, inserted)
+        if pause:
+            time.sleep(pause)
+
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else None
+    try:
+        pending = []
+        for line_no, row in rows:
+            school_id = row.get('school_id', '')
+            if not school_id or not row.get('fullname'):
+                report.error(line_no, school_id, 'Missing school ID or full name')
+                continue
+            if school_id in known:
+                report.error(line_no, school_id, 'School ID already registered')
+                continue
+            password = row.get('password') or default_password
+            if not password:
+                report.error(line_no, school_id, 'Missing password and no default password given')
+                continue
+            known.add(school_id)
+            pending.append(({
+                'school_id': school_id,
+                'fullname': row['fullname'],
+                'grade': row.get('grade') or None,
+            }, password))
+            if len(pending) >= batch_size:
+                flush(pending, pool)
+                pending = []
+        if pending:
+            flush(pending, pool)
+    finally:
+        if pool:
+            pool.shutdown()
+    return report
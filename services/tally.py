@@ -0,0 +1,51 @@
+"""
+Ranking helpers for precomputed tallies.
+
+The counters themselves live in the database (see TallyCounter in run.py)
+and are bumped in the same transaction that records a ballot; this module
+only turns a handful of (candidate, votes) rows into a ranked result.
+"""
+
+
+def rank_position(rows, max_winners=1):
+    """Rank one position's candidates by votes.
+
+    `rows` is an iterable of dicts with at least `full_name` and `votes`.
+    Returns new dicts with `rank`, `winner` and `tied` added. Candidates
+    tied on the last winning seat are all flagged `tied` and none of them
+    is marked a winner, so the admin has to break the tie. Candidates with
+    no votes never win.
+    """
+    ordered = sorted(rows, key=lambda r: (-r['votes'], r['full_name'].lower()))
+    max_winners = max(int(max_winners or 1), 1)
+
+    ranked = []
+    rank = 0
+    prev_votes = None
+    for idx, row in enumerate(ordered):
+        if row['votes'] != prev_votes:
+            rank = idx + 1
+            prev_votes = row['votes']
+        ranked.append(dict(row, rank=rank, winner=False, tied=False))
+
+    if not ranked:
+        return ranked
+
+    # votes needed for the last seat; anyone above it wins outright
+    cutoff_idx = min(max_winners, len(ranked)) - 1
+    cutoff_votes = ranked[cutoff_idx]['votes']
+    at_cutoff = [r for r in ranked if r['votes'] == cutoff_votes]
+    above = [r for r in ranked if r['votes'] > cutoff_votes]
+    seats_left = max_winners - len(above)
+
+    for r in above:
+        r['winner'] = True
+    if cutoff_votes == 0:
+        # nobody wins a seat without a single vote
+        return ranked
+    for r in at_cutoff:
+        if len(at_cutoff) <= seats_left:
+            r['winner'] = True
+        else:
+            r['tied'] = True
+    return ranked
@@ -0,0 +1,66 @@
+"""
+Per-election "already voted" bitmaps.
+
+One bit per voter id (125 KB per election for a million voters) answers
+"has this voter voted here?" with an index into a bytearray instead of a
+query. An election's bitmap is loaded from its ballots the first time it is
+asked about and after that only grows, as the ballot writer commits.
+
+A set bit always means a committed ballot. A clear bit can be stale, such
+as a ballot written by another process, so the unique (election, voter)
+index on the ballot table stays the real guard.
+"""
+import threading
+
+
+def _set(bits, voter_id):
+    idx = voter_id >> 3
+    if idx >= len(bits):
+        bits.extend(bytes(idx - len(bits) + 1))
+    bits[idx] |= 1 << (voter_id & 7)
+
+
+class VotedBitmap:
+    def __init__(self, load):
+        # load(election_id) -> iterable of voter ids with a ballot there
+        self._load = load
+        self._bits = {}
+        # election id -> times forget() was called for it
+        self._forgotten = {}
+        self._lock = threading.Lock()
+
+    def _bitmap(self, election_id):
+        bits = self._bits.get(election_id)
+        if bits is None:
+            with self._lock:
+                generation = self._forgotten.get(election_id, 0)
+            loaded = bytearray()
+            for voter_id in self._load(election_id):
+                _set(loaded, voter_id)
+            with self._lock:
+                if self._forgotten.get(election_id, 0) != generation:
+                    # forgotten while loading (ballots being deleted): the
+                    # load may hold bits that are gone now, so keep nothing
+                    return bytearray()
+                bits = self._bits.setdefault(election_id, loaded)
+        return bits
+
+    def has_voted(self, election_id, voter_id):
+        bits = self._bitmap(election_id)
+        idx = voter_id >> 3
+        return idx < len(bits) and bool(bits[idx] >> (voter_id & 7) & 1)
+
+    def add(self, election_id, voter_id):
+        with self._lock:
+            bits = self._bits.get(election_id)
+            # not loaded yet: the load will read this ballot from the table
+            if bits is not None:
+                _set(bits, voter_id)
+
+    def forget(self, election_id):
+        with self._lock:
+            self._bits.pop(election_id, None)
+            self._forgotten[election_id] = self._forgotten.get(election_id, 0) + 1
+
+    def memory_bytes(self):
+        return sum(len(b) for b in self._bits.values())
@@ -35,7 +35,7 @@ if "%choice%"=="1" (
     )
 
     REM Check if requirements are installed
-    python -m pip show flask >nul 2>&1
+    python -m pip show waitress >nul 2>&1
     IF ERRORLEVEL 1 (
         echo Installing requirements from requirements.txt...
         python -m pip install -r requirements.txt
@@ -43,8 +43,8 @@ if "%choice%"=="1" (
         echo Requirements already installed.
     )
 
-    REM Start Flask app
-    python run.py
+    REM Start the app with waitress (python run.py is the debug server)
+    python wsgi.py
     goto menu
 ) else if "%choice%"=="2" (
     REM Check for virtual environment
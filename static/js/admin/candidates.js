@@ -0,0 +1,189 @@
+(function () {
+    const openBtn = document.getElementById('openCandidateModal');
+    const modal = document.getElementById('candidateModal');
+    const closeBtn = document.getElementById('closeCandidateModal');
+    const cancelBtn = document.getElementById('cancelCandidate');
+    const overlay = document.querySelector('#candidateModal .modal-overlay');
+    const form = document.getElementById('candidateForm');
+    const photoInput = document.getElementById('photo');
+    const photoPreviewWrap = document.getElementById('photoPreview');
+    const photoPreviewImg = photoPreviewWrap && photoPreviewWrap.querySelector('img');
+
+    function showModal() {
+        modal.setAttribute('aria-hidden', 'false');
+        document.body.style.overflow = 'hidden';
+        setTimeout(() => document.getElementById('full_name').focus(), 50);
+    }
+
+    function hideModal() {
+        modal.setAttribute('aria-hidden', 'true');
+        document.body.style.overflow = '';
+        // reset preview
+        if (photoPreviewImg) { photoPreviewImg.src = ''; photoPreviewWrap.style.display = 'none'; }
+        if (photoInput) { photoInput.value = ''; }
+        form.reset();
+    }
+
+    openBtn && openBtn.addEventListener('click', showModal);
+    closeBtn && closeBtn.addEventListener('click', hideModal);
+    cancelBtn && cancelBtn.addEventListener('click', hideModal);
+    overlay && overlay.addEventListener('click', hideModal);
+
+    document.addEventListener('keydown', function (e) {
+        if (e.key === 'Escape' && modal.getAttribute('aria-hidden') === 'false') {
+            hideModal();
+        }
+    });
+
+    if (photoInput) {
+        photoInput.addEventListener('change', function () {
+            const file = this.files && this.files[0];
+            if (!file) return;
+            if (!file.type.startsWith('image/')) {
+                alert('Please select a valid image file.');
+                this.value = '';
+                return;
+            }
+            // optional size check: 5MB
+            if (file.size > 5 * 1024 * 1024) {
+                alert('Image is too large (max 5MB).');
+                this.value = '';
+                return;
+            }
+            const reader = new FileReader();
+            reader.onload = function (e) {
+                if (photoPreviewImg) {
+                    photoPreviewImg.src = e.target.result;
+                    photoPreviewWrap.style.display = 'block';
+                }
+            };
+            reader.readAsDataURL(file);
+        });
+    }
+
+    form && form.addEventListener('submit', function (e) {
+        // basic client-side validation
+        const name = document.getElementById('full_name').value.trim();
+        const position = document.getElementById('position').value;
+        if (!name) {
+            e.preventDefault(); alert('Candidate full name is required.'); return false;
+        }
+        if (!position) {
+            e.preventDefault(); alert('Please select a position.'); return false;
+        }
+        const submitBtn = form.querySelector('button[type="submit"]');
+        if (submitBtn) { submitBtn.disabled = true; submitBtn.textContent = 'Saving...'; }
+    });
+
+    // Edit buttons: populate modal with candidate data
+    const candidateIdInput = document.getElementById('candidate_id');
+    // delegated so rows added by "Load more" work too
+    document.addEventListener('click', function (e) {
+        const btn = e.target.closest('.btn-edit');
+        if (!btn) return;
+        e.preventDefault();
+        const id = btn.getAttribute('data-id');
+        const fullName = btn.getAttribute('data-full_name') || '';
+        const position = btn.getAttribute('data-position') || '';
+        const party = btn.getAttribute('data-party') || '';
+        const bio = btn.getAttribute('data-bio') || '';
+        const photo = btn.getAttribute('data-photo') || '';
+        const election = btn.getAttribute('data-election') || '';
+
+        candidateIdInput.value = id;
+        document.getElementById('full_name').value = fullName;
+        document.getElementById('position').value = position;
+        document.getElementById('election_id').value = election;
+        document.getElementById('party').value = party;
+        document.getElementById('bio').value = bio;
+        // show existing photo if available
+        if (photo) {
+            if (photoPreviewImg) {
+                photoPreviewImg.src = '/static/uploads/candidates/' + photo;
+                photoPreviewWrap.style.display = 'block';
+            }
+        } else {
+            if (photoPreviewImg) { photoPreviewImg.src = ''; photoPreviewWrap.style.display = 'none'; }
+        }
+        // change modal title and button
+        const title = document.getElementById('candidateModalTitle');
+        title.textContent = 'Edit Candidate';
+        const submitBtn = form.querySelector('button[type="submit"]');
+        if (submitBtn) submitBtn.textContent = 'Save Changes';
+        showModal();
+    });
+
+    // Delete modal implementation
+    const deleteModal = document.createElement('div');
+    deleteModal.innerHTML = `
+    <div id="deleteCandidateModal" class="modal" aria-hidden="true">
+        <div class="modal-overlay" data-close-delete></div>
+        <div class="modal-panel" role="dialog" aria-modal="true" aria-labelledby="deleteCandidateTitle">
+            <header class="modal-header">
+                <h2 id="deleteCandidateTitle">Confirm Delete</h2>
+                <button class="close-btn" id="closeDeleteCandidateModal">&times;</button>
+            </header>
+            <p>Are you sure you want to delete this candidate? This action cannot be undone.</p>
+            <form id="deleteCandidateForm" method="post" action="${document.currentScript.dataset.deleteUrl}" style="margin-top:12px; display:flex; justify-content:flex-end; gap:8px;">
+                <input type="hidden" id="delete_candidate_id" name="candidate_id" value="">
+                <button type="button" class="btn btn-secondary" id="cancelDeleteCandidate">Cancel</button>
+                <button type="submit" class="btn" style="background:#dc3545; color:#fff;">Delete</button>
+            </form>
+        </div>
+    </div>`;
+    document.body.appendChild(deleteModal);
+    const deleteModalEl = document.getElementById('deleteCandidateModal');
+    const deleteOverlay = deleteModalEl && deleteModalEl.querySelector('.modal-overlay');
+    const closeDeleteBtn = document.getElementById('closeDeleteCandidateModal');
+    const cancelDeleteBtn = document.getElementById('cancelDeleteCandidate');
+    const deleteIdInput = document.getElementById('delete_candidate_id');
+
+    document.addEventListener('click', function (e) {
+        const btn = e.target.closest('.btn-delete');
+        if (!btn) return;
+        e.preventDefault();
+        const id = btn.getAttribute('data-id');
+        if (!id) return;
+        deleteIdInput.value = id;
+        deleteModalEl.setAttribute('aria-hidden', 'false');
+        document.body.style.overflow = 'hidden';
+    });
+
+    // rows fetched by the "Load more" pager; same markup as the server-rendered rows
+    window.buildListRow = function (c) {
+        const tr = document.createElement('tr');
+        [c.position, c.full_name, c.party || '', c.election_title || ''].forEach(text => {
+            const td = document.createElement('td');
+            td.textContent = text;
+            tr.appendChild(td);
+        });
+        const actions = document.createElement('td');
+        actions.className = 'actions-col';
+        const edit = document.createElement('a');
+        edit.href = '#';
+        edit.className = 'btn-edit';
+        edit.textContent = 'Edit';
+        edit.style.cssText = 'padding:6px 10px; background:#ffc107; color:#000; text-decoration:none; border-radius:5px; margin-right:6px;';
+        edit.setAttribute('data-id', c.id);
+        edit.setAttribute('data-full_name', c.full_name);
+        edit.setAttribute('data-position', c.position_id || '');
+        edit.setAttribute('data-party', c.party || '');
+        edit.setAttribute('data-bio', c.bio || '');
+        edit.setAttribute('data-photo', c.photo_filename || '');
+        edit.setAttribute('data-election', c.election_id || '');
+        const del = document.createElement('a');
+        del.href = '#';
+        del.className = 'btn-delete';
+        del.textContent = 'Delete';
+        del.style.cssText = 'padding:6px 10px; background:#dc3545; color:#fff; text-decoration:none; border-radius:5px;';
+        del.setAttribute('data-id', c.id);
+        actions.appendChild(edit);
+        actions.appendChild(del);
+        tr.appendChild(actions);
+        return tr;
+    };
+
+    deleteOverlay && deleteOverlay.addEventListener('click', function () { deleteModalEl.setAttribute('aria-hidden', 'true'); document.body.style.overflow = ''; deleteIdInput.value = ''; });
+    closeDeleteBtn && closeDeleteBtn.addEventListener('click', function () { deleteModalEl.setAttribute('aria-hidden', 'true'); document.body.style.overflow = ''; deleteIdInput.value = ''; });
+    cancelDeleteBtn && cancelDeleteBtn.addEventListener('click', function () { deleteModalEl.setAttribute('aria-hidden', 'true'); document.body.style.overflow = ''; deleteIdInput.value = ''; });
+})();
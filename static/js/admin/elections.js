@@ -0,0 +1,150 @@
+(function () {
+    const openBtn = document.getElementById('openModalBtn');
+    const modal = document.getElementById('electionModal');
+    const closeBtn = document.getElementById('closeModalBtn');
+    const cancelBtn = document.getElementById('cancelBtn');
+    const overlay = document.querySelector('#electionModal .modal-overlay');
+const form = document.getElementById('electionForm');
+const electionIdInput = document.getElementById('election_id');
+const modalTitle = document.getElementById('modalTitle');
+
+    function showModal() {
+        modal.setAttribute('aria-hidden', 'false');
+        document.body.style.overflow = 'hidden';
+        // focus the first input
+        setTimeout(() => document.getElementById('title').focus(), 50);
+    }
+
+    function hideModal() {
+        modal.setAttribute('aria-hidden', 'true');
+        document.body.style.overflow = '';
+    }
+
+    openBtn && openBtn.addEventListener('click', showModal);
+    closeBtn && closeBtn.addEventListener('click', hideModal);
+    cancelBtn && cancelBtn.addEventListener('click', hideModal);
+    overlay && overlay.addEventListener('click', hideModal);
+
+    document.addEventListener('keydown', function (e) {
+        if (e.key === 'Escape' && modal.getAttribute('aria-hidden') === 'false') {
+            hideModal();
+        }
+    });
+
+form && form.addEventListener('submit', function (e) {
+        // Basic client-side validation: ensure dates are ordered
+        const start = document.getElementById('start_date').value;
+        const end = document.getElementById('end_date').value;
+        if (start && end && start > end) {
+            e.preventDefault();
+            alert('End Date must be the same or after Start Date.');
+            return false;
+        }
+        // Allow normal form submission; backend should handle saving.
+        // Optional: add a small loading state
+        const submitBtn = form.querySelector('button[type="submit"]');
+        if (submitBtn) {
+            submitBtn.disabled = true;
+            submitBtn.textContent = 'Creating...';
+        }
+    });
+
+    // Edit handler: populate modal with election data
+    // delegated so rows added by "Load more" work too
+    document.addEventListener('click', function (e) {
+        const btn = e.target.closest('.btn-edit');
+        if (!btn) return;
+        e.preventDefault();
+        const id = btn.getAttribute('data-id');
+        const title = btn.getAttribute('data-title') || '';
+        const description = btn.getAttribute('data-description') || '';
+        const start = btn.getAttribute('data-start') || '';
+        const end = btn.getAttribute('data-end') || '';
+        const positions = btn.getAttribute('data-positions') || '';
+        const status = btn.getAttribute('data-status') || 'Draft';
+
+        electionIdInput.value = id;
+        document.getElementById('title').value = title;
+        document.getElementById('description').value = description;
+        document.getElementById('start_date').value = start;
+        document.getElementById('end_date').value = end;
+        document.getElementById('positions').value = positions;
+        document.getElementById('status').value = status;
+
+        modalTitle.textContent = 'Edit Election';
+        const submitBtn = form.querySelector('button[type="submit"]');
+        if (submitBtn) submitBtn.textContent = 'Save Changes';
+        showModal();
+    });
+
+    // Delete modal handlers
+    const deleteModal = document.getElementById('deleteModal');
+    const deleteOverlay = document.querySelector('#deleteModal .modal-overlay');
+    const closeDeleteBtn = document.getElementById('closeDeleteModalBtn');
+    const cancelDeleteBtn = document.getElementById('cancelDeleteBtn');
+    const deleteIdInput = document.getElementById('delete_election_id');
+
+    function showDeleteModal() {
+        deleteModal.setAttribute('aria-hidden', 'false');
+        document.body.style.overflow = 'hidden';
+    }
+    function hideDeleteModal() {
+        deleteModal.setAttribute('aria-hidden', 'true');
+        document.body.style.overflow = '';
+        deleteIdInput.value = '';
+    }
+
+    document.addEventListener('click', function (e) {
+        const btn = e.target.closest('.btn-delete');
+        if (!btn) return;
+        e.preventDefault();
+        const id = btn.getAttribute('data-id');
+        if (!id) return;
+        deleteIdInput.value = id;
+        showDeleteModal();
+    });
+
+    // rows fetched by the "Load more" pager; same markup as the server-rendered rows
+    const resultsUrl = document.currentScript.dataset.resultsUrl;
+    window.buildListRow = function (el) {
+        const tr = document.createElement('tr');
+        [el.title, el.status, el.start_date, el.end_date].forEach(text => {
+            const td = document.createElement('td');
+            td.textContent = text;
+            tr.appendChild(td);
+        });
+        const actions = document.createElement('td');
+        actions.className = 'actions-col';
+        const results = document.createElement('a');
+        results.href = resultsUrl.replace('/0/', '/' + el.id + '/');
+        results.textContent = 'Results';
+        results.style.cssText = 'padding:6px 10px; background:#28a745; color:#fff; text-decoration:none; border-radius:5px; margin-right:6px;';
+        const edit = document.createElement('a');
+        edit.href = '#';
+        edit.className = 'btn-edit';
+        edit.textContent = 'Edit';
+        edit.style.cssText = 'padding:6px 10px; background:#ffc107; color:#000; text-decoration:none; border-radius:5px; margin-right:6px;';
+        edit.setAttribute('data-id', el.id);
+        edit.setAttribute('data-title', el.title);
+        edit.setAttribute('data-description', el.description || '');
+        edit.setAttribute('data-start', el.start_date);
+        edit.setAttribute('data-end', el.end_date);
+        edit.setAttribute('data-positions', el.positions || '');
+        edit.setAttribute('data-status', el.status);
+        const del = document.createElement('a');
+        del.href = '#';
+        del.className = 'btn-delete';
+        del.textContent = 'Delete';
+        del.style.cssText = 'padding:6px 10px; background:#dc3545; color:#fff; text-decoration:none; border-radius:5px;';
+        del.setAttribute('data-id', el.id);
+        actions.appendChild(results);
+        actions.appendChild(edit);
+        actions.appendChild(del);
+        tr.appendChild(actions);
+        return tr;
+    };
+
+    deleteOverlay && deleteOverlay.addEventListener('click', hideDeleteModal);
+    closeDeleteBtn && closeDeleteBtn.addEventListener('click', hideDeleteModal);
+    cancelDeleteBtn && cancelDeleteBtn.addEventListener('click', hideDeleteModal);
+})();
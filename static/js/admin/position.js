@@ -0,0 +1,109 @@
+(function () {
+    const openBtn = document.getElementById('openPositionModal');
+    const modal = document.getElementById('positionModal');
+    const closeBtn = document.getElementById('closePositionModal');
+    const cancelBtn = document.getElementById('cancelPosition');
+    const overlay = document.querySelector('#positionModal .modal-overlay');
+    const form = document.getElementById('positionForm');
+
+    function showModal() {
+        modal.setAttribute('aria-hidden', 'false');
+        document.body.style.overflow = 'hidden';
+        setTimeout(() => document.getElementById('position_title').focus(), 50);
+    }
+
+    function hideModal() {
+        modal.setAttribute('aria-hidden', 'true');
+        document.body.style.overflow = '';
+        form && form.reset();
+    }
+
+    openBtn && openBtn.addEventListener('click', showModal);
+    closeBtn && closeBtn.addEventListener('click', hideModal);
+    cancelBtn && cancelBtn.addEventListener('click', hideModal);
+    overlay && overlay.addEventListener('click', hideModal);
+
+    document.addEventListener('keydown', function (e) {
+        if (e.key === 'Escape' && modal.getAttribute('aria-hidden') === 'false') hideModal();
+    });
+
+    const positionIdInput = document.createElement('input');
+    // we already have a hidden input in the form; ensure we reference it
+    const positionIdField = document.getElementById('position_id');
+
+    form && form.addEventListener('submit', function (e) {
+        const maxWinners = parseInt(document.getElementById('max_winners').value, 10);
+        const votesAllowed = parseInt(document.getElementById('votes_allowed').value, 10);
+        if (isNaN(maxWinners) || maxWinners < 1) {
+            e.preventDefault(); alert('Maximum number of winners must be 1 or more.'); return false;
+        }
+        if (isNaN(votesAllowed) || votesAllowed < 1) {
+            e.preventDefault(); alert('Votes allowed per voter must be 1 or more.'); return false;
+        }
+        const submitBtn = form.querySelector('button[type="submit"]');
+        if (submitBtn) { submitBtn.disabled = true; submitBtn.textContent = 'Saving...'; }
+    });
+
+    // Edit buttons: populate modal
+    document.querySelectorAll('.btn-edit').forEach(function (btn) {
+        btn.addEventListener('click', function (e) {
+            e.preventDefault();
+            const id = this.getAttribute('data-id');
+            const title = this.getAttribute('data-title') || '';
+            const description = this.getAttribute('data-description') || '';
+            const max_winners = this.getAttribute('data-max_winners') || '1';
+            const votes_allowed = this.getAttribute('data-votes_allowed') || '1';
+            const election = this.getAttribute('data-election') || '';
+
+            if (positionIdField) positionIdField.value = id;
+            document.getElementById('position_title').value = title;
+            document.getElementById('position_description').value = description;
+            document.getElementById('max_winners').value = max_winners;
+            document.getElementById('votes_allowed').value = votes_allowed;
+            document.getElementById('positionModalTitle').textContent = 'Edit Position';
+            const submitBtn = form.querySelector('button[type="submit"]');
+            if (submitBtn) submitBtn.textContent = 'Save Changes';
+            showModal();
+        });
+    });
+
+    // Delete modal
+    const deleteModal = document.createElement('div');
+    deleteModal.innerHTML = `
+    <div id="deletePositionModal" class="modal" aria-hidden="true">
+        <div class="modal-overlay" data-close-delete></div>
+        <div class="modal-panel" role="dialog" aria-modal="true" aria-labelledby="deletePositionTitle">
+            <header class="modal-header">
+                <h2 id="deletePositionTitle">Confirm Delete</h2>
+                <button class="close-btn" id="closeDeletePositionModal">&times;</button>
+            </header>
+            <p>Are you sure you want to delete this position? This action cannot be undone.</p>
+            <form id="deletePositionForm" method="post" action="${document.currentScript.dataset.deleteUrl}" style="margin-top:12px; display:flex; justify-content:flex-end; gap:8px;">
+                <input type="hidden" id="delete_position_id" name="position_id" value="">
+                <button type="button" class="btn btn-secondary" id="cancelDeletePosition">Cancel</button>
+                <button type="submit" class="btn" style="background:#dc3545; color:#fff;">Delete</button>
+            </form>
+        </div>
+    </div>`;
+    document.body.appendChild(deleteModal);
+    const deleteModalEl = document.getElementById('deletePositionModal');
+    const deleteOverlay = deleteModalEl && deleteModalEl.querySelector('.modal-overlay');
+    const closeDeleteBtn = document.getElementById('closeDeletePositionModal');
+    const cancelDeleteBtn = document.getElementById('cancelDeletePosition');
+    const deleteIdInput = document.getElementById('delete_position_id');
+
+    document.querySelectorAll('.btn-delete').forEach(function (btn) {
+        btn.addEventListener('click', function (e) {
+            e.preventDefault();
+            const id = this.getAttribute('data-id');
+            if (!id) return;
+            deleteIdInput.value = id;
+            deleteModalEl.setAttribute('aria-hidden', 'false');
+            document.body.style.overflow = 'hidden';
+        });
+    });
+
+    deleteOverlay && deleteOverlay.addEventListener('click', function () { deleteModalEl.setAttribute('aria-hidden', 'true'); document.body.style.overflow = ''; deleteIdInput.value = ''; });
+    closeDeleteBtn && closeDeleteBtn.addEventListener('click', function () { deleteModalEl.setAttribute('aria-hidden', 'true'); document.body.style.overflow = ''; deleteIdInput.value = ''; });
+    cancelDeleteBtn && cancelDeleteBtn.addEventListener('click', function () { deleteModalEl.setAttribute('aria-hidden', 'true'); document.body.style.overflow = ''; deleteIdInput.value = ''; });
+})();
@@ -0,0 +1,45 @@
+// rows fetched by the "Load more" pager
+window.buildListRow = function (v) {
+    const tr = document.createElement('tr');
+    [v.fullname, v.grade || '', 'Not Implemented'].forEach(text => {
+        const td = document.createElement('td');
+        td.textContent = text;
+        tr.appendChild(td);
+    });
+    return tr;
+};
+
+// upload the roster, then follow the import job and show its report
+document.getElementById('importForm').addEventListener('submit', async (e) => {
+    e.preventDefault();
+    const form = e.target;
+    const out = document.getElementById('importResult');
+    const btn = form.querySelector('button');
+    btn.disabled = true;
+    out.textContent = 'Uploading...';
+    try {
+        const res = await fetch(form.action, { method: 'POST', body: new FormData(form) });
+        const data = await res.json();
+        if (!data.success) {
+            out.textContent = 'Import failed: ' + (data.message || res.statusText);
+            return;
+        }
+        for (;;) {
+            const job = (await (await fetch(data.status_url)).json()).job;
+            if (job.status === 'failed') {
+                out.textContent = 'Import failed: ' + (job.message || 'unknown error');
+                return;
+            }
+            out.textContent = job.message || 'Waiting for the import to start...';
+            if (job.status === 'done') {
+                if (job.done) setTimeout(() => window.location.reload(), 3000);
+                return;
+            }
+            await new Promise(resolve => setTimeout(resolve, 1000));
+        }
+    } catch (err) {
+        out.textContent = 'Import error: ' + err.message;
+    } finally {
+        btn.disabled = false;
+    }
+});
@@ -0,0 +1,7 @@
+// Unobtrusive enhancement: ensure POST is used for logout.
+(function(){
+  var f = document.getElementById('logoutForm');
+  if (!f) return;
+  // optional: confirm before logging out (commented out)
+  // document.getElementById('logoutBtn').addEventListener('click', function(e){ if(!confirm('Log out?')) e.preventDefault(); });
+})();
@@ -0,0 +1,31 @@
+(function(){
+  var box = document.getElementById('jobProgress');
+  var text = document.getElementById('jobProgressText');
+  var bar = document.getElementById('jobProgressBar');
+  async function poll(){
+    try {
+      var res = await fetch(box.getAttribute('data-url'));
+      var data = await res.json();
+      if (!data.success) { text.textContent = data.message; return; }
+      var job = data.job;
+      if (job.percent !== null) bar.style.width = job.percent + '%';
+      text.textContent = (job.message || job.kind.replace(/_/g, ' ')) + (job.percent !== null ? ' (' + job.percent + '%)' : '');
+      if (job.status === 'done') {
+        var url = new URL(window.location.href);
+        url.searchParams.delete('job');
+        window.location.replace(url.toString());
+        return;
+      }
+      if (job.status === 'failed') {
+        box.style.background = '#fff1f1';
+        box.style.borderColor = '#f5c2c7';
+        text.textContent = 'Failed: ' + (job.message || 'unknown error');
+        return;
+      }
+    } catch (err) {
+      text.textContent = 'Could not read job progress: ' + err.message;
+    }
+    setTimeout(poll, 1000);
+  }
+  poll();
+})();
@@ -0,0 +1,26 @@
+(function(){
+  var btn = document.getElementById('loadMoreBtn');
+  if (!btn) return;
+  var tbody = document.getElementById(btn.getAttribute('data-tbody'));
+  btn.addEventListener('click', async function(){
+    var next = btn.getAttribute('data-next');
+    if (!next) return;
+    var params = new URLSearchParams({ after: next });
+    var q = btn.getAttribute('data-q');
+    if (q) params.set('q', q);
+    btn.disabled = true;
+    btn.textContent = 'Loading...';
+    try {
+      var res = await fetch(btn.getAttribute('data-api') + '?' + params.toString());
+      var data = await res.json();
+      data.items.forEach(function(item){ tbody.appendChild(window.buildListRow(item)); });
+      btn.setAttribute('data-next', data.next || '');
+      if (!data.next) btn.style.display = 'none';
+    } catch (err) {
+      alert('Could not load more rows: ' + err.message);
+    } finally {
+      btn.disabled = false;
+      btn.textContent = 'Load more';
+    }
+  });
+})();
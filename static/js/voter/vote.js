@@ -0,0 +1,148 @@
+// Track selections: { positionTitle: [candidateId, ...] }
+const selections = {};
+
+    function markSelectedCard(cardEl, selected) {
+        const voted = cardEl.querySelector('.voted');
+        const voteBtn = cardEl.querySelector('.vote-btn');
+            if (selected) {
+                if (voted) voted.style.display = 'flex';
+                if (voteBtn) { voteBtn.textContent = 'Cancel Vote'; voteBtn.style.backgroundColor = '#dc3545'; }
+            } else {
+                if (voted) voted.style.display = 'none';
+                if (voteBtn) { voteBtn.textContent = 'Vote'; voteBtn.style.backgroundColor = '#28a745'; }
+            }
+    }
+
+    // initialize buttons
+    document.querySelectorAll('.candidate').forEach(card => {
+        const btn = card.querySelector('.vote-btn');
+        const position = card.getAttribute('data-position');
+        // per-position limit (max winners)
+        const positionEl = card.closest('.position');
+        const maxWinnersAttr = positionEl ? positionEl.getAttribute('data-max-winners') : null;
+        const maxWinners = maxWinnersAttr ? parseInt(maxWinnersAttr, 10) : 1;
+        const candidateId = card.getAttribute('data-candidate-id');
+
+        // style primary green by default
+        btn.style.backgroundColor = '#28a745';
+        btn.style.color = '#fff';
+
+        btn.addEventListener('click', () => {
+            // multi-choice up to maxWinners: toggle this candidate
+            selections[position] = selections[position] || [];
+            const idx = selections[position].findIndex(id => id.toString() === candidateId);
+            if (idx !== -1) {
+                // currently selected -> remove
+                selections[position].splice(idx, 1);
+                markSelectedCard(card, false);
+            } else {
+                // not selected -> ensure we don't exceed limit
+                if (selections[position].length >= maxWinners) {
+                    alert(`You may select up to ${maxWinners} candidate(s) for ${position}.`);
+                    return;
+                }
+                selections[position].push(parseInt(candidateId));
+                markSelectedCard(card, true);
+            }
+            // update other cards' visual state in this position
+            document.querySelectorAll(`.candidate[data-position="${position}"]`).forEach(other => {
+                const otherId = other.getAttribute('data-candidate-id');
+                const isSelected = selections[position].some(id => id.toString() === otherId);
+                markSelectedCard(other, isSelected);
+            });
+        });
+    });
+
+    // Review button
+    document.getElementById('reviewVoteBtn').addEventListener('click', () => {
+        openPreview();
+    });
+
+    function openPreview() {
+        const preview = document.getElementById('previewModal');
+        const content = document.getElementById('previewContent');
+        content.innerHTML = '';
+
+        // for each position, show selected candidate(s) in same card design
+        document.querySelectorAll('.position').forEach(pos => {
+            const posTitle = pos.getAttribute('data-position');
+            const wrapper = document.createElement('div');
+            wrapper.style.background = '#f8f9fa';
+            wrapper.style.padding = '10px';
+            wrapper.style.borderRadius = '8px';
+            const h = document.createElement('h3');
+            h.textContent = posTitle;
+            wrapper.appendChild(h);
+            const selIds = selections[posTitle] || [];
+            if (!selIds || selIds.length === 0) {
+                const p = document.createElement('div');
+                p.textContent = 'No selection';
+                p.className = 'small';
+                wrapper.appendChild(p);
+            } else {
+                selIds.forEach(sid => {
+                    const card = pos.querySelector(`.candidate[data-candidate-id="${sid}"]`);
+                    if (card) {
+                        // clone a simplified card look
+                        const clone = card.cloneNode(true);
+                        clone.style.width = '100%';
+                        const btn = clone.querySelector('.vote-btn'); if (btn) btn.remove();
+                        // ensure voted badge is visible
+                        const voted = clone.querySelector('.voted');
+                        if (voted) voted.style.display = 'flex';
+                        wrapper.appendChild(clone);
+                    }
+                });
+            }
+            content.appendChild(wrapper);
+        });
+
+        preview.style.display = 'flex';
+    }
+
+    document.getElementById('closePreview').addEventListener('click', () => {
+        document.getElementById('previewModal').style.display = 'none';
+    });
+
+    document.getElementById('submitPreview').addEventListener('click', async () => {
+        const btn = document.getElementById('submitPreview');
+        btn.disabled = true;
+        btn.textContent = 'Submitting...';
+
+        const bodyEl = document.body;
+        const submitUrl = bodyEl.getAttribute('data-submit-url');
+        const selectUrl = bodyEl.getAttribute('data-select-url');
+        const electionIdAttr = bodyEl.getAttribute('data-election-id');
+        const electionId = electionIdAttr ? parseInt(electionIdAttr, 10) : null;
+
+        const payload = { election_id: electionId, selections };
+
+        try {
+            const res = await fetch(submitUrl, {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify(payload),
+            });
+            const data = await res.json();
+            if (res.ok && data.success) {
+                // close modal and show simple confirmation
+                document.getElementById('previewModal').style.display = 'none';
+                let message = 'Votes submitted successfully';
+                if (data.receipt) {
+                    // enough to look the ballot up later in the public audit log
+                    message += '\n\nYour receipt: #' + data.receipt.index + '\n' + data.receipt.leaf
+                        + '\nKeep it to check at /audit/proof/' + data.receipt.index;
+                }
+                alert(message);
+                // optionally redirect back to select page
+                window.location.href = selectUrl;
+            } else {
+                alert('Submission failed: ' + (data.message || res.statusText));
+            }
+        } catch (err) {
+            alert('Submission error: ' + err.message);
+        } finally {
+            btn.disabled = false;
+            btn.textContent = 'Submit Votes';
+        }
+    });
@@ -1,13 +1,121 @@
+import argparse
+import queue
 import sqlite3
+import threading
 import tkinter as tk
 from tkinter import ttk, messagebox
 import ttkbootstrap as tb
 
 DB_PATH = "instance/app.db"
 
+# rows fetched per keyset query, and how many of those windows stay in the
+# Treeview at once; scrolling past either end fetches the next window and
+# drops the one furthest away, so memory doesn't grow with the table
+PAGE_SIZE = 200
+MAX_PAGES = 5
+
+# filter operator -> (SQL with {c} for the column, how the typed value is bound)
+FILTER_OPS = {
+    "contains": ("{c} LIKE ? ESCAPE '\\'", lambda v: f"%{_escape_like(v)}%"),
+    "starts with": ("{c} LIKE ? ESCAPE '\\'", lambda v: f"{_escape_like(v)}%"),
+    "=": ("{c} = ?", str),
+    "!=": ("{c} != ?", str),
+    ">": ("{c} > ?", str),
+    "<": ("{c} < ?", str),
+    "is empty": ("({c} IS NULL OR {c} = '')", None),
+}
+
+
+def _quote(name):
+    return '"' + name.replace('"', '""') + '"'
+
+
+def _escape_like(value):
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _seek_clause(sort_col, key, forward):
+    """WHERE clause for rows after (forward) or before `key` in (sort_col, rowid) order.
+
+    NULLs sort first in SQLite, and never compare equal, so they get their
+    own branches.
+    """
+    value, rowid = key
+    if sort_col is None:
+        return ("rowid > ?" if forward else "rowid < ?"), [rowid]
+    c = _quote(sort_col)
+    if value is None:
+        if forward:
+            return f"(({c} IS NULL AND rowid > ?) OR {c} IS NOT NULL)", [rowid]
+        return f"({c} IS NULL AND rowid < ?)", [rowid]
+    if forward:
+        return f"({c} > ? OR ({c} = ? AND rowid > ?))", [value, value, rowid]
+    return f"({c} < ? OR {c} IS NULL OR ({c} = ? AND rowid < ?))", [value, value, rowid]
+
+
+class Changeset:
+    """Edits staged in the viewer until "Apply" writes them in one transaction."""
+
+    def __init__(self):
+        self.changes = []
+
+    def __len__(self):
+        return len(self.changes)
+
+    def insert(self, table, columns, values):
+        self.changes.append(("insert", table, tuple(columns), list(values), None))
+
+    def update(self, table, columns, values, rowid):
+        self.changes.append(("update", table, tuple(columns), list(values), rowid))
+
+    def delete(self, table, rowid):
+        self.changes.append(("delete", table, (), [], rowid))
+
+    def remove(self, index):
+        del self.changes[index]
+
+    def clear(self):
+        self.changes = []
+
+    def rowids(self, table, kind):
+        return {c[4] for c in self.changes if c[0] == kind and c[1] == table}
+
+    @staticmethod
+    def describe(change):
+        kind, table, columns, values, rowid = change
+        if kind == "insert":
+            return f"INSERT {table}: " + ", ".join(f"{c}={v!r}" for c, v in zip(columns, values))
+        if kind == "update":
+            return f"UPDATE {table} rowid {rowid}: " + ", ".join(f"{c}={v!r}" for c, v in zip(columns, values))
+        return f"DELETE {table} rowid {rowid}"
+
+    def batches(self):
+        """(sql, [params, ...]) runs of consecutive changes sharing one statement."""
+        runs = []
+        for kind, table, columns, values, rowid in self.changes:
+            t = _quote(table)
+            if kind == "insert":
+                sql = f"INSERT INTO {t} ({', '.join(map(_quote, columns))}) VALUES ({', '.join('?' * len(columns))})"
+                params = values
+            elif kind == "update":
+                sql = f"UPDATE {t} SET {', '.join(f'{_quote(c)}=?' for c in columns)} WHERE rowid=?"
+                params = values + [rowid]
+            else:
+                sql = f"DELETE FROM {t} WHERE rowid=?"
+                params = [rowid]
+            if runs and runs[-1][0] == sql:
+                runs[-1][1].append(params)
+            else:
+                runs.append((sql, [params]))
+        return runs
+
+
 class DatabaseManager:
     def __init__(self, db_path):
-        self.conn = sqlite3.connect(db_path)
+        self.db_path = db_path
+        # browsing is read-only, so the viewer never holds the write lock the
+        # Flask app's writers wait on; apply_changes opens its own connection
+        self.conn = sqlite3.connect(f"file:{db_path}?mode=ro", uri=True)
         self.cursor = self.conn.cursor()
 
     def get_tables(self):
@@ -18,32 +126,109 @@ class DatabaseManager:
         self.cursor.execute(f"PRAGMA table_info({table});")
         return self.cursor.fetchall()
 
-    def get_all_rows(self, table):
-        self.cursor.execute(f"SELECT * FROM {table};")
-        return self.cursor.fetchall()
+    def estimate_rows(self, table):
+        """Cheap row count guess: ANALYZE statistics, else the rowid span."""
+        try:
+            self.cursor.execute("SELECT stat FROM sqlite_stat1 WHERE tbl=? ORDER BY idx IS NOT NULL LIMIT 1", (table,))
+            row = self.cursor.fetchone()
+            if row and row[0]:
+                return int(row[0].split()[0])
+        except sqlite3.Error:
+            pass
+        self.cursor.execute(f"SELECT MIN(rowid), MAX(rowid) FROM {_quote(table)}")
+        low, high = self.cursor.fetchone()
+        return 0 if low is None else high - low + 1
+
+    def count_rows(self, table, where="", params=()):
+        self.cursor.execute(f"SELECT COUNT(*) FROM {_quote(table)}" + (f" WHERE {where}" if where else ""), params)
+        return self.cursor.fetchone()[0]
+
+    def fetch_window(self, table, sort_col=None, descending=False, where="", params=(),
+                     after=None, before=None, limit=PAGE_SIZE):
+        """One window of rows as (rowid, *columns), in display order.
+
+        Rows are ordered by (sort_col, rowid), descending if asked. `after`
+        and `before` are the (sort value, rowid) key of the row the window
+        should follow or precede; the query seeks straight to it instead of
+        using OFFSET.
+        """
+        clauses, args = [], []
+        if where:
+            clauses.append(f"({where})")
+            args.extend(params)
+        backwards = before is not None
+        if after is not None or before is not None:
+            # moving down the display in a descending sort is moving up the index
+            clause, key_args = _seek_clause(sort_col, after if after is not None else before,
+                                            forward=(not backwards) != descending)
+            clauses.append(clause)
+            args.extend(key_args)
+        ascending = (not backwards) != descending
+        direction = "ASC" if ascending else "DESC"
+        order = f"rowid {direction}" if sort_col is None else f"{_quote(sort_col)} {direction}, rowid {direction}"
+        sql = f"SELECT rowid, * FROM {_quote(table)}"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += f" ORDER BY {order} LIMIT ?"
+        self.cursor.execute(sql, args + [limit])
+        rows = self.cursor.fetchall()
+        if backwards:
+            rows.reverse()
+        return rows
+
+    def apply_changes(self, changeset):
+        """Write every staged change in one transaction; returns rows affected.
+
+        Consecutive changes of the same shape go through one executemany.
+        If any statement fails nothing is written.
+        """
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            affected = 0
+            try:
+                for sql, params in changeset.batches():
+                    affected += conn.executemany(sql, params).rowcount
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+        finally:
+            conn.close()
+        return affected
+
+class RowFetcher:
+    """Runs DatabaseManager queries on a background thread.
+
+    The thread opens its own connection. Results come back through a queue
+    that the Tk main loop polls, tagged so answers for a table or sort that
+    is no longer shown can be dropped.
+    """
 
-    def insert_row(self, table, columns, values):
-        placeholders = ','.join(['?'] * len(columns))
-        col_names = ','.join(columns)
-        self.cursor.execute(f"INSERT INTO {table} ({col_names}) VALUES ({placeholders})", values)
-        self.conn.commit()
-
-    def update_row(self, table, columns, values, pk_col, pk_value):
-        set_clause = ', '.join([f'{col}=?' for col in columns])
-        self.cursor.execute(
-            f"UPDATE {table} SET {set_clause} WHERE {pk_col}=?",
-            values + [pk_value]
-        )
-        self.conn.commit()
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        threading.Thread(target=self._run, name="row-fetcher", daemon=True).start()
+
+    def submit(self, tag, method, *args, **kwargs):
+        self.requests.put((tag, method, args, kwargs))
+
+    def _run(self):
+        db = DatabaseManager(self.db_path)
+        while True:
+            tag, method, args, kwargs = self.requests.get()
+            try:
+                self.results.put((tag, getattr(db, method)(*args, **kwargs), None))
+            except Exception as e:
+                self.results.put((tag, None, e))
 
-    def delete_row(self, table, pk_col, pk_value):
-        self.cursor.execute(f"DELETE FROM {table} WHERE {pk_col}=?", (pk_value,))
-        self.conn.commit()
 
 class SQLiteApp:
-    def __init__(self, root, db_manager):
+    def __init__(self, root, db_manager, allow_edits=False):
         self.db = db_manager
         self.root = root
+        self.changes = Changeset()
         self.root.title("FarmHub Database")
         self.root.geometry("1100x700")
         self.root.configure(padx=20, pady=20)
@@ -62,13 +247,66 @@ class SQLiteApp:
         # Button frame (top right)
         btn_frame = ttk.Frame(top_frame)
         btn_frame.pack(side="right")
-        ttk.Button(btn_frame, text="Add Row", command=self.add_row).pack(side="left", padx=5)
-        ttk.Button(btn_frame, text="Update Row", command=self.update_row).pack(side="left", padx=5)
-        ttk.Button(btn_frame, text="Delete Row", command=self.delete_row).pack(side="left", padx=5)
-
-        self.tree = ttk.Treeview(root, show="headings")
-        self.tree.pack(expand=True, fill="both")
-
+        # edits are only staged; nothing touches the database until "Apply"
+        self.allow_edits = tk.BooleanVar(value=allow_edits)
+        ttk.Checkbutton(btn_frame, text="Allow edits", variable=self.allow_edits,
+                        command=self.update_edit_buttons).pack(side="left", padx=5)
+        self.edit_buttons = [
+            ttk.Button(btn_frame, text="Add Row", command=self.add_row),
+            ttk.Button(btn_frame, text="Update Row", command=self.update_row),
+            ttk.Button(btn_frame, text="Delete Row", command=self.delete_row),
+        ]
+        for btn in self.edit_buttons:
+            btn.pack(side="left", padx=5)
+
+        # filter, applied in SQL: column, operator, value
+        filter_frame = ttk.Frame(root)
+        filter_frame.pack(fill="x", pady=(0, 10))
+        self.filter_col = ttk.Combobox(filter_frame, state="readonly", width=18)
+        self.filter_col.pack(side="left", padx=(0, 5))
+        self.filter_op = ttk.Combobox(filter_frame, state="readonly", width=12, values=list(FILTER_OPS))
+        self.filter_op.current(0)
+        self.filter_op.pack(side="left", padx=5)
+        self.filter_value = ttk.Entry(filter_frame, width=30)
+        self.filter_value.pack(side="left", padx=5)
+        self.filter_value.bind("<Return>", self.apply_filter)
+        ttk.Button(filter_frame, text="Filter", command=self.apply_filter).pack(side="left", padx=5)
+        ttk.Button(filter_frame, text="Clear", command=self.clear_filter).pack(side="left", padx=5)
+        self.status = ttk.Label(filter_frame, text="")
+        self.status.pack(side="right")
+
+        tree_frame = ttk.Frame(root)
+        tree_frame.pack(expand=True, fill="both")
+        self.tree = ttk.Treeview(tree_frame, show="headings")
+        self.scrollbar = ttk.Scrollbar(tree_frame, orient="vertical", command=self.tree.yview)
+        self.tree.configure(yscrollcommand=self.on_scroll)
+        self.scrollbar.pack(side="right", fill="y")
+        self.tree.pack(side="left", expand=True, fill="both")
+        self.tree.tag_configure("pending", background="#fff3cd")
+        self.tree.tag_configure("deleted", background="#f8d7da")
+
+        # staged changes
+        changes_frame = ttk.Frame(root)
+        changes_frame.pack(fill="x", pady=(10, 0))
+        self.changes_list = tk.Listbox(changes_frame, height=5)
+        self.changes_list.pack(side="left", expand=True, fill="x")
+        changes_btns = ttk.Frame(changes_frame)
+        changes_btns.pack(side="right", padx=(10, 0))
+        self.apply_btn = ttk.Button(changes_btns, text="Apply (0)", command=self.apply_changes)
+        self.apply_btn.pack(fill="x", pady=2)
+        ttk.Button(changes_btns, text="Remove Selected", command=self.unstage_change).pack(fill="x", pady=2)
+        ttk.Button(changes_btns, text="Discard All", command=self.discard_changes).pack(fill="x", pady=2)
+        self.root.protocol("WM_DELETE_WINDOW", self.on_close)
+
+        self.fetcher = RowFetcher(db_manager.db_path)
+        self.generation = 0
+        self.view = None
+        self.pages = []
+        self.loading = False
+        self.root.after(30, self.poll_results)
+
+        self.update_edit_buttons()
+        self.refresh_changes()
         self.load_tables()
 
     def load_tables(self):
@@ -82,16 +320,208 @@ class SQLiteApp:
         table = self.table_combo.get()
         cols_info = self.db.get_table_columns(table)
         cols = [c[1] for c in cols_info]
-
+        self.filter_col["values"] = cols
+        if cols:
+            self.filter_col.current(0)
+        self.filter_value.delete(0, "end")
+        self.show_view({"table": table, "cols": cols, "sort_col": None, "descending": False,
+                        "where": "", "params": ()})
+
+    def show_view(self, view):
+        """Start browsing `view` from the top; rows arrive from the fetcher."""
+        self.generation += 1
+        self.view = view
+        self.pages = []
+        # a new view starts at the top, so there is nothing above it
+        self.at_start, self.at_end = True, False
+        self.loading = False
+
+        cols = view["cols"]
         self.tree.delete(*self.tree.get_children())
         self.tree["columns"] = cols
         for col in cols:
-            self.tree.heading(col, text=col, anchor="center")
+            arrow = ""
+            if col == view["sort_col"]:
+                arrow = " \u25bc" if view["descending"] else " \u25b2"
+            self.tree.heading(col, text=col + arrow, anchor="center", command=lambda c=col: self.sort_by(c))
             self.tree.column(col, width=120, anchor="center")
 
-        for idx, row in enumerate(self.db.get_all_rows(table)):
-            tag = 'evenrow' if idx % 2 == 0 else 'oddrow'
-            self.tree.insert("", "end", values=row, tags=(tag,))
+        # the estimate is instant; the exact count follows from the fetcher
+        table = view["table"]
+        prefix = "" if not view["where"] else "filtered, of "
+        self.status.config(text=f"{prefix}~{self.db.estimate_rows(table):,} rows")
+        self.fetcher.submit((self.generation, "count"), "count_rows", table, view["where"], view["params"])
+        self.request_page("down")
+
+    def sort_by(self, col):
+        view = dict(self.view)
+        if view["sort_col"] == col:
+            view["descending"] = not view["descending"]
+        else:
+            view["sort_col"], view["descending"] = col, False
+        self.show_view(view)
+
+    def apply_filter(self, event=None):
+        col, op, value = self.filter_col.get(), self.filter_op.get(), self.filter_value.get()
+        if not col or not op:
+            return
+        sql, bind = FILTER_OPS[op]
+        view = dict(self.view, where=sql.format(c=_quote(col)), params=(bind(value),) if bind else ())
+        self.show_view(view)
+
+    def clear_filter(self):
+        self.filter_value.delete(0, "end")
+        self.show_view(dict(self.view, where="", params=()))
+
+    def row_key(self, row):
+        # (sort value, rowid); row[0] is the rowid
+        view = self.view
+        value = None if view["sort_col"] is None else row[1 + view["cols"].index(view["sort_col"])]
+        return value, row[0]
+
+    def request_page(self, direction):
+        if self.loading or (direction == "down" and self.at_end) or (direction == "up" and self.at_start):
+            return
+        if direction == "up" and not self.pages:
+            return
+        view = self.view
+        kwargs = {}
+        if self.pages:
+            if direction == "down":
+                kwargs["after"] = self.row_key(self.pages[-1][-1])
+            else:
+                kwargs["before"] = self.row_key(self.pages[0][0])
+        self.loading = True
+        self.fetcher.submit(
+            (self.generation, direction), "fetch_window",
+            view["table"], view["sort_col"], view["descending"], view["where"], view["params"], **kwargs,
+        )
+
+    def poll_results(self):
+        try:
+            while True:
+                (generation, kind), result, error = self.fetcher.results.get_nowait()
+                if generation != self.generation:
+                    continue
+                if kind == "count":
+                    if error is None:
+                        prefix = "" if not self.view["where"] else "filtered: "
+                        self.status.config(text=f"{prefix}{result:,} rows")
+                    continue
+                self.loading = False
+                if error is not None:
+                    messagebox.showerror("Error", f"Failed to load rows: {error}")
+                    continue
+                self.add_page(kind, result)
+        except queue.Empty:
+            pass
+        finally:
+            # one bad page must not stop every later fetch
+            self.root.after(30, self.poll_results)
+
+    def add_page(self, direction, rows):
+        if len(rows) < PAGE_SIZE:
+            if direction == "down":
+                self.at_end = True
+            else:
+                self.at_start = True
+        # on a live database a row whose sort value changed between fetches
+        # comes back in a second window; it is already shown
+        rows = [row for row in rows if not self.tree.exists(str(row[0]))]
+        if not rows:
+            return
+        total = len(self.tree.get_children())
+        top = round(self.tree.yview()[0] * total) if total else 0
+        if direction == "down":
+            self.pages.append(rows)
+            for row in rows:
+                self.tree.insert("", "end", iid=str(row[0]), values=row[1:])
+            if len(self.pages) > MAX_PAGES:
+                dropped = self.pages.pop(0)
+                self.tree.delete(*[str(r[0]) for r in dropped])
+                top -= len(dropped)
+                self.at_start = False
+        else:
+            self.pages.insert(0, rows)
+            for idx, row in enumerate(rows):
+                self.tree.insert("", idx, iid=str(row[0]), values=row[1:])
+            top += len(rows)
+            if len(self.pages) > MAX_PAGES:
+                dropped = self.pages.pop()
+                self.tree.delete(*[str(r[0]) for r in dropped])
+                self.at_end = False
+        # keep the rows the user was looking at in place
+        total = len(self.tree.get_children())
+        if total and (direction == "up" or top > 0):
+            self.tree.yview_moveto(max(top, 0) / total)
+        self.retag()
+
+    def retag(self):
+        table = self.view["table"]
+        updated = {str(r) for r in self.changes.rowids(table, "update")}
+        deleted = {str(r) for r in self.changes.rowids(table, "delete")}
+        for idx, iid in enumerate(self.tree.get_children()):
+            if iid in deleted:
+                tag = "deleted"
+            elif iid in updated:
+                tag = "pending"
+            else:
+                tag = "evenrow" if idx % 2 == 0 else "oddrow"
+            self.tree.item(iid, tags=(tag,))
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        if float(last) > 0.9:
+            self.request_page("down")
+        elif float(first) < 0.1:
+            self.request_page("up")
+
+    def update_edit_buttons(self):
+        state = "normal" if self.allow_edits.get() else "disabled"
+        for btn in self.edit_buttons:
+            btn.config(state=state)
+
+    def refresh_changes(self):
+        self.changes_list.delete(0, "end")
+        for change in self.changes.changes:
+            self.changes_list.insert("end", Changeset.describe(change))
+        self.apply_btn.config(text=f"Apply ({len(self.changes)})",
+                              state="normal" if len(self.changes) else "disabled")
+        if self.view:
+            self.retag()
+
+    def unstage_change(self):
+        selected = self.changes_list.curselection()
+        if not selected:
+            return
+        self.changes.remove(selected[0])
+        self.refresh_changes()
+        self.show_view(self.view)
+
+    def discard_changes(self):
+        if self.changes and messagebox.askyesno("Discard", f"Discard {len(self.changes)} staged change(s)?"):
+            self.changes.clear()
+            self.refresh_changes()
+            self.show_view(self.view)
+
+    def apply_changes(self):
+        if not self.changes:
+            return
+        try:
+            affected = self.db.apply_changes(self.changes)
+        except Exception as e:
+            messagebox.showerror("Error", f"Nothing was applied: {e}")
+            return
+        self.changes.clear()
+        self.refresh_changes()
+        self.show_view(self.view)
+        self.status.config(text=f"Applied, {affected} row(s) changed")
+
+    def on_close(self):
+        if self.changes and not messagebox.askyesno(
+                "Unapplied changes", f"{len(self.changes)} staged change(s) will be lost. Quit anyway?"):
+            return
+        self.root.destroy()
 
     def add_row(self):
         table = self.table_combo.get()
@@ -131,12 +561,9 @@ class SQLiteApp:
                     continue
                 insert_cols.append(col)
                 values.append(entries[col].get())
-            try:
-                self.db.insert_row(table, insert_cols, values)
-                self.load_table()
-                form.destroy()
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to add row: {e}")
+            self.changes.insert(table, insert_cols, values)
+            self.refresh_changes()
+            form.destroy()
 
         tk.Button(form, text="Submit", command=submit).grid(row=row_num, column=0, columnspan=2, pady=12)
 
@@ -193,14 +620,11 @@ class SQLiteApp:
             if not has_changes():
                 return
             new_values = [entries[col].get() for col in cols[1:]]
-            pk_col = cols[0]
-            pk_value = row_values[0]
-            try:
-                self.db.update_row(table, cols[1:], new_values, pk_col, pk_value)
-                self.load_table()
-                form.destroy()
-            except Exception as e:
-                messagebox.showerror("Error", f"Failed to update row: {e}")
+            # Treeview item ids are the rows' rowids
+            self.changes.update(table, cols[1:], new_values, int(selected[0]))
+            self.tree.item(selected[0], values=[entries[col].get() for col in cols])
+            self.refresh_changes()
+            form.destroy()
 
         update_btn = tk.Button(form, text="Update", command=update, state="disabled")
         update_btn.grid(row=row_num, column=0, columnspan=2, pady=12)
@@ -210,15 +634,18 @@ class SQLiteApp:
         if not selected:
             messagebox.showwarning("Error", "No row selected.")
             return
-        row_values = self.tree.item(selected[0], "values")
         table = self.table_combo.get()
-        pk_col = self.tree["columns"][0]
-        pk_value = row_values[0]
-        self.db.delete_row(table, pk_col, pk_value)
-        self.load_table()
+        # Treeview item ids are the rows' rowids
+        for iid in selected:
+            self.changes.delete(table, int(iid))
+        self.refresh_changes()
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Browse (and optionally edit) the app database.")
+    parser.add_argument("db_path", nargs="?", default=DB_PATH)
+    parser.add_argument("--edit", action="store_true", help="Start with editing allowed.")
+    args = parser.parse_args()
     root = tb.Window(themename="flatly")
-    db_manager = DatabaseManager(DB_PATH)
-    app = SQLiteApp(root, db_manager)
+    db_manager = DatabaseManager(args.db_path)
+    app = SQLiteApp(root, db_manager, allow_edits=args.edit)
     root.mainloop()
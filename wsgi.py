@@ -0,0 +1,37 @@
+"""
+Production entry point.
+
+    gunicorn -c gunicorn.conf.py wsgi:app    (Linux/macOS: pre-forked worker processes)
+    python wsgi.py                           (any OS, Windows included: waitress threads)
+
+``python run.py`` remains the single-process debug server for development.
+Waitress serves from one process, so the in-process caches need no
+cross-process invalidation; set SERVE_THREADS to how many requests may be
+in flight at once (open live-results streams each hold one).
+"""
+import os
+
+from run import create_app
+
+app = create_app()
+
+
+def main():
+    try:
+        from waitress import serve
+    except ImportError:
+        raise SystemExit('python wsgi.py needs the waitress package (pip install waitress)')
+    serve(
+        app,
+        host=os.environ.get('HOST', '0.0.0.0'),
+        port=int(os.environ.get('PORT', 5000)),
+        threads=int(os.environ.get('SERVE_THREADS', 16)),
+        # a login burst queues in waitress instead of being refused
+        backlog=int(os.environ.get('SERVE_BACKLOG', 1024)),
+        connection_limit=int(os.environ.get('SERVE_CONNECTION_LIMIT', 1000)),
+        ident='voting',
+    )
+
+
+if __name__ == '__main__':
+    main()